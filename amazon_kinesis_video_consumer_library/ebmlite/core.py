@@ -40,8 +40,8 @@ __copyright__ = "Copyright 2022, Mide Technology Corporation"
 __credits__ = "David Randall Stokes, Connor Flanigan, Becker Awqatty, Derek Witt"
 
 __all__ = ['BinaryElement', 'DateElement', 'Document', 'Element',
-           'FloatElement', 'IntegerElement', 'MasterElement', 'Schema',
-           'StringElement', 'UIntegerElement', 'UnicodeElement',
+           'FloatElement', 'IntegerElement', 'MasterElement', 'MemoryStream',
+           'Schema', 'StringElement', 'UIntegerElement', 'UnicodeElement',
            'UnknownElement', 'VoidElement', 'loadSchema', 'parseSchema']
 
 from ast import literal_eval
@@ -56,9 +56,12 @@ import sys
 import types
 from xml.etree import ElementTree as ET
 
-from .decoding import readElementID, readElementSize
+from .decoding import readElementID, readElementSize, readElementHeader
 from .decoding import readFloat, readInt, readUInt, readDate
 from .decoding import readString, readUnicode
+from .decoding import decodeElementHeader, getHeaderBytesNeeded
+from .decoding import decodeFloat, decodeInt, decodeUInt, decodeDate
+from .decoding import decodeString, decodeUnicode
 from . import encoding
 from . import schemata
 
@@ -94,6 +97,67 @@ SCHEMA_PATH.extend(p for p in os.environ.get('EBMLITE_SCHEMA_PATH', '').split(os
 SCHEMATA = {}
 
 
+# ==============================================================================
+#
+# ==============================================================================
+
+class MemoryStream(object):
+    """ A read-only, seekable file-like stream over an in-memory buffer
+        (`bytes`, `bytearray`, `memoryview`, or any other object supporting
+        the buffer protocol). The buffer is not copied. The elements of a
+        `Document` loaded from a `MemoryStream` are decoded directly from its
+        `data` by offset, rather than by seeking and reading, and their raw
+        binary is returned as `memoryview` slices of it.
+
+        @ivar data: A read-only, unsigned byte `memoryview` of the buffer.
+    """
+    __slots__ = ("data", "_pos")
+
+    def __init__(self, data, pos=0):
+        """ Constructor.
+
+            @param data: The buffer containing the EBML data.
+            @keyword pos: The initial stream position.
+        """
+        data = memoryview(data)
+        if data.format != 'B' or data.ndim != 1:
+            data = data.cast('B')
+        self.data = data.toreadonly()
+        self._pos = pos
+
+    def read(self, size=-1):
+        start = self._pos
+        end = len(self.data)
+        if size is not None and size >= 0:
+            end = min(end, start + size)
+        if end <= start:
+            return b''
+        self._pos = end
+        return self.data[start:end].tobytes()
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += len(self.data)
+        if pos < 0:
+            raise ValueError("negative seek value %d" % pos)
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def __len__(self):
+        return len(self.data)
+
+
 # ==============================================================================
 #
 # ==============================================================================
@@ -149,6 +213,12 @@ class Element(object):
         # Document-wide caching could be implemented here.
         return bytearray(stream.read(size))
 
+    def parseData(self, data, offset, size):
+        """ Type-specific helper function for parsing the element's payload
+            directly from an in-memory buffer (see `MemoryStream`).
+        """
+        return bytearray(data[offset:offset+size])
+
     def __init__(self, stream=None, offset=0, size=0, payloadOffset=0):
         """ Constructor. Instantiate a new Element from a file. In most cases,
             elements should be created when a `Document` is loaded, rather
@@ -192,19 +262,31 @@ class Element(object):
         """ Parse and cache the element's value. """
         if self._value is not None:
             return self._value
+        if isinstance(self.stream, MemoryStream):
+            self._value = self.parseData(self.stream.data, self.payloadOffset,
+                                         self.size)
+            return self._value
         self.stream.seek(self.payloadOffset)
         self._value = self.parse(self.stream, self.size)
         return self._value
 
     def getRaw(self):
-        """ Get the element's raw binary data, including EBML headers.
+        """ Get the element's raw binary data, including EBML headers. For
+            in-memory documents (see `MemoryStream`), this is a read-only
+            `memoryview` of the document's data rather than a copy.
         """
+        if isinstance(self.stream, MemoryStream):
+            return self.stream.data[self.offset:self.payloadOffset+self.size]
         self.stream.seek(self.offset)
         return self.stream.read(self.size + (self.payloadOffset - self.offset))
 
     def getRawValue(self):
-        """ Get the raw binary of the element's value.
+        """ Get the raw binary of the element's value. For in-memory
+            documents (see `MemoryStream`), this is a read-only `memoryview`
+            of the document's data rather than a copy.
         """
+        if isinstance(self.stream, MemoryStream):
+            return self.stream.data[self.payloadOffset:self.payloadOffset+self.size]
         self.stream.seek(self.payloadOffset)
         return self.stream.read(self.size)
 
@@ -265,8 +347,14 @@ class Element(object):
         """ Dump this element's value as nested dictionaries, keyed by
             element name. For non-master elements, this just returns the
             element's value; this method exists to maintain uniformity.
+            Binary values of in-memory documents are copied to `bytes`, so
+            the result does not reference the document's data and can be
+            pickled.
         """
-        return self.value
+        value = self.value
+        if isinstance(value, memoryview):
+            return value.tobytes()
+        return value
 
 
 # ==============================================================================
@@ -276,7 +364,7 @@ class IntegerElement(Element):
     """ Base class for an EBML signed integer element. Schema-specific
         subclasses are generated when a `Schema` is loaded.
     """
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value")
+    __slots__ = ()
     dtype = int
     precache = True
 
@@ -291,6 +379,12 @@ class IntegerElement(Element):
         """
         return readInt(stream, size)
 
+    def parseData(self, data, offset, size):
+        """ Type-specific helper function for parsing the element's payload
+            directly from an in-memory buffer (see `MemoryStream`).
+        """
+        return decodeInt(data, offset, size)
+
     @classmethod
     def encodePayload(cls, data, length=None):
         """ Type-specific payload encoder for signed integer elements. """
@@ -304,7 +398,7 @@ class UIntegerElement(IntegerElement):
     """ Base class for an EBML unsigned integer element. Schema-specific
         subclasses are generated when a `Schema` is loaded.
     """
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value")
+    __slots__ = ()
     dtype = int
     precache = True
 
@@ -314,6 +408,12 @@ class UIntegerElement(IntegerElement):
         """
         return readUInt(stream, size)
 
+    def parseData(self, data, offset, size):
+        """ Type-specific helper function for parsing the element's payload
+            directly from an in-memory buffer (see `MemoryStream`).
+        """
+        return decodeUInt(data, offset, size)
+
     @classmethod
     def encodePayload(cls, data, length=None):
         """ Type-specific payload encoder for unsigned integer elements. """
@@ -327,7 +427,7 @@ class FloatElement(Element):
     """ Base class for an EBML floating point element. Schema-specific
         subclasses are generated when a `Schema` is loaded.
     """
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value")
+    __slots__ = ()
     dtype = float
     precache = True
 
@@ -342,6 +442,12 @@ class FloatElement(Element):
         """
         return readFloat(stream, size)
 
+    def parseData(self, data, offset, size):
+        """ Type-specific helper function for parsing the element's payload
+            directly from an in-memory buffer (see `MemoryStream`).
+        """
+        return decodeFloat(data, offset, size)
+
     @classmethod
     def encodePayload(cls, data, length=None):
         """ Type-specific payload encoder for floating point elements. """
@@ -355,7 +461,7 @@ class StringElement(Element):
     """ Base class for an EBML ASCII string element. Schema-specific
         subclasses are generated when a `Schema` is loaded.
     """
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value")
+    __slots__ = ()
     dtype = str
 
     def __eq__(self, other):
@@ -372,6 +478,12 @@ class StringElement(Element):
         """
         return readString(stream, size)
 
+    def parseData(self, data, offset, size):
+        """ Type-specific helper function for parsing the element's payload
+            directly from an in-memory buffer (see `MemoryStream`).
+        """
+        return decodeString(data, offset, size)
+
     @classmethod
     def encodePayload(cls, data, length=None):
         """ Type-specific payload encoder for ASCII string elements. """
@@ -385,7 +497,7 @@ class UnicodeElement(StringElement):
     """ Base class for an EBML UTF-8 string element. Schema-specific subclasses
         are generated when a `Schema` is loaded.
     """
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value")
+    __slots__ = ()
     dtype = str
 
     def __len__(self):
@@ -398,6 +510,12 @@ class UnicodeElement(StringElement):
         """
         return readUnicode(stream, size)
 
+    def parseData(self, data, offset, size):
+        """ Type-specific helper function for parsing the element's payload
+            directly from an in-memory buffer (see `MemoryStream`).
+        """
+        return decodeUnicode(data, offset, size)
+
     @classmethod
     def encodePayload(cls, data, length=None):
         """ Type-specific payload encoder for Unicode string elements. """
@@ -411,7 +529,7 @@ class DateElement(IntegerElement):
     """ Base class for an EBML 'date' element. Schema-specific subclasses are
         generated when a `Schema` is loaded.
     """
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value")
+    __slots__ = ()
     dtype = datetime
 
     def parse(self, stream, size):
@@ -420,6 +538,12 @@ class DateElement(IntegerElement):
         """
         return readDate(stream, size)
 
+    def parseData(self, data, offset, size):
+        """ Type-specific helper function for parsing the element's payload
+            directly from an in-memory buffer (see `MemoryStream`).
+        """
+        return decodeDate(data, offset, size)
+
     @classmethod
     def encodePayload(cls, data, length=None):
         """ Type-specific payload encoder for date elements. """
@@ -431,14 +555,23 @@ class DateElement(IntegerElement):
 
 class BinaryElement(Element):
     """ Base class for an EBML 'binary' element. Schema-specific subclasses
-        are generated when a `Schema` is loaded.
+        are generated when a `Schema` is loaded. For in-memory documents (see
+        `MemoryStream`), the `value` is a read-only `memoryview` of the
+        document's data rather than a `bytearray` copy.
     """
 
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value")
+    __slots__ = ()
 
     def __len__(self):
         return self.size
 
+    def parseData(self, data, offset, size):
+        """ Type-specific helper function for parsing the element's payload
+            directly from an in-memory buffer (see `MemoryStream`). Binary
+            payloads are not copied.
+        """
+        return data[offset:offset+size]
+
 
 # ==============================================================================
 
@@ -448,11 +581,14 @@ class VoidElement(BinaryElement):
         its `value` is always returned as ``0xFF`` times its length. To get
         the actual contents, use `getRawValue()`.
     """
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value")
+    __slots__ = ()
 
     def parse(self, stream, size):
         return bytearray()
 
+    def parseData(self, data, offset, size):
+        return bytearray()
+
     @classmethod
     def encodePayload(cls, data, length=0):
         """ Type-specific payload encoder for Void elements. """
@@ -468,8 +604,7 @@ class UnknownElement(BinaryElement):
         present in a schema. Unlike other elements, each instance has its own
         ID.
     """
-    __slots__ = ("stream", "offset", "size", "sizeLength", "payloadOffset", "_value", "id",
-                 "schema")
+    __slots__ = ("id", "schema")
     name = "UnknownElement"
     precache = False
 
@@ -518,10 +653,29 @@ class MasterElement(Element):
     """ Base class for an EBML 'master' element, a container for other
         elements.
     """
-    __slots__ = ("stream", "offset", "sizeLength", "payloadOffset", "_value",
-                 "_size", "_length")
+    # `size` is a property here, stored in `_size` (see below). Child
+    # elements are cached in `_children` as they are parsed; `_parsePos` is
+    # the offset of the next child to parse (`None` until the end of the last
+    # parsed child is known, if it is 'infinite').
+    __slots__ = ("_size", "_length", "_children", "_parsePos")
     dtype = list
 
+    def __init__(self, stream=None, offset=0, size=0, payloadOffset=0):
+        """ Constructor. Instantiate a new MasterElement from a file. In most
+            cases, elements should be created when a `Document` is loaded,
+            rather than instantiated explicitly.
+
+            @keyword stream: A file-like object containing EBML data.
+            @keyword offset: The element's starting location in the file.
+            @keyword size: The size of the whole element, or `None` if the
+                element is 'infinite'.
+            @keyword payloadOffset: The starting location of the element's
+                payload (i.e. immediately after the element's header).
+        """
+        super(MasterElement, self).__init__(stream, offset, size, payloadOffset)
+        self._children = []
+        self._parsePos = payloadOffset
+
     def parse(self):
         """ Type-specific helper function for parsing the element's payload.
         """
@@ -540,11 +694,15 @@ class MasterElement(Element):
                 cached. For faster iteration when the element value doesn't
                 matter (e.g. counting child elements).
             @return: The parsed element and the offset of the next element
-                (i.e. the end of the parsed element).
+                (i.e. the end of the parsed element), or `None` if the
+                stream ends at or within the element's header.
         """
         offset = stream.tell()
-        eid, idlen = readElementID(stream)
-        esize, sizelen = readElementSize(stream)
+        header = readElementHeader(stream)
+        if header is None:
+            return None
+
+        eid, idlen, esize, sizelen = header
         payloadOffset = offset + idlen + sizelen
 
         try:
@@ -560,6 +718,45 @@ class MasterElement(Element):
 
         return el, payloadOffset + el.size
 
+    def parseElementAt(self, stream, offset, nocache=False):
+        """ Decode the element at the given offset of a `MemoryStream`
+            directly from its buffer, instantiate an `Element` object, and
+            then return it and the offset of the next element. Same as
+            `parseElement()`, without seeking or reading the stream.
+
+            @param stream: The source `MemoryStream`.
+            @param offset: The position of the element in the stream.
+            @keyword nocache: If `True`, the parsed element's `precache`
+                attribute is ignored, and the element's value will not be
+                cached.
+            @return: The parsed element and the offset of the next element
+                (i.e. the end of the parsed element, `None` if the element is
+                'infinite' as its end is only known once its contents have
+                been parsed), or `None` if the data ends at or within the
+                element's header.
+        """
+        data = stream.data
+        header = decodeElementHeader(data, offset)
+        if header is None:
+            return None
+
+        eid, idlen, esize, sizelen = header
+        payloadOffset = offset + idlen + sizelen
+
+        try:
+            etype = self.schema.elements[eid]
+            el = etype(stream, offset, esize, payloadOffset)
+        except KeyError:
+            el = self.schema.UNKNOWN(stream, offset, esize, payloadOffset,
+                                     eid=eid, schema=self.schema)
+
+        if el.precache and not nocache:
+            el._value = el.parseData(data, payloadOffset, el.size)
+
+        if esize is None:
+            return el, None
+        return el, payloadOffset + el.size
+
     @classmethod
     def _isValidChild(cls, elId):
         """ Is the given element ID represent a valid sub-element, i.e.
@@ -578,38 +775,88 @@ class MasterElement(Element):
                 cls._childIds.update(cls.schema.globals)
             return elId in cls._childIds
 
+    def _getPayloadEnd(self):
+        """ Get the offset of the end of the element's payload, or `None` if
+            the element is 'infinite' (in which case it ends at the first
+            invalid child element or the end of the data).
+        """
+        try:
+            return self.payloadOffset + self._size
+        except AttributeError:
+            return None
+
+    def _parseChild(self, pos, nocache=False):
+        """ Parse the child element at the given offset.
+
+            @return: The parsed element and the offset of the next element
+                (`None` if not yet known, see `parseElementAt()`), or `None`
+                at the end of the data.
+        """
+        if isinstance(self.stream, MemoryStream):
+            return self.parseElementAt(self.stream, pos, nocache=nocache)
+
+        self.stream.seek(pos)
+        return self.parseElement(self.stream, nocache=nocache)
+
+    def _parseChildren(self, count=None, nocache=False):
+        """ Parse child elements, continuing after the last one parsed, and
+            cache them. Once all children have been parsed, they become the
+            element's `value`.
+
+            @keyword count: The number of child elements to have parsed
+                (fewer if the element has fewer), or `None` to parse all.
+            @keyword nocache: If `True`, the children's `precache` attribute
+                is ignored, see `parseElement()`.
+        """
+        if self._value is not None:
+            return
+
+        children = self._children
+        payloadEnd = self._getPayloadEnd()
+        pos = self._parsePos
+
+        while count is None or len(children) < count:
+            if pos is None:
+                # The last child is 'infinite'. Its end is only found (by
+                # parsing its contents) once the child after it is needed.
+                pos = children[-1].payloadOffset + children[-1].size
+
+            if payloadEnd is not None and pos >= payloadEnd:
+                break
+
+            parsed = self._parseChild(pos, nocache=nocache)
+            if parsed is None:
+                break
+
+            el, nextPos = parsed
+            if payloadEnd is None and not self._isValidChild(el.id):
+                break
+
+            children.append(el)
+            pos = nextPos
+        else:
+            # Parsed the requested number; there may be more.
+            self._parsePos = pos
+            return
+
+        self._parsePos = pos
+        self._length = len(children)
+        self._value = children
+
     @property
     def size(self):
         """ The element's size. Master elements can be instantiated with this
             as `None`; this denotes an 'infinite' EBML element, and its size
-            will be determined by iterating over its contents until an invalid
-            child type is found, or the end-of-file is reached.
+            will be determined by parsing its contents until an invalid
+            child type is found, or the end-of-file is reached. The parsed
+            children are cached, so they are not parsed again when iterated.
         """
         try:
             return self._size
         except AttributeError:
             # An "infinite" element (size specified in file is all 0xFF)
-            pos = end = self.payloadOffset
-            numChildren = 0
-            while True:
-                self.stream.seek(pos)
-                end = pos
-                try:
-                    # TODO: Cache parsed elements?
-                    el, pos = self.parseElement(self.stream, nocache=True)
-                    if self._isValidChild(el.id):
-                        numChildren += 1
-                    else:
-                        break
-                except TypeError as err:
-                    # Will occur at end of file; message will contain "ord()".
-                    if "ord()" in str(err):
-                        break
-                    # Not the expected EOF TypeError!
-                    raise
-
-            self._size = end - self.payloadOffset
-            self._length = numChildren
+            self._parseChildren()
+            self._size = self._parsePos - self.payloadOffset
             return self._size
 
     @size.setter
@@ -619,23 +866,74 @@ class MasterElement(Element):
             # define it if it's `None`, so `size` will get calculated.
             self._size = esize
 
+    def _getDataEnd(self):
+        """ Get the length of the element's source data.
+        """
+        if isinstance(self.stream, MemoryStream):
+            return len(self.stream.data)
+        pos = self.stream.tell()
+        end = self.stream.seek(0, os.SEEK_END)
+        self.stream.seek(pos)
+        return end
+
+    def _isInfinite(self):
+        """ Is the element 'infinite' (i.e. its size in the data is unknown)?
+            Its `size` is calculated once its contents have been parsed, so
+            this checks the element's header.
+        """
+        if isinstance(self.stream, MemoryStream):
+            header = decodeElementHeader(self.stream.data, self.offset)
+        else:
+            self.stream.seek(self.offset)
+            header = readElementHeader(self.stream)
+        return header[2] is None
+
+    def _getHeaderBytesNeeded(self, pos, dataEnd):
+        """ Get the number of bytes needed to complete the element header at
+            the given offset, see `decoding.getHeaderBytesNeeded()`.
+        """
+        if isinstance(self.stream, MemoryStream):
+            return getHeaderBytesNeeded(self.stream.data, pos, dataEnd)
+        self.stream.seek(pos)
+        header = self.stream.read(12)
+        return getHeaderBytesNeeded(header, 0, len(header))
+
+    def getBytesNeeded(self):
+        """ Get the number of bytes missing from the end of the data to
+            complete the element, e.g. one still being received. This is the
+            remainder of the element (or of its last descendant, for an
+            'infinite' element), or, if the data ends within a child
+            element's header, the bytes needed to complete the header (a
+            minimum, if the length of its size is not yet known).
+
+            @return: The number of bytes needed, 0 if the element is complete.
+        """
+        dataEnd = self._getDataEnd()
+        needed = self.payloadOffset + self.size - dataEnd
+        if needed > 0:
+            return needed
+        if self._parsePos < dataEnd and self._isInfinite():
+            # Parsing may have stopped at a header cut off by the end of
+            # the data, rather than at an invalid child.
+            return self._getHeaderBytesNeeded(self._parsePos, dataEnd)
+        return 0
+
     def __iter__(self, nocache=False):
         """ x.__iter__() <==> iter(x)
+            Child elements are parsed as they are reached and cached, so
+            iterating again does not parse them again.
         """
-        # TODO: Better support for 'infinite' elements (getting the size of
-        # an infinite element iterates over it, so there's duplicated effort.)
-        pos = self.payloadOffset
-        payloadEnd = pos + self.size
-
-        while pos < payloadEnd:
-            self.stream.seek(pos)
-            try:
-                el, pos = self.parseElement(self.stream, nocache=nocache)
-                yield el
-            except TypeError as err:
-                if "ord()" in str(err):
-                    break
-                raise
+        children = self._children
+        idx = 0
+        while True:
+            if idx >= len(children):
+                if self._value is not None:
+                    return
+                self._parseChildren(idx + 1, nocache=nocache)
+                if idx >= len(children):
+                    return
+            yield children[idx]
+            idx += 1
 
     def __len__(self):
         """ x.__len__() <==> len(x)
@@ -643,27 +941,27 @@ class MasterElement(Element):
         try:
             return self._length
         except AttributeError:
-            if self._value is not None:
-                self._length = len(self._value)
-            else:
-                n = 0  # In case there's nothing to enumerate
-                for n, _el in enumerate(self.__iter__(nocache=True), 1):
-                    pass
-                self._length = n
+            self._parseChildren(nocache=True)
         return self._length
 
     @property
     def value(self):
         """ Parse and cache the element's value.
         """
-        if self._value is not None:
-            return self._value
-        self._value = list(self)
+        if self._value is None:
+            self._parseChildren()
         return self._value
 
-    def __getitem__(self, *args):
-        # TODO: Parse only the requested item(s), like `Document`
-        return self.value.__getitem__(*args)
+    def __getitem__(self, idx):
+        """ Get a child element by index. Only the children up to a
+            (positive) index are parsed.
+        """
+        if isinstance(idx, int) and idx >= 0:
+            self._parseChildren(idx + 1)
+            if idx < len(self._children):
+                return self._children[idx]
+            raise IndexError("list index out of range")
+        return self.value.__getitem__(idx)
 
     # ==========================================================================
     # Caching (experimental!)
@@ -671,13 +969,16 @@ class MasterElement(Element):
 
     def gc(self, recurse=False):
         """ Clear any cached values. To save memory and/or force values to be
-            re-read from the file.
+            re-read from the file. Returns the number of cached values cleared.
         """
         cleared = 0
-        if self._value is not None:
+        if self._children:
             if recurse:
-                cleared = sum(ch.gc(recurse) for ch in self._value) + 1
-            self._value = None
+                cleared = sum(ch.gc(recurse) for ch in self._children)
+            cleared += 1
+            self._children = []
+        self._parsePos = self.payloadOffset
+        self._value = None
         return cleared
 
     # ==========================================================================
@@ -763,6 +1064,7 @@ class Document(MasterElement):
     """ Base class for an EBML document, containing multiple 'root' elements.
         Loading a `Schema` generates a subclass.
     """
+    __slots__ = ("id", "name", "filename", "_ownsStream", "_info", "_roots")
 
     def __init__(self, stream, name=None, size=None, headers=True):
         """ Constructor. Instantiate a `Document` from a file-like stream.
@@ -790,6 +1092,12 @@ class Document(MasterElement):
                     hasattr(stream, 'seek'))):
             raise TypeError('Object %r does not have the necessary stream methods' % stream)
 
+        if isinstance(stream, BytesIO):
+            # In-memory data: decode the elements directly from the buffer
+            # rather than seeking and reading. Note: the `BytesIO` cannot be
+            # resized while the buffer is in use.
+            stream = MemoryStream(stream.getbuffer(), stream.tell())
+
         self._value = None
         self.stream = stream
         self.size = size
@@ -797,6 +1105,11 @@ class Document(MasterElement):
         self.id = None  # Not applicable to Documents.
         self.offset = self.payloadOffset = self.stream.tell()
 
+        # Root elements, cached in order and by offset as they are parsed.
+        self._children = []
+        self._parsePos = self.payloadOffset
+        self._roots = {}
+
         try:
             self.filename = stream.name
         except AttributeError:
@@ -810,26 +1123,59 @@ class Document(MasterElement):
 
         if size is None:
             # Note: this doesn't work for cStringIO!
-            if isinstance(stream, BytesIO):
-                self.size = len(stream.getvalue())
+            if isinstance(stream, MemoryStream):
+                self.size = len(stream.data)
             elif self.filename and os.path.exists(self.filename):
                 self.size = os.path.getsize(self.stream.name)
 
-        self.info = {}
+        self._info = None
+
+        if not headers:
+            # The position of the first root element depends on the header,
+            # so it must be read now. Otherwise, it is read when first used.
+            self._readHeaders(headers)
+
+    def _readHeaders(self, headers=True):
+        """ Read the EBML header element (if present) into the Document's
+            `info` attribute.
+
+            @keyword headers: If `False`, the ``EBML`` header element will not
+                appear as a root element in the document.
+        """
+        self._info = {}
 
         try:
             # Attempt to read the first element, which should be an EBML header.
-            el, pos = self.parseElement(self.stream)
+            parsed = self._parseChild(self.offset)
+            if parsed is None:
+                # No data.
+                return
+
+            el, pos = parsed
             if el.name == "EBML":
                 # Load 'header' info from the file
-                self.info = el.dump()
+                self._info = el.dump()
                 if not headers:
-                    self.payloadOffset = pos
+                    self.payloadOffset = self._parsePos = pos
         except:
             # Failed to read the first element. Don't raise here; do that when
             # the Document is actually used.
             pass
 
+    @property
+    def info(self):
+        """ The contents of the document's ``EBML`` header element, as a
+            dictionary. Read when first used, so documents that are only
+            iterated do not parse their header twice.
+        """
+        if self._info is None:
+            self._readHeaders()
+        return self._info
+
+    @info.setter
+    def info(self, info):
+        self._info = info
+
     def __repr__(self):
         """ "x.__repr__() <==> repr(x) """
         if self.name == self.__class__.__name__:
@@ -855,36 +1201,46 @@ class Document(MasterElement):
         if self._ownsStream:
             self.stream.close()
 
-    def __len__(self):
-        """ x.__len__() <==> len(x)
-            Not recommended for huge documents.
+    def _getPayloadEnd(self):
+        """ Get the offset of the end of the document's root elements. They
+            are read until the end of the data.
+        """
+        return sys.maxsize
+
+    def _parseChild(self, pos, nocache=False):
+        """ Parse the root element at the given offset, or get it from the
+            cache if it has already been parsed.
+
+            @return: The parsed element and the offset of the next element,
+                or `None` at the end of the data.
         """
         try:
-            return self._length
-        except AttributeError:
-            n = 0  # in case there's nothing to enumerate
-            for n, _el in enumerate(self.__iter__(nocache=True), 1):
-                pass
-            self._length = n
-        return self._length
+            el = self._roots[pos]
+        except KeyError:
+            pass
+        else:
+            if isinstance(el, MasterElement):
+                return el, el._getPayloadEnd()
+            return el, el.payloadOffset + el.size
 
-    def __iter__(self, nocache=False):
-        """ Iterate root elements.
+        parsed = super(Document, self)._parseChild(pos, nocache=nocache)
+        if parsed is not None:
+            self._roots[pos] = parsed[0]
+        return parsed
+
+    def getBytesNeeded(self):
+        """ Get the number of bytes missing from the end of the data to
+            complete the document's last root element, e.g. for a document
+            still being received. See `MasterElement.getBytesNeeded()`.
+
+            @return: The number of bytes needed, 0 if the document is
+                complete.
         """
-        # TODO: Cache root elements, prevent unnecessary duplicates. Maybe a
-        # dict keyed by offset?
-        pos = self.payloadOffset
-        while True:
-            self.stream.seek(pos)
-            try:
-                el, pos = self.parseElement(self.stream, nocache=nocache)
-                yield el
-            except TypeError as err:
-                # Occurs at end of file (parsing 0 length string), it's okay.
-                if "ord()" not in str(err):
-                    # (Apparently) not the TypeError raised at EOF!
-                    raise
-                break
+        self._parseChildren(nocache=True)
+        dataEnd = self._getDataEnd()
+        if self._parsePos < dataEnd:
+            return self._getHeaderBytesNeeded(self._parsePos, dataEnd)
+        return self._parsePos - dataEnd
 
     @property
     def value(self):
@@ -895,25 +1251,23 @@ class Document(MasterElement):
         return iter(self)
 
     def __getitem__(self, idx):
-        """ Get one of the document's root elements by index.
-        """
-        # TODO: Cache parsed root elements, handle indexing dynamically.
-        if isinstance(idx, int):
-            if idx < 0:
-                raise IndexError("Negative indices in a Document not (yet) supported")
-            n = None
-            for n, el in enumerate(self):
-                if n == idx:
-                    return el
-            if n is None:
-                # If object being enumerated is empty, `n` is never set.
-                raise IndexError("Document contained no readable data")
-            raise IndexError("list index out of range (0-%d)" % n)
-        elif isinstance(idx, slice):
-            raise IndexError("Document root slicing not (yet) supported")
+        """ Get one of the document's root elements by index. Only the root
+            elements up to a (positive) index are parsed.
+        """
+        if isinstance(idx, int) and idx >= 0:
+            self._parseChildren(idx + 1)
+        elif isinstance(idx, (int, slice)):
+            self._parseChildren()
         else:
             raise TypeError("list indices must be integers, not %s" % type(idx))
 
+        children = self._children
+        if isinstance(idx, int) and not -len(children) <= idx < len(children):
+            if not children:
+                raise IndexError("Document contained no readable data")
+            raise IndexError("list index out of range (0-%d)" % (len(children) - 1))
+        return children[idx]
+
     @property
     def version(self):
         """ The document's type version (i.e. the EBML ``DocTypeVersion``). """
@@ -929,8 +1283,11 @@ class Document(MasterElement):
     # ==========================================================================
 
     def gc(self, recurse=False):
-        # TODO: Implement this if/when caching of root elements is implemented.
-        return 0
+        """ Clear the cached root elements (and, if `recurse`, their cached
+            children and values). Returns the number of cached values cleared.
+        """
+        self._roots = {}
+        return super(Document, self).gc(recurse)
 
     # ==========================================================================
     # Encoding
@@ -1088,7 +1445,8 @@ class Schema(object):
             el = self.elementsByName['Void']
             void = type('VoidElement', (VoidElement,),
                         {'id': el.id, 'name': 'Void', 'schema': self,
-                         'mandatory': el.mandatory, 'multiple': el.multiple})
+                         'mandatory': el.mandatory, 'multiple': el.multiple,
+                         '__slots__': ()})
             self.elements[el.id] = void
             self.elementsByName['Void'] = void
 
@@ -1097,7 +1455,8 @@ class Schema(object):
 
         # Create the schema's Document subclass.
         self.document = type('%sDocument' % self.name.title(), (Document,),
-                             {'schema': self, 'children': self.children})
+                             {'schema': self, 'children': self.children,
+                              '__slots__': ()})
 
     def _parseLegacySchema(self, schema):
         """ Parse a legacy python-ebml schema XML file.
@@ -1266,7 +1625,7 @@ class Schema(object):
                            'mandatory': mandatory, 'multiple': multiple,
                            'precache': precache, 'length': length,
                            'children': dict(), '__doc__': docs,
-                           '__slots__': baseClass.__slots__})
+                           '__slots__': ()})
 
             self.elements[eid] = eclass
             self.elementInfo[eid] = attribs
@@ -1334,13 +1693,16 @@ class Schema(object):
     def loads(self, data, name=None):
         """ Load EBML from a string using this Schema.
 
-            @param data: A string or bytearray containing raw EBML data.
+            @param data: A `bytes`, `bytearray` or `memoryview` (or any other
+                object supporting the buffer protocol) containing raw EBML
+                data. It is not copied, so must not be modified while the
+                document is in use.
             @keyword name: The name of the document. Defaults to the Schema's
                 document class name.
         """
         # Below updated to add EBML headers to first fragement
         #return self.load(BytesIO(data), name=name)
-        return self.load(BytesIO(data), name=name, headers=True)
+        return self.load(MemoryStream(data), name=name, headers=True)
 
     def __call__(self, fp, name=None):
         """ Load an EBML file using this Schema. Same as `Schema.load()`.
@@ -10,8 +10,12 @@ __author__ = "David Randall Stokes, Connor Flanigan"
 __copyright__ = "Copyright 2021, Mide Technology Corporation"
 __credits__ = "David Randall Stokes, Connor Flanigan, Becker Awqatty, Derek Witt"
 
-__all__ = ['readElementID', 'readElementSize', 'readFloat', 'readInt',
-           'readUInt', 'readDate', 'readString', 'readUnicode']
+__all__ = ['readElementID', 'readElementSize', 'readElementHeader',
+           'readFloat', 'readInt', 'readUInt', 'readDate', 'readString',
+           'readUnicode', 'decodeElementID', 'decodeElementSize',
+           'decodeElementHeader', 'getHeaderBytesNeeded', 'decodeFloat',
+           'decodeInt', 'decodeUInt', 'decodeDate', 'decodeString',
+           'decodeUnicode']
 
 from datetime import datetime, timedelta
 import struct
@@ -36,6 +40,8 @@ _struct_uint64_unpack_from = _struct_uint64.unpack_from
 _struct_int64_unpack_from = _struct_int64.unpack_from
 _struct_float32_unpack = _struct_float32.unpack
 _struct_float64_unpack = _struct_float64.unpack
+_struct_float32_unpack_from = _struct_float32.unpack_from
+_struct_float64_unpack_from = _struct_float64.unpack_from
 
 
 # ==============================================================================
@@ -126,6 +132,37 @@ def readElementSize(stream):
     return size, length
 
 
+def readElementHeader(stream):
+    """ Read an element header (ID and size) from a file (or file-like
+        stream), checking for the end of the data rather than failing on an
+        empty read.
+
+        @param stream: The source file-like object.
+        @return: The decoded element ID, its length in bytes, the decoded
+            size (or `None`) and the length of the size descriptor, or `None`
+            if the data ends at or within the header.
+        @raise IOError: raised if the length of the ID of an element is greater than 4 bytes.
+    """
+    header = stream.read(1)
+    if not header:
+        return None
+
+    idlen, _ = decodeIDLength(header[0])
+
+    # The rest of the ID and the first byte of the size.
+    header += stream.read(idlen)
+    if len(header) <= idlen:
+        return None
+
+    sizelen, _ = decodeIntLength(header[idlen])
+    if sizelen > 1:
+        header += stream.read(sizelen - 1)
+        if len(header) < idlen + sizelen:
+            return None
+
+    return decodeElementHeader(header, 0)
+
+
 def readUInt(stream, size):
     """ Read an unsigned integer from a file (or file-like stream).
 
@@ -231,3 +268,233 @@ def readDate(stream, size=8):
     nanoseconds = _struct_int64_unpack(data)[0]
     delta = timedelta(microseconds=(nanoseconds // 1000))
     return datetime(2001, 1, 1, tzinfo=None) + delta
+
+
+# ==============================================================================
+# --- Decoding from buffers
+# ==============================================================================
+
+# These functions decode directly from an in-memory buffer (`bytes`,
+# `bytearray` or `memoryview`) at an integer offset, rather than reading from
+# a file-like stream. They avoid a `read()` (and the resulting copy) per field
+# and are used for `Document` objects loaded from in-memory data.
+
+def decodeElementID(data, offset):
+    """ Decode an element ID from a buffer.
+
+        @param data: The source buffer.
+        @param offset: The position of the ID in the buffer.
+        @return: The decoded element ID and its length in bytes.
+        @raise IOError: raised if the length of the ID of an element is greater than 4 bytes.
+        @raise IndexError: raised if `offset` is past the end of the buffer.
+    """
+    eid = data[offset]
+    if eid >= 128:
+        # Class A (single byte) ID, the most common.
+        return eid, 1
+
+    length, eid = decodeIDLength(eid)
+    if length > 4:
+        raise IOError('Cannot decode element ID with length > 4.')
+    return int.from_bytes(data[offset:offset+length], 'big'), length
+
+
+def decodeElementSize(data, offset):
+    """ Decode an element size from a buffer.
+
+        @param data: The source buffer.
+        @param offset: The position of the size descriptor in the buffer.
+        @return: The decoded size (or `None`) and the length of the
+            descriptor in bytes.
+        @raise IndexError: raised if `offset` is past the end of the buffer.
+    """
+    size = data[offset]
+    if size >= 128:
+        # Single byte size, the most common.
+        size &= 0b1111111
+        if size == 0b1111111:
+            # EBML 'unknown' size, all bytes 0xFF
+            return None, 1
+        return size, 1
+    elif size >= 64:
+        # Two byte size, e.g. most audio blocks.
+        size = ((size & 0b111111) << 8) | data[offset+1]
+        if size == 0x3FFF:
+            return None, 2
+        return size, 2
+
+    length, _ = decodeIntLength(size)
+    marker = 1 << (7 * length)
+    # Remove the length marker bit from the big-endian value.
+    size = int.from_bytes(data[offset:offset+length], 'big') ^ marker
+
+    if size == marker - 1:
+        # EBML 'unknown' size, all bytes 0xFF
+        size = None
+
+    return size, length
+
+
+def decodeElementHeader(data, offset, end=None):
+    """ Decode an element header (ID and size) from a buffer, checking that
+        the whole header is within the data.
+
+        @param data: The source buffer.
+        @param offset: The position of the element in the buffer.
+        @keyword end: The end of the data in the buffer. Defaults to the
+            length of the buffer.
+        @return: The decoded element ID, its length in bytes, the decoded
+            size (or `None`) and the length of the size descriptor, or `None`
+            if the data ends at or within the header (see
+            `getHeaderBytesNeeded()`).
+        @raise IOError: raised if the length of the ID of an element is greater than 4 bytes.
+    """
+    if end is None:
+        end = len(data)
+
+    # A header is at most 12 bytes (4 byte ID, 8 byte size), so only check
+    # the lengths of headers near the end of the data.
+    if offset + 12 > end:
+        if offset >= end:
+            return None
+        idlen, _ = decodeIDLength(data[offset])
+        if offset + idlen >= end:
+            return None
+        sizelen, _ = decodeIntLength(data[offset + idlen])
+        if offset + idlen + sizelen > end:
+            return None
+
+    eid, idlen = decodeElementID(data, offset)
+    size, sizelen = decodeElementSize(data, offset + idlen)
+    return eid, idlen, size, sizelen
+
+
+def getHeaderBytesNeeded(data, offset, end=None):
+    """ Get the number of bytes missing from the end of a buffer to complete
+        an element header, e.g. of data still being received. The length of
+        a size descriptor is encoded in its first byte, so if that is
+        missing, the size is counted as one byte (i.e. the result is the
+        minimum needed).
+
+        @param data: The source buffer.
+        @param offset: The position of the element in the buffer.
+        @keyword end: The end of the data in the buffer. Defaults to the
+            length of the buffer.
+        @return: The number of bytes needed, 0 if the header is complete.
+        @raise IOError: raised if the length of the ID of an element is greater than 4 bytes.
+    """
+    if end is None:
+        end = len(data)
+
+    if offset >= end:
+        # At least one byte each of ID and size.
+        return offset + 2 - end
+
+    idlen, _ = decodeIDLength(data[offset])
+    sizeOffset = offset + idlen
+    if sizeOffset >= end:
+        return sizeOffset + 1 - end
+
+    sizelen, _ = decodeIntLength(data[sizeOffset])
+    return max(0, sizeOffset + sizelen - end)
+
+
+def decodeUInt(data, offset, size):
+    """ Decode an unsigned integer from a buffer.
+
+        @param data: The source buffer.
+        @param offset: The position of the value in the buffer.
+        @param size: The number of bytes to decode.
+        @return: The decoded value.
+    """
+    if size == 0:
+        return 0
+
+    return int.from_bytes(data[offset:offset+size], 'big')
+
+
+def decodeInt(data, offset, size):
+    """ Decode a signed integer from a buffer.
+
+        @param data: The source buffer.
+        @param offset: The position of the value in the buffer.
+        @param size: The number of bytes to decode.
+        @return: The decoded value.
+    """
+    if size == 0:
+        return 0
+
+    return int.from_bytes(data[offset:offset+size], 'big', signed=True)
+
+
+def decodeFloat(data, offset, size):
+    """ Decode a floating point value from a buffer.
+
+        @param data: The source buffer.
+        @param offset: The position of the value in the buffer.
+        @param size: The number of bytes to decode.
+        @return: The decoded value.
+        @raise IOError: raised if the length of this floating point number is not
+            valid (0, 4, 8 bytes)
+    """
+    if size == 4:
+        return _struct_float32_unpack_from(data, offset)[0]
+    elif size == 8:
+        return _struct_float64_unpack_from(data, offset)[0]
+    elif size == 0:
+        return 0.0
+
+    raise IOError("Cannot read floating point value of length %s; "
+                  "only lengths of 0, 4, or 8 bytes supported." % size)
+
+
+def decodeString(data, offset, size):
+    """ Decode an ASCII string from a buffer.
+
+        @param data: The source buffer.
+        @param offset: The position of the value in the buffer.
+        @param size: The number of bytes to decode.
+        @return: The decoded value.
+    """
+    if size == 0:
+        return u''
+
+    value = bytes(data[offset:offset+size]).partition(b'\x00')[0]
+
+    try:
+        return str(value, 'ascii')
+    except UnicodeDecodeError as ex:
+        warnings.warn(str(ex), UnicodeWarning)
+        return str(value, 'ascii', 'replace')
+
+
+def decodeUnicode(data, offset, size):
+    """ Decode an UTF-8 encoded string from a buffer.
+
+        @param data: The source buffer.
+        @param offset: The position of the value in the buffer.
+        @param size: The number of bytes to decode.
+        @return: The decoded value.
+    """
+    if size == 0:
+        return u''
+
+    value = bytes(data[offset:offset+size]).partition(b'\x00')[0]
+    return str(value, 'utf_8')
+
+
+def decodeDate(data, offset, size=8):
+    """ Decode an EBML encoded date (nanoseconds since UTC 2001-01-01T00:00:00)
+        from a buffer.
+
+        @param data: The source buffer.
+        @param offset: The position of the value in the buffer.
+        @param size: The number of bytes to decode.
+        @return: The decoded value (as `datetime.datetime`).
+        @raise IOError: raised if the length of the date is not 8 bytes.
+    """
+    if size != 8:
+        raise IOError("Cannot read date value of length %d, only 8." % size)
+    nanoseconds = _struct_int64_unpack_from(data, offset)[0]
+    delta = timedelta(microseconds=(nanoseconds // 1000))
+    return datetime(2001, 1, 1, tzinfo=None) + delta
@@ -0,0 +1,396 @@
+"""
+An array-backed, read-only 'flat' representation of in-memory EBML data.
+
+A `FlatDocument` holds the header of every element in parallel arrays (ID,
+offset, size, payload offset, parent, and the index following the element's
+last descendant), filled in a single pass over the data, rather than as one
+`Element` object per element. Elements are accessed through lightweight
+`FlatElement` proxies, created on demand. This suits documents with many
+elements that are crawled rather than kept, e.g. video fragments with
+thousands of ``SimpleBlock`` elements.
+
+Values are decoded by the element classes of the `Schema`, so they are the
+same as those of a `Document` loaded with `Schema.loads()`.
+
+Example:
+
+    doc = FlatDocument(schema, data)
+    for block in doc.findAll(schema['SimpleBlock'].id):
+        payload = block.getRawValue()
+"""
+
+__all__ = ['FlatDocument', 'FlatElement', 'memoryReport']
+
+from array import array
+import sys
+
+from .core import Dict, MasterElement, MemoryStream
+from .decoding import decodeElementHeader
+
+# ==============================================================================
+#
+# ==============================================================================
+
+
+class FlatElement(object):
+    """ A lightweight proxy for an element of a `FlatDocument`, by index.
+        Provides the read-only parts of the `Element` interface.
+    """
+    __slots__ = ("document", "index")
+
+    def __init__(self, document, index):
+        """ Constructor. In most cases, elements should be obtained from
+            their `FlatDocument`, rather than instantiated explicitly.
+
+            @param document: The `FlatDocument` containing the element.
+            @param index: The element's index in the document's arrays.
+        """
+        self.document = document
+        self.index = index
+
+    def __repr__(self):
+        return "<Flat%s (ID:0x%02X), offset %s, size %s>" % \
+            (self.name, self.id, self.offset, self.size)
+
+    def __eq__(self, other):
+        try:
+            return self.document is other.document and self.index == other.index
+        except AttributeError:
+            return False
+
+    def __hash__(self):
+        return hash((id(self.document), self.index))
+
+    @property
+    def id(self):
+        """ The element's EBML ID. """
+        return self.document.ids[self.index]
+
+    @property
+    def type(self):
+        """ The element's class in the document's `Schema`. """
+        return self.document.getType(self.document.ids[self.index])
+
+    @property
+    def name(self):
+        """ The element's name. """
+        return self.type.name
+
+    @property
+    def offset(self):
+        """ The element's starting location in the data. """
+        return self.document.offsets[self.index]
+
+    @property
+    def size(self):
+        """ The size of the element's payload. """
+        return self.document.sizes[self.index]
+
+    @property
+    def payloadOffset(self):
+        """ The starting location of the element's payload. """
+        return self.document.payloadOffsets[self.index]
+
+    @property
+    def parent(self):
+        """ The element's parent `FlatElement`, or `None` for root elements.
+        """
+        parent = self.document.parents[self.index]
+        if parent < 0:
+            return None
+        return FlatElement(self.document, parent)
+
+    def __iter__(self):
+        """ Iterate the element's child elements. """
+        return self.document._iterChildren(self.index + 1,
+                                           self.document.ends[self.index])
+
+    def __len__(self):
+        """ The number of child elements. """
+        return sum(1 for _el in self)
+
+    def __getitem__(self, idx):
+        """ Get one of the element's children by index. """
+        return self.document._getChild(self, idx)
+
+    def getElement(self):
+        """ Create a full `Element` object for this element, e.g. for use with
+            functions that require one.
+        """
+        return self.document._createElement(self.index)
+
+    @property
+    def value(self):
+        """ The element's value. A list of children for master elements.
+            Not cached; each use decodes the value again.
+        """
+        if issubclass(self.type, MasterElement):
+            return list(self)
+        return self.getElement().value
+
+    def getRaw(self):
+        """ Get the element's raw binary data, including EBML headers, as a
+            `memoryview` of the document's data.
+        """
+        return self.document.stream.data[self.offset:self.payloadOffset+self.size]
+
+    def getRawValue(self):
+        """ Get the raw binary of the element's value, as a `memoryview` of
+            the document's data.
+        """
+        payloadOffset = self.payloadOffset
+        return self.document.stream.data[payloadOffset:payloadOffset+self.size]
+
+    def dump(self):
+        """ Dump this element's value as nested dictionaries, keyed by
+            element name. Same as `MasterElement.dump()`, binary values are
+            copied to `bytes`.
+        """
+        if not issubclass(self.type, MasterElement):
+            value = self.value
+            if isinstance(value, memoryview):
+                return value.tobytes()
+            return value
+        result = Dict()
+        for el in self:
+            if el.type.multiple:
+                result.setdefault(el.name, []).append(el.dump())
+            else:
+                result[el.name] = el.dump()
+        return result
+
+
+# ==============================================================================
+
+
+class FlatDocument(object):
+    """ An EBML document loaded from in-memory data into parallel arrays of
+        element headers. All elements are parsed when the document is
+        created. Index ``i`` of each array describes the ``i``th element, in
+        the order they appear in the data.
+
+        @ivar ids: The elements' EBML IDs.
+        @ivar offsets: The elements' starting locations in the data.
+        @ivar sizes: The sizes of the elements' payloads ('infinite' master
+            elements are given the size of their parsed contents).
+        @ivar payloadOffsets: The starting locations of the elements'
+            payloads.
+        @ivar parents: The index of each element's parent, or -1 for root
+            elements.
+        @ivar ends: The index following each element's last descendant (i.e.
+            of its next sibling, if any).
+    """
+    __slots__ = ("schema", "stream", "name", "ids", "offsets", "sizes",
+                 "payloadOffsets", "parents", "ends")
+
+    def __init__(self, schema, data, name=None):
+        """ Constructor.
+
+            @param schema: The `Schema` of the data.
+            @param data: A `bytes`, `bytearray` or `memoryview` (or any other
+                object supporting the buffer protocol) containing raw EBML
+                data. It is not copied, so must not be modified while the
+                document is in use.
+            @keyword name: The name of the document. Defaults to the Schema's
+                document class name.
+        """
+        self.schema = schema
+        self.stream = MemoryStream(data)
+        self.name = name or schema.document.__name__
+
+        self.ids = array('I')
+        self.offsets = array('q')
+        self.sizes = array('q')
+        self.payloadOffsets = array('q')
+        self.parents = array('q')
+        self.ends = array('q')
+
+        self._parse()
+
+    def __repr__(self):
+        return "<%s %r, %d elements>" % (self.__class__.__name__, self.name,
+                                         len(self.ids))
+
+    def _parse(self):
+        """ Parse the headers of all the elements into the arrays.
+        """
+        data = self.stream.data
+        dataEnd = len(data)
+        elements = self.schema.elements
+        unknown = self.schema.UNKNOWN
+
+        ids = self.ids
+        offsets = self.offsets
+        sizes = self.sizes
+        payloadOffsets = self.payloadOffsets
+        parents = self.parents
+        ends = self.ends
+
+        # The open master elements: (index, end of payload, element type). The
+        # end is `None` for 'infinite' elements, which end at the first
+        # element that is not a valid child.
+        masters = []
+
+        def close(pos):
+            idx, _end, _etype = masters.pop()
+            if sizes[idx] < 0:
+                sizes[idx] = pos - payloadOffsets[idx]
+            ends[idx] = len(ids)
+
+        pos = 0
+        while pos < dataEnd:
+            while masters and masters[-1][1] is not None and pos >= masters[-1][1]:
+                close(pos)
+
+            header = decodeElementHeader(data, pos, dataEnd)
+            if header is None:
+                # Truncated element header at the end of the data.
+                break
+            eid, idlen, esize, sizelen = header
+
+            while (masters and masters[-1][1] is None
+                   and not masters[-1][2]._isValidChild(eid)):
+                close(pos)
+
+            etype = elements.get(eid, unknown)
+            payloadOffset = pos + idlen + sizelen
+            idx = len(ids)
+
+            ids.append(eid)
+            offsets.append(pos)
+            payloadOffsets.append(payloadOffset)
+            parents.append(masters[-1][0] if masters else -1)
+            ends.append(idx + 1)
+
+            if issubclass(etype, MasterElement):
+                if esize is None:
+                    sizes.append(-1)
+                    masters.append((idx, None, etype))
+                else:
+                    sizes.append(esize)
+                    masters.append((idx, payloadOffset + esize, etype))
+                pos = payloadOffset
+            elif esize is None:
+                raise IOError("Element 0x%X at offset %d has an unknown size, "
+                              "which is only valid for master elements" % (eid, pos))
+            else:
+                sizes.append(esize)
+                pos = payloadOffset + esize
+
+        while masters:
+            close(pos)
+
+    def getType(self, eid):
+        """ Get the `Element` class of an ID from the document's `Schema`.
+        """
+        try:
+            return self.schema.elements[eid]
+        except KeyError:
+            return self.schema.UNKNOWN
+
+    def _createElement(self, idx):
+        """ Create a full `Element` object for the element at an index.
+        """
+        eid = self.ids[idx]
+        etype = self.getType(eid)
+        args = (self.stream, self.offsets[idx], self.sizes[idx],
+                self.payloadOffsets[idx])
+        if eid in self.schema.elements:
+            return etype(*args)
+        return etype(*args, eid=eid, schema=self.schema)
+
+    def _iterChildren(self, start, end):
+        """ Iterate the elements between two indices that are children of the
+            same parent (i.e. skipping the descendants of each).
+        """
+        ends = self.ends
+        idx = start
+        while idx < end:
+            yield FlatElement(self, idx)
+            idx = ends[idx]
+
+    def _getChild(self, parent, idx):
+        """ Get a child of a `FlatElement` or `FlatDocument` by index.
+        """
+        if not isinstance(idx, int):
+            raise TypeError("list indices must be integers, not %s" % type(idx))
+        if idx < 0:
+            return list(parent)[idx]
+        for n, el in enumerate(parent):
+            if n == idx:
+                return el
+        raise IndexError("list index out of range")
+
+    def __iter__(self):
+        """ Iterate the document's root elements. """
+        return self._iterChildren(0, len(self.ids))
+
+    def __len__(self):
+        """ The number of root elements. """
+        return sum(1 for _el in self)
+
+    def __getitem__(self, idx):
+        """ Get one of the document's root elements by index. """
+        return self._getChild(self, idx)
+
+    def findAll(self, eid):
+        """ Iterate all elements with a given ID, at any depth, in the order
+            they appear in the data.
+
+            @param eid: The EBML ID of the elements, or the element name.
+        """
+        if isinstance(eid, str):
+            eid = self.schema[eid].id
+        ids = self.ids
+        for idx in range(len(ids)):
+            if ids[idx] == eid:
+                yield FlatElement(self, idx)
+
+    @property
+    def nbytes(self):
+        """ The memory used by the document's arrays, in bytes. """
+        return sum(sys.getsizeof(a) for a in (self.ids, self.offsets,
+                                              self.sizes, self.payloadOffsets,
+                                              self.parents, self.ends))
+
+
+# ==============================================================================
+#
+# ==============================================================================
+
+def memoryReport(schema, data):
+    """ Compare the memory used to hold the element structure of in-memory
+        EBML data as a fully parsed `Document` (every element object and
+        child list) and as a `FlatDocument` (its arrays). Element values are
+        not included.
+
+        @param schema: The `Schema` of the data.
+        @param data: The raw EBML data.
+        @return: A dictionary with the number of ``elements``, the bytes used
+            by the ``document`` and the ``flat`` document, and the bytes
+            ``saved``.
+    """
+    def _crawl(el):
+        count, nbytes = 0, 0
+        for child in el:
+            count += 1
+            nbytes += sys.getsizeof(child)
+            if isinstance(child, MasterElement):
+                nbytes += sys.getsizeof(child.value)
+                childCount, childBytes = _crawl(child)
+                count += childCount
+                nbytes += childBytes
+        return count, nbytes
+
+    doc = schema.loads(data)
+    roots = list(doc)
+    count, documentBytes = _crawl(roots)
+    documentBytes += sys.getsizeof(doc) + sys.getsizeof(roots)
+
+    flat = FlatDocument(schema, data)
+    flatBytes = sys.getsizeof(flat) + flat.nbytes
+
+    return {'elements': count,
+            'document': documentBytes,
+            'flat': flatBytes,
+            'saved': documentBytes - flatBytes}
@@ -0,0 +1,187 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This class provides voice activity detection (VAD) for 16 bit PCM audio tracks such as the AWS Connect
+AUDIO_TO_CUSTOMER and AUDIO_FROM_CUSTOMER tracks, so silence can be marked or dropped before the audio is sent
+on to (paid) speech recognition.
+
+The audio is split into 20 ms frames and a frame is voiced when its energy is above a threshold and its
+zero-crossing rate is below a maximum (low energy or noise-like frames are silence). Voiced frames extend over the
+following hangover frames so word endings and short pauses are not clipped. Each fragment's samples are processed
+at once in vectorized form with NumPy, which is required.
+
+Keep one detector per track: samples of an incomplete frame and the hangover are carried over to the next fragment.
+
+Example:
+
+    vad = KvsVoiceActivityDetector()
+    track_audio = kvs_fragment_processor.get_aws_connect_audio_ndarray(fragment_dom, fragment_bytes)
+    voiced_samples = vad.drop_silence(track_audio['track_1']['samples'])
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import logging
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional for the library but required by the KvsVoiceActivityDetector.
+    np = None
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# Defaults for AWS Connect audio (8 kHz) in 20 ms frames.
+DEFAULT_SAMPLE_RATE = 8000
+DEFAULT_FRAME_DURATION = 0.02
+DEFAULT_ENERGY_THRESHOLD_DB = -45.0
+DEFAULT_MAX_ZERO_CROSSING_RATE = 0.5
+DEFAULT_HANGOVER_FRAMES = 10
+
+# Energy of a full scale int16 sine, the 0 dBFS reference.
+FULL_SCALE_ENERGY = (32768.0 ** 2) / 2
+
+
+class KvsVoiceActivityDetector():
+
+    def __init__(self,
+                sample_rate=DEFAULT_SAMPLE_RATE,
+                frame_duration=DEFAULT_FRAME_DURATION,
+                energy_threshold_db=DEFAULT_ENERGY_THRESHOLD_DB,
+                max_zero_crossing_rate=DEFAULT_MAX_ZERO_CROSSING_RATE,
+                hangover_frames=DEFAULT_HANGOVER_FRAMES):
+        '''
+            Initialize the voice activity detector for a single audio track.
+
+            ### Parameters:
+
+                **sample_rate**: int
+                    Samples per second of the track.
+
+                **frame_duration**: float
+                    Seconds per VAD frame.
+
+                **energy_threshold_db**: float
+                    Minimum frame energy for speech, in dB relative to a full scale sine.
+
+                **max_zero_crossing_rate**: float
+                    Maximum fraction of samples changing sign for speech, frames above are taken to be noise.
+
+                **hangover_frames**: int
+                    Number of frames kept voiced after the last frame detected as voiced.
+        '''
+        if np is None:
+            raise ImportError('NumPy is required for the KvsVoiceActivityDetector')
+
+        self.frame_length = int(sample_rate * frame_duration)
+        self.energy_threshold = FULL_SCALE_ENERGY * (10.0 ** (energy_threshold_db / 10.0))
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+        self.hangover_frames = hangover_frames
+
+        # Samples of the incomplete frame, the odd trailing byte of bytes-like samples and the detections of the last
+        # hangover_frames from the previous call.
+        self._pending_samples = np.empty(0, dtype=np.int16)
+        self._pending_byte = b''
+        self._previous_detections = np.zeros(hangover_frames, dtype=bool)
+
+    def _get_frames(self, samples):
+        '''
+        Returns the complete frames of the pending and given samples as a (frame count, frame length) array,
+        keeping the remainder pending.
+        '''
+        if isinstance(samples, np.ndarray):
+            if (samples.dtype.kind != 'i' or samples.dtype.itemsize != 2):
+                raise TypeError('Samples must be 16 bit PCM (int16), not {}'.format(samples.dtype))
+            if (self._pending_byte):
+                raise ValueError('Samples must continue bytes-like samples with an odd number of bytes as bytes')
+            # Native byte order, without a copy if already int16.
+            samples = samples.reshape(-1).astype(np.int16, copy=False)
+        else:
+            if (self._pending_byte):
+                samples = self._pending_byte + bytes(samples)
+            samples = memoryview(samples).cast('B')
+            # An odd trailing byte is the first half of a sample completed by the next call.
+            even_length = len(samples) & ~1
+            self._pending_byte = bytes(samples[even_length:])
+            samples = np.frombuffer(samples, dtype='<i2', count=even_length // 2)
+
+        if (len(self._pending_samples)):
+            samples = np.concatenate((self._pending_samples, samples))
+
+        frame_count = len(samples) // self.frame_length
+        frames_end = frame_count * self.frame_length
+        self._pending_samples = samples[frames_end:].copy()
+        return samples[:frames_end].reshape(frame_count, self.frame_length)
+
+    def get_voiced_frames(self, samples):
+        '''
+        Classifies each complete frame of the samples (after any carried over from the previous call) as voiced.
+
+        ### Parameters:
+
+            **samples**: np.ndarray (int16) | bytes-like
+                The track's 16 bit PCM samples, as returned by get_aws_connect_audio_ndarray() or raw little-endian
+                bytes as returned by get_aws_connect_audio(). Bytes need not be split on a sample boundary, an odd
+                trailing byte is held for the next call. Arrays of any other dtype raise a TypeError.
+
+        ### Returns:
+
+            (frames, voiced)
+
+            frames is a (frame count, frame length) int16 array and voiced a bool array with one value per frame.
+            Samples of a trailing incomplete frame are held for the next call.
+
+        '''
+        frames = self._get_frames(samples)
+
+        frames_float = frames.astype(np.float32)
+        energy = np.mean(frames_float * frames_float, axis=1)
+        zero_crossing_rate = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1) / self.frame_length
+
+        detections = (energy >= self.energy_threshold) & (zero_crossing_rate <= self.max_zero_crossing_rate)
+
+        if (self.hangover_frames <= 0):
+            return frames, detections
+
+        # A frame is voiced if it or any of the hangover_frames before it (including the previous call's) was detected.
+        window = self.hangover_frames + 1
+        extended_detections = np.concatenate((self._previous_detections, detections))
+        detection_counts = np.concatenate(([0], np.cumsum(extended_detections)))
+        voiced = (detection_counts[window : window + len(detections)] - detection_counts[0 : len(detections)]) > 0
+
+        self._previous_detections = extended_detections[-self.hangover_frames:]
+        return frames, voiced
+
+    def drop_silence(self, samples):
+        '''
+        Returns only the voiced frames of the samples, see get_voiced_frames().
+
+        ### Returns:
+
+            voiced_samples: np.ndarray (int16)
+
+        '''
+        frames, voiced = self.get_voiced_frames(samples)
+        return frames[voiced].reshape(-1)
+
+    def mark_silence(self, samples):
+        '''
+        Returns the samples with the silent frames zeroed, keeping the timing of the audio, see get_voiced_frames().
+
+        ### Returns:
+
+            marked_samples: np.ndarray (int16)
+
+        '''
+        frames, voiced = self.get_voiced_frames(samples)
+        marked_frames = frames.copy()
+        marked_frames[~voiced] = 0
+        return marked_frames.reshape(-1)
@@ -0,0 +1,190 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This class demultiplexes the SimpleBlock payloads of MKV fragments into per track frames for any number of tracks.
+
+Each SimpleBlock starts with a header of:
+1) The track number as an EBML variable length integer (VINT) of 1 to 8 bytes,
+2) A signed 16 bit timecode relative to the Cluster Timecode,
+3) A flags byte (0x80 keyframe, 0x08 invisible, 0x06 lacing, 0x01 discardable).
+
+If the lacing bits are set, several frames are packed into the block behind a frame count and the Xiph, EBML or
+fixed size lacing of their sizes. Frames are returned as memoryviews of the block and each track's payload is
+assembled with a single join, rather than a growing bytearray per block.
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import logging
+from amazon_kinesis_video_consumer_library.ebmlite.decoding import decodeIntLength
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# SimpleBlock header flags.
+KEYFRAME_FLAG = 0x80
+INVISIBLE_FLAG = 0x08
+LACING_FLAGS = 0x06
+DISCARDABLE_FLAG = 0x01
+
+# Lacing types, the value of flags & LACING_FLAGS.
+NO_LACING = 0x00
+XIPH_LACING = 0x02
+FIXED_SIZE_LACING = 0x04
+EBML_LACING = 0x06
+
+
+def _read_vint(block, offset):
+    '''
+    Decodes an unsigned EBML variable length integer, returns (value, length).
+    '''
+    length, value = decodeIntLength(block[offset])
+    if (offset + length > len(block)):
+        raise IOError('Truncated block header at offset {}'.format(offset))
+    for byte in block[offset + 1 : offset + length]:
+        value = (value << 8) | byte
+    return value, length
+
+
+def read_block_header(block):
+    '''
+    Decodes the header of a SimpleBlock (or Block) payload.
+
+    ### Parameters:
+
+        **block**: bytes-like
+            The SimpleBlock element's payload.
+
+    ### Returns:
+
+        (track_number, relative_timecode, flags, header_length)
+
+    '''
+    track_number, track_number_length = _read_vint(block, 0)
+    header_length = track_number_length + 3
+    if (header_length > len(block)):
+        raise IOError('Truncated block header')
+
+    relative_timecode = int.from_bytes(block[track_number_length : track_number_length + 2], 'big', signed=True)
+    flags = block[track_number_length + 2]
+    return track_number, relative_timecode, flags, header_length
+
+
+def read_block_frames(block):
+    '''
+    Decodes a SimpleBlock payload into its header and frames, un-lacing if the block holds more than one frame.
+
+    ### Parameters:
+
+        **block**: bytes-like
+            The SimpleBlock element's payload.
+
+    ### Returns:
+
+        (track_number, relative_timecode, flags, frames)
+
+        frames is a list of memoryviews of the block, one per frame.
+
+    '''
+    block = memoryview(block)
+    track_number, relative_timecode, flags, offset = read_block_header(block)
+    lacing = flags & LACING_FLAGS
+
+    if (lacing == NO_LACING):
+        return track_number, relative_timecode, flags, [block[offset:]]
+
+    frame_count = block[offset] + 1
+    offset += 1
+
+    frame_sizes = []
+    if (lacing == XIPH_LACING):
+        for _ in range(frame_count - 1):
+            frame_size = 0
+            while True:
+                lace_byte = block[offset]
+                offset += 1
+                frame_size += lace_byte
+                if (lace_byte != 255):
+                    break
+            frame_sizes.append(frame_size)
+
+    elif (lacing == EBML_LACING):
+        frame_size, length = _read_vint(block, offset)
+        offset += length
+        frame_sizes.append(frame_size)
+        for _ in range(frame_count - 2):
+            # Subsequent sizes are signed differences from the previous size.
+            size_difference, length = _read_vint(block, offset)
+            offset += length
+            frame_size += size_difference - ((1 << (7 * length - 1)) - 1)
+            frame_sizes.append(frame_size)
+
+    else:
+        frame_sizes = [(len(block) - offset) // frame_count] * (frame_count - 1)
+
+    # The last frame takes the rest of the block.
+    frame_sizes.append(len(block) - offset - sum(frame_sizes))
+    if (frame_sizes[-1] < 0):
+        raise IOError('Block lacing sizes exceed the block size')
+
+    frames = []
+    for frame_size in frame_sizes:
+        frames.append(block[offset : offset + frame_size])
+        offset += frame_size
+
+    return track_number, relative_timecode, flags, frames
+
+
+class KvsBlockDemuxer():
+
+    def __init__(self):
+        '''
+        Collects the frames of SimpleBlocks by track number, see add_block().
+        '''
+        self.track_frames = {}
+
+    def add_block(self, block):
+        '''
+        Decodes a SimpleBlock payload and appends its frames to its track.
+
+        ### Parameters:
+
+            **block**: bytes-like
+                The SimpleBlock element's payload.
+
+        ### Returns:
+
+            (track_number, relative_timecode, flags, frames) as per read_block_frames().
+
+        '''
+        block_frames = read_block_frames(block)
+        self.track_frames.setdefault(block_frames[0], []).extend(block_frames[3])
+        return block_frames
+
+    def get_track_payloads(self, join_type=bytes):
+        '''
+        Returns the frames of each track joined in to a single payload.
+
+        ### Parameters:
+
+            **join_type**: type
+                bytes (default) or bytearray.
+
+        ### Returns:
+
+            track_payloads: dict
+
+            Track number to its joined payload.
+
+        '''
+        track_payloads = {}
+        for track_number, frames in self.track_frames.items():
+            track_payloads[track_number] = join_type().join(frames)
+        return track_payloads
@@ -0,0 +1,425 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This class multiplexes many KVS GetMedia / GetMediaForFragmentList streams over a fixed number of reader threads
+rather than the one thread per stream of the KvsConsumerLibrary.
+
+Streams are serviced round-robin: a worker takes the next stream from the ready queue, reads one chunk, forwards any
+fragments it completed to the stream's callbacks and returns the stream to the back of the queue. A stream is only ever
+read by one worker at a time so its fragments are delivered in order. The total number of bytes buffered across all
+streams is capped; once it is exceeded, streams holding more than their fair share wait until others have drained.
+
+Streams can be added and removed while the pool is running. The callbacks have the same signatures as those
+of the KvsConsumerLibrary and are called from the pool's worker threads.
+
+Each turn reads the bytes available from the stream (up to read_size) as soon as any arrive rather than waiting for
+a full read_size, which for a live stream receiving ~32 KB/s (such as an AWS Connect call) would hold a worker for
+~0.5 s per 16 KB turn. Partial reads use read1() of the payload, or of the HTTP response underneath a botocore
+StreamingBody. A stream with no bytes available still holds its worker until some arrive, so for many live streams
+with long pauses between fragments allow a worker per concurrently idle stream, or use the AsyncKvsConsumer. Payloads
+that support neither (and iterables of chunks) are read with read(read_size), which suits archived media
+(GetMediaForFragmentList) where the bytes are available as fast as they can be read.
+
+stop() and remove_stream() close the payload of a stream being read, interrupting a read blocked waiting for bytes.
+
+Workflow:
+1) Initialize the pool and call start(),
+2) For each GetMedia response call add_stream() with the stream name and the on_fragment_arrived,
+on_read_stream_complete and on_read_stream_exception callbacks,
+3) Call remove_stream() to stop reading a stream early and stop() to shut the pool down.
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import logging
+from collections import deque
+from threading import Thread, Condition
+from amazon_kinesis_video_consumer_library.ebmlite import loadSchema
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_scanner import (KvsFragmentReader,
+                                                                                  KvsFragmentIdleFlusher,
+                                                                                  DEFAULT_FRAGMENT_IDLE_FLUSH_INTERVAL)
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsTrackCache
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# Defaults for the pool size, bytes read per stream turn and the cap on buffered bytes across all streams.
+DEFAULT_NUM_WORKERS = 8
+DEFAULT_READ_SIZE = 16 * 1024
+DEFAULT_MAX_BUFFERED_BYTES = 512 * 1024 * 1024
+
+
+def _get_partial_read(payload):
+    '''
+    Returns a function reading up to n bytes from the payload that returns once any are available (read1()), or
+    None if the payload only supports reads that wait for all n bytes.
+
+    A botocore StreamingBody has no read1() but wraps a urllib3 HTTPResponse, which has read1() from urllib3 2.1 and
+    before that wraps an http.client.HTTPResponse which does.
+    '''
+    raw_stream = getattr(payload, '_raw_stream', None)
+    for source in (payload, raw_stream, getattr(raw_stream, '_fp', None)):
+        read1 = getattr(source, 'read1', None)
+        if callable(read1):
+            return read1
+    return None
+
+
+class _KvsPooledStream():
+
+    __slots__ = ("stream_name", "payload", "partial_read", "chunk_iterator", "fragment_reader", "on_fragment_arrived",
+                 "on_read_stream_complete", "on_read_stream_exception", "buffered_bytes", "removed", "reading",
+                 "track_cache", "fragment_flusher")
+
+    def __init__(self, stream_name, payload, fragment_reader, on_fragment_arrived,
+                 on_read_stream_complete, on_read_stream_exception):
+        '''
+        Per stream state held by the KvsConsumerPool.
+        '''
+        self.stream_name = stream_name
+        self.payload = payload
+        self.partial_read = _get_partial_read(payload)
+        self.chunk_iterator = None
+        self.fragment_reader = fragment_reader
+        self.on_fragment_arrived = on_fragment_arrived
+        self.on_read_stream_complete = on_read_stream_complete
+        self.on_read_stream_exception = on_read_stream_exception
+        self.buffered_bytes = 0
+        self.removed = False
+        self.reading = False
+        self.track_cache = KvsTrackCache()
+        self.fragment_flusher = None
+
+    def read_chunk(self, read_size):
+        '''
+        Reads the next chunk (at most read_size bytes, without waiting for more than are available if the payload
+        supports partial reads) from the stream's payload, returns an empty bytes object at the end of the stream.
+        '''
+        if self.partial_read is not None:
+            return self.partial_read(read_size)
+
+        if hasattr(self.payload, 'read'):
+            return self.payload.read(read_size)
+
+        if self.chunk_iterator is None:
+            self.chunk_iterator = iter(self.payload)
+        return next(self.chunk_iterator, b'')
+
+    def close(self):
+        '''
+        Closes the stream's payload if it supports it.
+        '''
+        close = getattr(self.payload, 'close', None)
+        if close:
+            try:
+                close()
+            except Exception as err:
+                log.warning('Error closing stream {} payload: {}'.format(self.stream_name, err))
+
+
+class KvsConsumerPool():
+
+    def __init__(self,
+                num_workers=DEFAULT_NUM_WORKERS,
+                read_size=DEFAULT_READ_SIZE,
+                max_buffered_bytes=DEFAULT_MAX_BUFFERED_BYTES,
+                fragment_idle_flush_interval=DEFAULT_FRAGMENT_IDLE_FLUSH_INTERVAL):
+        '''
+            Initialize the multi-stream KVS consumer pool.
+
+            ### Parameters:
+
+                **num_workers**: int
+                    Number of reader threads shared by all streams.
+
+                **read_size**: int
+                    Maximum number of bytes read from a stream per turn (the bytes available, if fewer, for payloads
+                    supporting partial reads).
+
+                **max_buffered_bytes**: int
+                    Cap on the total bytes buffered (received but not yet part of a delivered fragment) across all streams.
+
+                **fragment_idle_flush_interval**: float
+                    Seconds without new bytes after the trailing Tags of a fragment have arrived before the fragment
+                    is delivered (from a timer thread), rather than waiting for the EBML header of the next fragment.
+                    None to only deliver fragments at the next EBML header. See KvsFragmentIdleFlusher.
+        '''
+        log.info('Initilizing KvsConsumerPool...')
+        self.num_workers = num_workers
+        self.read_size = read_size
+        self.max_buffered_bytes = max_buffered_bytes
+        self.fragment_idle_flush_interval = fragment_idle_flush_interval
+
+        self.schema = loadSchema('matroska.xml')
+
+        self._condition = Condition()
+        self._streams = {}
+        self._ready_streams = deque()
+        self._buffered_bytes = 0
+        self._active_reads = 0
+        self._workers = []
+        self._running = False
+
+    @property
+    def stream_names(self):
+        '''
+        Names of the streams currently being read.
+        '''
+        with self._condition:
+            return list(self._streams)
+
+    @property
+    def buffered_bytes(self):
+        '''
+        Total bytes buffered across all streams.
+        '''
+        return self._buffered_bytes
+
+    def start(self):
+        '''
+        Starts the pool's reader threads.
+        '''
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+        for worker_number in range(self.num_workers):
+            worker = Thread(target=self._run_worker, name='KvsConsumerPool-{}'.format(worker_number), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, wait=True):
+        '''
+        Stops the pool's reader threads. Streams still in the pool are closed without calling their callbacks,
+        including those being read, so reads blocked waiting for bytes are interrupted.
+
+        ### Parameters:
+
+            **wait**: bool
+                If True, wait for the reader threads to finish before returning.
+
+        '''
+        with self._condition:
+            self._running = False
+            streams = list(self._streams.values())
+            self._streams.clear()
+            self._ready_streams.clear()
+            for stream in streams:
+                stream.removed = True
+            self._condition.notify_all()
+
+        for stream in streams:
+            stream.close()
+            stream.fragment_flusher.cancel()
+
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self._workers = []
+
+    def add_stream(self,
+                   stream_name,
+                   get_media_response_object,
+                   on_fragment_arrived,
+                   on_read_stream_complete,
+                   on_read_stream_exception):
+        '''
+        Adds a stream to be read by the pool. Same parameters as the KvsConsumerLibrary.
+
+        ### Parameters:
+
+            **stream_name**: str
+                The name (or ARN) of the stream, must be unique in the pool.
+
+            **get_media_response_object**: dict
+                The KVS GetMedia or GetMediaForFragmentList response containing the StreamingBody 'Payload'.
+
+            **on_fragment_arrived**: function(stream_name, fragment_bytes, fragment_dom, fragment_receive_duration)
+
+            **on_read_stream_complete**: function(stream_name)
+
+            **on_read_stream_exception**: function(stream_name, error)
+
+        '''
+        fragment_reader = KvsFragmentReader(stream_name, self.schema)
+        stream = _KvsPooledStream(stream_name,
+                                  get_media_response_object['Payload'],
+                                  fragment_reader,
+                                  on_fragment_arrived,
+                                  on_read_stream_complete,
+                                  on_read_stream_exception)
+        stream.fragment_flusher = KvsFragmentIdleFlusher(fragment_reader,
+                                                         lambda fragment: self._forward_fragment(stream, fragment),
+                                                         lambda err: self._on_idle_flush_exception(stream, err),
+                                                         self.fragment_idle_flush_interval)
+
+        with self._condition:
+            if stream_name in self._streams:
+                raise KeyError('Stream {} is already in the pool'.format(stream_name))
+            self._streams[stream_name] = stream
+            self._ready_streams.append(stream)
+            self._condition.notify()
+
+    def remove_stream(self, stream_name):
+        '''
+        Stops reading a stream and closes its payload (interrupting a read in progress). The stream's callbacks are
+        not called again.
+
+        ### Parameters:
+
+            **stream_name**: str
+                The name (or ARN) of the stream to remove.
+
+        '''
+        with self._condition:
+            stream = self._streams.pop(stream_name)
+            stream.removed = True
+            self._buffered_bytes -= stream.buffered_bytes
+            if not stream.reading:
+                self._ready_streams.remove(stream)
+            self._condition.notify_all()
+
+        stream.close()
+        stream.fragment_flusher.cancel()
+
+    def get_track_cache(self, stream_name):
+        '''
+        Returns the KvsTrackCache of a stream in the pool, so callbacks can get the stream's track information
+        without re-parsing the Tracks of every fragment.
+
+        ### Parameters:
+
+            **stream_name**: str
+                The name (or ARN) of the stream.
+
+        '''
+        with self._condition:
+            return self._streams[stream_name].track_cache
+
+    def _next_stream(self):
+        '''
+        Takes the next stream to read from the ready queue, or None if there is none. Must hold the condition.
+
+        While the total buffered bytes exceed the cap, streams buffering more than their fair share are passed over.
+        If every ready stream is over its share, wait for in-progress reads to drain unless there are none, in
+        which case the first stream is read so its fragment can complete.
+        '''
+        if not self._ready_streams:
+            return None
+
+        if (self._buffered_bytes > self.max_buffered_bytes):
+            fair_share = self.max_buffered_bytes // len(self._streams)
+            for _ in range(len(self._ready_streams)):
+                stream = self._ready_streams.popleft()
+                if (stream.buffered_bytes <= fair_share):
+                    return stream
+                self._ready_streams.append(stream)
+
+            if (self._active_reads > 0):
+                return None
+
+        return self._ready_streams.popleft()
+
+    def _run_worker(self):
+        '''
+        Reader thread, services streams from the ready queue one chunk at a time.
+        '''
+        while True:
+            with self._condition:
+                stream = self._next_stream() if self._running else None
+                while self._running and stream is None:
+                    self._condition.wait()
+                    stream = self._next_stream()
+
+                if not self._running:
+                    return
+
+                stream.reading = True
+                self._active_reads += 1
+
+            end_of_stream = False
+            try:
+                end_of_stream = self._read_stream(stream)
+                if end_of_stream and not stream.removed:
+                    stream.on_read_stream_complete(stream.stream_name)
+
+            except Exception as err:
+                # Pass any exceptions to exception callback and stop reading the stream.
+                end_of_stream = True
+                if not stream.removed:
+                    stream.on_read_stream_exception(stream.stream_name, err)
+
+            with self._condition:
+                stream.reading = False
+                self._active_reads -= 1
+
+                removed = stream.removed
+                if not removed:
+                    buffered_bytes = stream.fragment_reader.buffered_bytes
+                    self._buffered_bytes += buffered_bytes - stream.buffered_bytes
+                    stream.buffered_bytes = buffered_bytes
+
+                    if end_of_stream:
+                        del self._streams[stream.stream_name]
+                        self._buffered_bytes -= stream.buffered_bytes
+                    else:
+                        # Back of the queue so every stream gets a turn.
+                        self._ready_streams.append(stream)
+
+                self._condition.notify_all()
+
+            if removed or end_of_stream:
+                stream.close()
+                stream.fragment_flusher.cancel()
+
+    def _read_stream(self, stream):
+        '''
+        Reads one chunk from the stream and forwards any fragments it completed to the on_fragment_arrived callback.
+        Fragments are delivered before the stream returns to the ready queue, so they stay in order.
+
+        ### Returns:
+
+            end_of_stream: bool
+
+        '''
+        chunk = stream.read_chunk(self.read_size)
+
+        if chunk:
+            stream.fragment_flusher.feed(chunk)
+        else:
+            stream.fragment_flusher.flush()
+
+        return not chunk
+
+    def _forward_fragment(self, stream, fragment):
+        '''
+        Calls the stream's on_fragment_arrived callback, unless the stream has been removed.
+        '''
+        if stream.removed:
+            return
+        stream.on_fragment_arrived(stream.stream_name,
+                                   fragment.fragment_bytes,
+                                   fragment.fragment_dom,
+                                   fragment.fragment_receive_duration)
+
+    def _on_idle_flush_exception(self, stream, err):
+        '''
+        Passes an exception raised delivering an idle flushed fragment (on the KvsFragmentIdleFlusher timer thread)
+        to the stream's exception callback and stops reading the stream.
+        '''
+        if stream.removed:
+            return
+        stream.on_read_stream_exception(stream.stream_name, err)
+        try:
+            self.remove_stream(stream.stream_name)
+        except KeyError:
+            # Removed or ended meanwhile.
+            pass
@@ -0,0 +1,289 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This class decouples the on_fragment_arrived callback from the thread reading the stream. Fragments are placed on a
+bounded queue and the callbacks run on a configurable pool of worker threads, so a slow callback (such as writing
+audio to disk or calling a speech recognition service) does not stall socket reads.
+
+Fragments of the same stream are always delivered one at a time and in order, fragments of different streams are
+delivered concurrently.
+
+When the queue is full, the backpressure policy decides what happens to a new fragment:
+1) BLOCK: The reader waits until there is room on the queue,
+2) DROP_OLDEST: The oldest queued fragment of the stream that has waited longest is discarded to make room,
+3) DROP_NEWEST: The new fragment is discarded,
+4) COALESCE: Fragments of the same stream still waiting on the queue are replaced by the new one (latest wins).
+If the stream has nothing queued to replace, the reader waits as per BLOCK.
+
+Queue depth and dropped fragment counts are available from get_metrics().
+
+An exception raised by a callback is passed to the on_exception function given to submit() (the KvsConsumerLibrary
+passes it to on_read_stream_exception, as for in-line callbacks), or logged if there is none.
+
+Workflow:
+1) Initialize a KvsFragmentDispatcher and pass it to the KvsConsumerLibrary (or call submit() directly),
+2) Call stop() once all streams have completed.
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import logging
+from collections import deque
+from threading import Thread, Condition
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# Backpressure policies applied when the dispatch queue is full.
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+COALESCE = 'coalesce'
+BACKPRESSURE_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+# Default queue size (fragments across all streams) and callback worker count.
+DEFAULT_MAX_QUEUED_FRAGMENTS = 256
+DEFAULT_NUM_WORKERS = 4
+
+
+class KvsFragmentDispatcher():
+
+    def __init__(self,
+                max_queued_fragments=DEFAULT_MAX_QUEUED_FRAGMENTS,
+                num_workers=DEFAULT_NUM_WORKERS,
+                backpressure_policy=BLOCK):
+        '''
+            Initialize the fragment dispatcher and start its callback worker threads.
+
+            ### Parameters:
+
+                **max_queued_fragments**: int
+                    Maximum number of fragments waiting for delivery across all streams.
+
+                **num_workers**: int
+                    Number of threads running the callbacks.
+
+                **backpressure_policy**: str
+                    One of BLOCK, DROP_OLDEST, DROP_NEWEST or COALESCE.
+        '''
+        if backpressure_policy not in BACKPRESSURE_POLICIES:
+            raise ValueError('Unknown backpressure policy {}, must be one of {}'.format(backpressure_policy, BACKPRESSURE_POLICIES))
+
+        log.info('Initilizing KvsFragmentDispatcher...')
+        self.max_queued_fragments = max_queued_fragments
+        self.backpressure_policy = backpressure_policy
+
+        self._condition = Condition()
+
+        # Queued deliveries per stream, the streams waiting for a worker and the streams either waiting or being delivered.
+        self._stream_queues = {}
+        self._ready_streams = deque()
+        self._scheduled_streams = set()
+
+        self._queued_fragments = 0
+        self._max_queue_depth = 0
+        self._dispatched_fragments = 0
+        self._dropped_fragments = 0
+        self._running = True
+
+        self._workers = []
+        for worker_number in range(num_workers):
+            worker = Thread(target=self._run_worker, name='KvsFragmentDispatcher-{}'.format(worker_number), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def get_metrics(self):
+        '''
+        Returns the dispatcher's queue metrics.
+
+        ### Returns:
+
+            metrics: dict
+
+            {
+                "queue_depth": Fragments currently waiting for delivery,
+                "max_queue_depth": Highest queue depth seen,
+                "stream_queue_depths": { stream_name: fragments waiting for delivery },
+                "dispatched_fragments": Fragments delivered to callbacks,
+                "dropped_fragments": Fragments discarded by the backpressure policy
+            }
+
+        '''
+        with self._condition:
+            return {
+                "queue_depth": self._queued_fragments,
+                "max_queue_depth": self._max_queue_depth,
+                "stream_queue_depths": {stream_name: len(queue) for stream_name, queue in self._stream_queues.items()},
+                "dispatched_fragments": self._dispatched_fragments,
+                "dropped_fragments": self._dropped_fragments
+            }
+
+    def submit(self, stream_name, callback, *args, required=False, on_exception=None):
+        '''
+        Queues a callback for delivery on the worker threads, applying the backpressure policy if the queue is full.
+
+        ### Parameters:
+
+            **stream_name**: str
+                The stream the delivery belongs to, deliveries of the same stream run one at a time in order.
+
+            **callback**: function
+                The callback to run, called as callback(*args).
+
+            **required**: bool
+                If True the delivery is never dropped, the caller waits for room on the queue whatever the
+                backpressure policy. Used for the stream complete and exception callbacks.
+
+            **on_exception**: function
+                Called as on_exception(err), on the worker thread, with any exception raised by the callback. If
+                None the exception is logged.
+
+        ### Returns:
+
+            queued: bool
+
+            False if the delivery was dropped by the backpressure policy.
+
+        '''
+        with self._condition:
+            if not self._running:
+                raise RuntimeError('KvsFragmentDispatcher has been stopped')
+
+            while self._queued_fragments >= self.max_queued_fragments:
+
+                if not required:
+                    if self.backpressure_policy == DROP_NEWEST:
+                        self._dropped_fragments += 1
+                        return False
+
+                    elif self.backpressure_policy == DROP_OLDEST and self._drop_oldest():
+                        break
+
+                    elif self.backpressure_policy == COALESCE and self._drop_deliveries(stream_name):
+                        # This stream's queued deliveries are replaced with the new one.
+                        break
+
+                self._condition.wait()
+                if not self._running:
+                    raise RuntimeError('KvsFragmentDispatcher has been stopped')
+
+            self._stream_queues.setdefault(stream_name, deque()).append((callback, args, required, on_exception))
+            if stream_name not in self._scheduled_streams:
+                self._scheduled_streams.add(stream_name)
+                self._ready_streams.append(stream_name)
+
+            self._queued_fragments += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued_fragments)
+            self._condition.notify_all()
+            return True
+
+    def _drop_deliveries(self, stream_name, max_dropped=None):
+        '''
+        Discards up to max_dropped (default all) of a stream's queued deliveries, oldest first. Required deliveries
+        are never discarded. Must hold the condition.
+
+        ### Returns:
+
+            dropped: int
+
+            The number of deliveries discarded.
+
+        '''
+        stream_queue = self._stream_queues.get(stream_name)
+        if not stream_queue:
+            return 0
+
+        kept_deliveries = []
+        dropped = 0
+        for delivery in stream_queue:
+            if not delivery[2] and (max_dropped is None or dropped < max_dropped):
+                dropped += 1
+            else:
+                kept_deliveries.append(delivery)
+
+        if dropped:
+            stream_queue.clear()
+            stream_queue.extend(kept_deliveries)
+            self._queued_fragments -= dropped
+            self._dropped_fragments += dropped
+        return dropped
+
+    def _drop_oldest(self):
+        '''
+        Discards the oldest queued delivery of the stream that has waited longest, returns False if there was none
+        that could be discarded. Must hold the condition.
+        '''
+        # Streams waiting for a worker first, then those being delivered.
+        for stream_name in list(self._ready_streams) + list(self._stream_queues):
+            if self._drop_deliveries(stream_name, 1):
+                return True
+        return False
+
+    def stop(self, wait=True):
+        '''
+        Stops the dispatcher once all queued deliveries have run.
+
+        ### Parameters:
+
+            **wait**: bool
+                If True, wait for the queued deliveries to complete before returning.
+
+        '''
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _run_worker(self):
+        '''
+        Callback worker thread. Takes a stream with queued deliveries and runs its next callback.
+        '''
+        while True:
+            with self._condition:
+                while not self._ready_streams:
+                    if not self._running and self._queued_fragments == 0:
+                        return
+                    self._condition.wait()
+
+                stream_name = self._ready_streams.popleft()
+                stream_queue = self._stream_queues[stream_name]
+                if not stream_queue:
+                    # Emptied by DROP_OLDEST or COALESCE.
+                    del self._stream_queues[stream_name]
+                    self._scheduled_streams.discard(stream_name)
+                    continue
+
+                callback, args, _, on_exception = stream_queue.popleft()
+                self._queued_fragments -= 1
+                self._condition.notify_all()
+
+            try:
+                callback(*args)
+            except Exception as err:
+                if on_exception is None:
+                    log.exception('Error in callback for stream {}'.format(stream_name))
+                else:
+                    try:
+                        on_exception(err)
+                    except Exception:
+                        log.exception('Error in exception handler for stream {}'.format(stream_name))
+
+            with self._condition:
+                self._dispatched_fragments += 1
+                if self._stream_queues.get(stream_name):
+                    # Stays scheduled, back of the queue so other streams get a turn.
+                    self._ready_streams.append(stream_name)
+                else:
+                    self._stream_queues.pop(stream_name, None)
+                    self._scheduled_streams.discard(stream_name)
+                self._condition.notify_all()
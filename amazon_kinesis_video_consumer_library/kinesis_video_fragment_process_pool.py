@@ -0,0 +1,222 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This class runs the KvsFragmentProcessor extractions (tags, track info, audio etc.) of complete MKV fragments
+in a pool of worker processes. EBML parsing in pure Python is CPU bound, so a single process tops out at one core
+however many streams it reads. Handing the fragment bytes to a ProcessPoolExecutor lets the catch-up of archived
+media (and many concurrent streams) scale with the number of cores.
+
+Each worker process loads the MKV schema once, parses the fragment and returns only the compact results of the
+requested extractions rather than the DOM. Results are returned in the order the fragments were submitted.
+
+Only the extractions in PROCESS_POOL_EXTRACTIONS can be run, each given as its name or as a (name, kwargs) tuple for
+its further arguments (such as the one_in_frames_ratio of get_frames_as_ndarray). They take the fragment DOM and
+return picklable results. Functions that write files or only take the fragment bytes are run in the caller instead.
+
+Each fragment is copied once to bytes to be sent to a worker process: memoryviews (as returned by the consumer) can
+not be pickled.
+
+Workflow:
+1) Initialize a KvsFragmentProcessPool with the KvsFragmentProcessor extractions to run,
+2) Either pass it to the KvsConsumerLibrary (fragment_process_pool) or call map() / submit() directly, for example
+with the fragments from iter_fragments(),
+3) Call shutdown() once all fragments have been processed.
+
+Example:
+
+    extractions = ('get_fragment_tags', ('get_frames_as_ndarray', {'keyframes_only': True}))
+    with KvsFragmentProcessPool(extractions) as process_pool:
+        for fragment_results in process_pool.map(iter_fragments(get_media_for_fragment_list_response)):
+            tags = fragment_results['get_fragment_tags']
+            keyframes = fragment_results['get_frames_as_ndarray']
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from amazon_kinesis_video_consumer_library.ebmlite import loadSchema
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsFragmentProcessor
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# Default extractions and number of fragments submitted to the pool but not yet returned by map().
+DEFAULT_EXTRACTIONS = ('get_fragment_tags',)
+DEFAULT_MAX_PENDING_FRAGMENTS = 64
+
+# The KvsFragmentProcessor extractions that can be run in the pool, to whether the fragment bytes are passed
+# (as fragment_bytes) along with the fragment DOM.
+PROCESS_POOL_EXTRACTIONS = {
+    'get_fragment_tags': False,
+    'get_aws_connect_track_info': False,
+    'get_fragement_dom_pretty_string': False,
+    'get_track_payloads': True,
+    'get_aws_connect_audio': True,
+    'get_aws_connect_audio_ndarray': True,
+    'get_block_timestamps_ndarray': True,
+    'get_frames_as_ndarray': True,
+}
+
+# Per worker process schema and fragment processor, created on the first fragment processed.
+_worker_schema = None
+_worker_fragment_processor = None
+
+
+def _get_extraction_spec(extraction):
+    '''
+    Returns the (name, kwargs) of an extraction given as its name or a (name, kwargs) tuple, checking it can be run
+    in the pool.
+    '''
+    if isinstance(extraction, str):
+        extraction_name, extraction_kwargs = extraction, {}
+    else:
+        extraction_name, extraction_kwargs = extraction
+        extraction_kwargs = dict(extraction_kwargs)
+
+    if extraction_name not in PROCESS_POOL_EXTRACTIONS:
+        raise ValueError('KvsFragmentProcessor function {} can not be run in the process pool, '
+                         'supported: {}'.format(extraction_name, ', '.join(PROCESS_POOL_EXTRACTIONS)))
+
+    for argument in ('fragment_dom', 'fragment_bytes'):
+        if argument in extraction_kwargs:
+            raise ValueError('{} of {} is given by the process pool'.format(argument, extraction_name))
+
+    return extraction_name, extraction_kwargs
+
+
+def _process_fragment(fragment_bytes, extractions):
+    '''
+    Runs in the worker process: parses the fragment and returns the results of each extraction.
+
+    ### Parameters:
+
+        **extractions**: tuple
+            (name, kwargs) of each extraction, see _get_extraction_spec().
+    '''
+    global _worker_schema, _worker_fragment_processor
+    if _worker_schema is None:
+        _worker_schema = loadSchema('matroska.xml')
+        _worker_fragment_processor = KvsFragmentProcessor()
+
+    fragment_dom = _worker_schema.loads(fragment_bytes)
+
+    fragment_results = {}
+    for extraction_name, extraction_kwargs in extractions:
+        if PROCESS_POOL_EXTRACTIONS[extraction_name]:
+            extraction_kwargs = dict(extraction_kwargs, fragment_bytes=fragment_bytes)
+        extraction = getattr(_worker_fragment_processor, extraction_name)
+        fragment_results[extraction_name] = extraction(fragment_dom, **extraction_kwargs)
+    return fragment_results
+
+
+class KvsFragmentProcessPool():
+
+    def __init__(self,
+                extractions=DEFAULT_EXTRACTIONS,
+                max_workers=None,
+                max_pending_fragments=DEFAULT_MAX_PENDING_FRAGMENTS):
+        '''
+            Initialize the fragment process pool.
+
+            ### Parameters:
+
+                **extractions**: tuple
+                    The KvsFragmentProcessor functions to run on each fragment, each as its name or a (name, kwargs)
+                    tuple of its further arguments. Must be in PROCESS_POOL_EXTRACTIONS, for example:
+                    get_fragment_tags, get_aws_connect_track_info and get_aws_connect_audio. Results are keyed by
+                    name, so each function can only be given once.
+
+                **max_workers**: int
+                    Number of worker processes, defaults to the number of CPUs.
+
+                **max_pending_fragments**: int
+                    Maximum number of fragments in the pool at once when using map() or the KvsConsumerLibrary,
+                    bounding the memory held by fragments waiting to be processed.
+        '''
+        extraction_specs = tuple(_get_extraction_spec(extraction) for extraction in extractions)
+        extraction_names = tuple(extraction_name for extraction_name, _ in extraction_specs)
+        if len(set(extraction_names)) != len(extraction_names):
+            raise ValueError('Each extraction can only be given once: {}'.format(', '.join(extraction_names)))
+
+        log.info('Initilizing KvsFragmentProcessPool...')
+        self.extractions = extraction_names
+        self._extraction_specs = extraction_specs
+        self.max_pending_fragments = max_pending_fragments
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def submit(self, fragment_bytes):
+        '''
+        Submits a fragment to be processed.
+
+        ### Parameters:
+
+            **fragment_bytes**: bytes-like
+                The raw bytes of a complete MKV fragment. Anything other than bytes, such as the memoryview
+                returned by the consumer, is copied to bytes to be sent to the worker process (memoryviews can
+                not be pickled).
+
+        ### Returns:
+
+            future: concurrent.futures.Future
+
+            Resolves to a dict of extraction name to its result.
+
+        '''
+        if not isinstance(fragment_bytes, bytes):
+            fragment_bytes = bytes(fragment_bytes)
+        return self._executor.submit(_process_fragment, fragment_bytes, self._extraction_specs)
+
+    def map(self, fragments):
+        '''
+        Generator yielding the extraction results of each fragment in the order given, with at most
+        max_pending_fragments in the pool at once.
+
+        ### Parameters:
+
+            **fragments**: iterable
+                KvsFragment objects (such as from iter_fragments()) or raw fragment bytes, each copied to bytes
+                as per submit().
+
+        ### Yields:
+
+            fragment_results: dict
+
+            Extraction name to its result for each fragment.
+
+        '''
+        pending_futures = deque()
+        for fragment in fragments:
+            pending_futures.append(self.submit(getattr(fragment, 'fragment_bytes', fragment)))
+
+            if (len(pending_futures) >= self.max_pending_fragments):
+                yield pending_futures.popleft().result()
+
+        while pending_futures:
+            yield pending_futures.popleft().result()
+
+    def shutdown(self, wait=True):
+        '''
+        Shuts down the worker processes.
+
+        ### Parameters:
+
+            **wait**: bool
+                If True, wait for the pending fragments to be processed before returning.
+
+        '''
+        self._executor.shutdown(wait=wait)
@@ -7,6 +7,13 @@ Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
 This class provides post-processing fiunctions for a MKV fragement that has been parsed
 by the Amazon Kinesis Video Streams Cosumer Library for Python. 
 
+When calling more than one function per fragment, build a FragmentIndex once with get_fragment_index() and pass
+it in place of the fragment DOM so the fragment is only traversed once:
+
+    fragment_index = kvs_fragment_processor.get_fragment_index(fragment_dom)
+    track_info = kvs_fragment_processor.get_aws_connect_track_info(fragment_index)
+    audio_track_data = kvs_fragment_processor.get_aws_connect_audio(fragment_index)
+
  '''
  
 __version__ = "0.0.1"
@@ -16,16 +23,209 @@ __author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
 
 import io
 import logging
+from decimal import Decimal
 import amazon_kinesis_video_consumer_library.ebmlite.util as emblite_utils
 
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional, only required by the *_ndarray functions.
+    np = None
+
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_scanner import read_element_header
+from amazon_kinesis_video_consumer_library.kinesis_video_block_demuxer import KvsBlockDemuxer, read_block_header, read_block_frames, KEYFRAME_FLAG
+from amazon_kinesis_video_consumer_library.kinesis_video_frame_decoder import PyAvFrameDecoder
+
 # Init the logger.
 log = logging.getLogger(__name__)
 
+class FragmentIndex():
+
+    __slots__ = ("segment_element", "timecode_scale", "elements_by_id", "track_entries", "simple_tags", "clusters",
+                 "simple_blocks", "block_offsets", "block_cluster_timecodes")
+
+    def __init__(self, fragment_dom):
+        '''
+        Index of the elements of a MKV fragment built in a single pass over the fragment DOM, so the
+        KvsFragmentProcessor functions can share one traversal rather than each re-walking the Segment.
+
+        ### Parameters:
+
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument>
+                The DOM like structure describing the fragment parsed by EBMLite. 
+
+        ### Attributes:
+
+            **segment_element**: The fragment's (first) Segment element.
+
+            **timecode_scale**: The Segment Info TimecodeScale, nanoseconds per timecode unit (default 1000000).
+
+            **elements_by_id**: dict of element ID to the list of Tracks, TrackEntry, Tags, Tag, SimpleTag, Cluster
+            and SimpleBlock elements found, in fragment order.
+
+            **track_entries**, **simple_tags**, **clusters**, **simple_blocks**: The same lists by element type.
+
+            **block_offsets**: list of (payload_offset, payload_size) of each SimpleBlock in the fragment bytes.
+
+            **block_cluster_timecodes**: list of the Timecode of the Cluster each SimpleBlock belongs to.
+        '''
+        self.segment_element = None
+        for element in fragment_dom:
+            if (element.id == 0x18538067):          # MKV Segment Element ID
+                self.segment_element = element
+                break
+
+        if (not self.segment_element):
+            raise KeyError('Segment Element required but not found in fragment_doc' )
+
+        self.elements_by_id = {
+            0x1654AE6B: [],         # Tracks
+            0xAE: [],               # TrackEntry
+            0x1254C367: [],         # Tags
+            0x7373: [],             # Tag
+            0x67C8: [],             # SimpleTag
+            0x1F43B675: [],         # Cluster
+            0xA3: []                # SimpleBlock
+        }
+        self.track_entries = self.elements_by_id[0xAE]
+        self.simple_tags = self.elements_by_id[0x67C8]
+        self.clusters = self.elements_by_id[0x1F43B675]
+        self.simple_blocks = self.elements_by_id[0xA3]
+        self.block_offsets = []
+        self.block_cluster_timecodes = []
+        self.timecode_scale = 1000000
+
+        for element in self.segment_element:
+            if (element.id == 0x1549A966):                  # Info Master Element ID
+                for info in element:
+                    if (info.id == 0x2AD7B1):               # TimecodeScale Element ID
+                        self.timecode_scale = info.value
+
+            elif (element.id == 0x1654AE6B):                # Tracks Master Element ID
+                self.elements_by_id[0x1654AE6B].append(element)
+                for trackentry in element:
+                    if (trackentry.id == 0xAE):             # TrackEntry Element ID
+                        self.track_entries.append(trackentry)
+
+            elif (element.id == 0x1254C367):                # Tags element type ID
+                self.elements_by_id[0x1254C367].append(element)
+                for tags in element:
+                    if (tags.id == 0x7373):                 # Tag element type ID
+                        self.elements_by_id[0x7373].append(tags)
+                        for tag_type in tags:
+                            if (tag_type.id == 0x67C8 ):    # SimpleTag element type ID
+                                self.simple_tags.append(tag_type)
+
+            elif (element.id == 0x1F43B675):                # Cluster element ID
+                self.clusters.append(element)
+                cluster_timecode = None
+                for cluster_child in element:
+                    if (cluster_child.id == 0xE7):          # Cluster Timecode element ID
+                        cluster_timecode = cluster_child.value
+                    elif (cluster_child.id == 0xA3):        # SimpleBlock element ID
+                        self.simple_blocks.append(cluster_child)
+                        self.block_offsets.append((cluster_child.payloadOffset, cluster_child.size))
+                        self.block_cluster_timecodes.append(cluster_timecode)
+
+
+class KvsTrackCache():
+
+    def __init__(self, fragment_processor=None):
+        '''
+        Per stream cache of the AWS Connect track information. TrackEntries almost never change between the
+        fragments of a stream, so the Tracks element is only re-parsed when its fingerprint changes. The
+        fingerprint is the Tracks element's offset and size in the fragment plus a hash of its raw bytes.
+
+        The Tracks element is found by reading the Segment's children up to the first Cluster, so a cache hit
+        does not parse the fragment's Clusters and SimpleBlocks.
+
+        ### Parameters:
+
+            **fragment_processor**: KvsFragmentProcessor
+                Optional processor used to parse the track information.
+        '''
+        self.fragment_processor = fragment_processor or KvsFragmentProcessor()
+        self._fingerprint = None
+        self._track_information = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_aws_connect_track_info(self, fragment_dom):
+        '''
+        Returns the same track information as KvsFragmentProcessor.get_aws_connect_track_info(), from the
+        cache if the fragment's Tracks element is unchanged. The returned dict is shared, do not modify it.
+
+        ### Parameters:
+
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
+
+        ### Return:
+            **track_information**: object
+                Contains information about the tracks received
+        '''
+        tracks_element = self._get_tracks_element(fragment_dom)
+        if (tracks_element is None):
+            # No Tracks in this fragment, the last seen still apply.
+            return self._track_information
+
+        # getRaw() may be a view of the fragment bytes (unhashable if they are a bytearray), Tracks are small to copy.
+        fingerprint = (tracks_element.offset, tracks_element.size, hash(bytes(tracks_element.getRaw())))
+        if (fingerprint == self._fingerprint):
+            self.hits += 1
+            return self._track_information
+
+        self.misses += 1
+        track_entries = [element for element in tracks_element if (element.id == 0xAE)]     # TrackEntry Element ID
+        self._track_information = self.fragment_processor._read_aws_connect_track_info(track_entries)
+        self._fingerprint = fingerprint
+        return self._track_information
+
+    def _get_tracks_element(self, fragment_dom):
+        '''
+        Returns the fragment's Tracks element, or None if it has none. Tracks precede the Clusters, so only the
+        Segment's children before the first Cluster are read.
+        '''
+        if isinstance(fragment_dom, FragmentIndex):
+            tracks_elements = fragment_dom.elements_by_id[0x1654AE6B]
+            return tracks_elements[0] if tracks_elements else None
+
+        for element in fragment_dom:
+            if (element.id == 0x18538067):                  # MKV Segment Element ID
+                for segment_child in element:
+                    if (segment_child.id == 0x1654AE6B):    # Tracks Master Element ID
+                        return segment_child
+                    if (segment_child.id == 0x1F43B675):    # Cluster element ID
+                        return None
+                return None
+
+        raise KeyError('Segment Element required but not found in fragment_doc' )
+
+
 class KvsFragmentProcessor():
 
     ####################################################
     # Fragment processing functions
 
+    def get_fragment_index(self, fragment_dom):
+        '''
+        Returns a FragmentIndex of the fragment built in one pass over the DOM. Pass it instead of the fragment DOM
+        to the other functions of this class when calling more than one per fragment.
+
+        ### Parameters:
+
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite (or an existing index). 
+
+        ### Returns:
+
+            fragment_index: FragmentIndex
+
+        '''
+        if isinstance(fragment_dom, FragmentIndex):
+            return fragment_dom
+        return FragmentIndex(fragment_dom)
+
     def get_fragment_tags(self, fragment_dom):
         '''
         Parses a MKV Fragment Doc (of type ebmlite.core.MatroskaDocument) that is returned to the provided callback 
@@ -33,8 +233,8 @@ class KvsFragmentProcessor():
 
         ### Parameters:
 
-            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument>
-                The DOM like structure describing the fragment parsed by EBMLite. 
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
 
         ### Returns:
 
@@ -44,37 +244,22 @@ class KvsFragmentProcessor():
 
         '''
 
-        # Get the Segment Element of the Fragment DOM - error if not found
-        segment_element = None
-        for element in fragment_dom:
-            if (element.id == 0x18538067):          # MKV Segment Element ID
-                segment_element = element
-                break
-        
-        if (not segment_element):
-            raise KeyError('Segment Element required but not found in fragment_doc' )
-
-        # Save all of the SimpleTag elements in the Segment element
-        simple_tag_elements = []
-        for element in segment_element:
-            if (element.id == 0x1254C367):                      # Tags element type ID
-                    for tags in element:
-                        if (tags.id == 0x7373):                 # Tag element type ID
-                            for tag_type in tags:
-                                if (tag_type.id == 0x67C8 ):    # SimpleTag element type ID
-                                    simple_tag_elements.append(tag_type)
+        fragment_index = self.get_fragment_index(fragment_dom)
 
         # For all SimpleTags types (ID: 0x67C8), save for TagName (ID: 0x7373) and values of TagString (ID:0x4487) or TagBinary (ID: 0x4485 )
         simple_tags_dict = {}
-        for simple_tag in simple_tag_elements:
+        for simple_tag in fragment_index.simple_tags:
 
             tag_name = None
             tag_value = None
             for element in simple_tag:
                 if (element.id == 0x45A3):                              # Tag Name element type ID
                     tag_name = element.value
-                elif (element.id == 0x4487 or element.id == 0x4485):    # TagString and TagBinary element type IDs respectively
+                elif (element.id == 0x4487):                            # TagString element type ID
                     tag_value = element.value
+                elif (element.id == 0x4485):                            # TagBinary element type ID
+                    # Copied out, the value is a view of the fragment bytes.
+                    tag_value = bytearray(element.value)
             
             # As long as tag name was found add the Tag to the return dict. 
             if (tag_name):
@@ -82,6 +267,112 @@ class KvsFragmentProcessor():
 
         return simple_tags_dict
     
+    def get_fragment_tags_from_bytes(self, fragment_bytes):
+        '''
+        Returns the same dict of SimpleTag elements as get_fragment_tags() but read directly from the raw fragment
+        bytes without building the fragment DOM. Only element headers are decoded, Cluster payloads and other
+        elements are skipped by size and only the TagName / TagString / TagBinary payloads are read.
+
+        Use when a callback only needs the KVS fragment tags (AWS_KINESISVIDEO_FRAGMENT_NUMBER, server / producer
+        timestamps, Connect ContactId etc.)
+
+        ### Parameters:
+
+            **fragment_bytes**: bytes-like
+                The raw bytes of the MKV fragment as returned to the on_fragment_arrived callback.
+
+        ### Returns:
+
+            simple_tags: dict
+
+            Dictionary of all SimpleTag elements with format -  TagName<String> : TagValue <String | Binary>. 
+
+        '''
+        fragment_length = len(fragment_bytes)
+        segment_found = False
+        simple_tags_dict = {}
+
+        offset = 0
+        while True:
+            header = read_element_header(fragment_bytes, offset, fragment_length)
+            if header is None:
+                break
+
+            element_id, element_size, payload_offset = header
+            if (element_id == 0x18538067):                          # MKV Segment Element ID
+                if (segment_found):
+                    # Only the first Segment, as per get_fragment_tags()
+                    break
+                segment_found = True
+
+            if (element_id == 0x67C8):                              # SimpleTag element type ID
+                simple_tag_end = fragment_length if element_size is None else payload_offset + element_size
+                tag_name, tag_value = self._read_simple_tag(fragment_bytes, payload_offset, min(simple_tag_end, fragment_length))
+                if (tag_name):
+                    simple_tags_dict[tag_name] = tag_value
+                offset = simple_tag_end
+
+            elif (element_size is None or element_id in (0x18538067, 0x1254C367, 0x7373)):
+                # Step in to the Segment, Tags and Tag elements and any of unknown size (as KVS uses for Cluster).
+                offset = payload_offset
+
+            else:
+                # Skip the payload of everything else.
+                offset = payload_offset + element_size
+
+        if (not segment_found):
+            raise KeyError('Segment Element required but not found in fragment_bytes' )
+
+        return simple_tags_dict
+
+    def _read_simple_tag(self, fragment_bytes, offset, simple_tag_end):
+        '''
+        Returns the (TagName, TagValue) of the SimpleTag whose children are between the given offsets.
+        '''
+        tag_name = None
+        tag_value = None
+        while True:
+            header = read_element_header(fragment_bytes, offset, simple_tag_end)
+            if header is None or header[1] is None:
+                break
+
+            element_id, element_size, payload_offset = header
+            offset = payload_offset + element_size
+            if (offset > simple_tag_end):
+                break
+
+            if (element_id == 0x45A3):                              # Tag Name element type ID
+                tag_name = self._decode_utf8(fragment_bytes[payload_offset : offset])
+            elif (element_id == 0x4487):                            # TagString element type ID
+                tag_value = self._decode_utf8(fragment_bytes[payload_offset : offset])
+            elif (element_id == 0x4485):                            # TagBinary element type ID
+                tag_value = bytes(fragment_bytes[payload_offset : offset])
+
+        return tag_name, tag_value
+
+    def _decode_utf8(self, value_bytes):
+        '''
+        Decodes an EBML UTF-8 string payload, which may be padded with trailing nulls.
+        '''
+        return str(bytes(value_bytes).partition(b'\x00')[0], 'utf_8')
+
+    def save_fragment_as_local_mkv(self, fragment_bytes, file_name_path):
+        '''
+        Saves the fragment as a stand-alone MKV file on local disk. To archive every fragment of a stream, use
+        the KvsRollingMkvWriter in kinesis_video_fragment_writers.py which buffers writes and rotates files.
+
+        ### Parameters:
+
+            **fragment_bytes**: bytes-like
+                The raw bytes of the MKV fragment as returned to the on_fragment_arrived callback.
+
+            **file_name_path**: str
+                Path of the MKV file to write.
+
+        '''
+        with open(file_name_path, 'wb') as mkv_file:
+            mkv_file.write(fragment_bytes)
+
     def get_fragement_dom_pretty_string(self, fragment_dom):
         '''
         Returns the Pretty Print parsing of the EBMLite fragment DOM as a string
@@ -126,59 +417,103 @@ class KvsFragmentProcessor():
 
             ### Parameters:
 
-                **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument>
-                    The DOM like structure describing the fragment parsed by EBMLite. 
+                **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                    The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
 
             ### Return:
                 **track_information**: object
                     Contains information about the tracks received
             '''
 
-            segment_element = None
-            for element in fragment_dom:
-                if (element.id == 0x18538067):          # MKV Segment Element ID
-                    segment_element = element
-                    break
-            
-            if (not segment_element):
-                raise KeyError('Segment Element required but not found in fragment_doc' )
+            fragment_index = self.get_fragment_index(fragment_dom)
 
+            return self._read_aws_connect_track_info(fragment_index.track_entries)
+
+    def _read_aws_connect_track_info(self, track_entries):
+            '''
+            Returns the Audio Track Information, as get_aws_connect_track_info(), read from the given TrackEntry
+            elements.
+
+            ### Parameters:
+
+                **track_entries**: list
+                    The TrackEntry elements of the fragment.
+
+            ### Return:
+                **track_information**: object
+                    Contains information about the tracks received
+            '''
             track_information = {
             }
 
-            for element in segment_element:
-                if (element.id == 0x1654AE6B):                  # Tracks Master Element ID
-                    for trackentry in element:
-                        track_number = None
-                        track_uid = None
-                        track_type = None
-                        track_codec_id = None
-                        track_name = None
-                        for track_info in trackentry:
-                            if (track_info.id == 0xD7):         # Track Number Element ID
-                                track_number = track_info.value
-                            elif (track_info.id == 0x73C5):     # Track UID Element ID
-                                track_uid = track_info.value
-                            elif (track_info.id == 0x83):       #Track Type Element ID
-                                track_type = track_info.value   # Should always be 2 for Audio
-                            elif (track_info.id == 0x86):       # Track Codec Element ID
-                                track_codec_id = track_info.value
-                            elif (track_info.id == 0x536E):     # Track Name Element ID
-                                track_name = track_info.value   # Should contain either AUDIO_FROM_CUSTOMER or AUDIO_TO_CUSTOMER
-                            if (track_name and track_name not in track_information):
-                                track_information[track_name] = {}
-                                track_information[track_name]["track_number"] = track_number
-                                track_information[track_name]["track_uid"] = track_uid
-                                track_information[track_name]["track_type"] = track_type
-                                track_information[track_name]["track_codec_id"] = track_codec_id
+            for trackentry in track_entries:
+                track_number = None
+                track_uid = None
+                track_type = None
+                track_codec_id = None
+                track_name = None
+                for track_info in trackentry:
+                    if (track_info.id == 0xD7):         # Track Number Element ID
+                        track_number = track_info.value
+                    elif (track_info.id == 0x73C5):     # Track UID Element ID
+                        track_uid = track_info.value
+                    elif (track_info.id == 0x83):       #Track Type Element ID
+                        track_type = track_info.value   # Should always be 2 for Audio
+                    elif (track_info.id == 0x86):       # Track Codec Element ID
+                        track_codec_id = track_info.value
+                    elif (track_info.id == 0x536E):     # Track Name Element ID
+                        track_name = track_info.value   # Should contain either AUDIO_FROM_CUSTOMER or AUDIO_TO_CUSTOMER
+                    if (track_name and track_name not in track_information):
+                        track_information[track_name] = {}
+                        track_information[track_name]["track_number"] = track_number
+                        track_information[track_name]["track_uid"] = track_uid
+                        track_information[track_name]["track_type"] = track_type
+                        track_information[track_name]["track_codec_id"] = track_codec_id
 
             return track_information
         
-    def get_aws_connect_audio(self, fragment_dom):
+    def get_track_payloads(self, fragment_dom, fragment_bytes=None):
+        '''
+        Returns the payload of every track in the fragment. SimpleBlock headers are fully decoded (variable length
+        track number, relative timecode, flags and Xiph / EBML / fixed size lacing) so any number of tracks and
+        producers other than AWS Connect are supported.
+
+        ### Parameters:
+
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
+
+            **fragment_bytes**: bytes-like
+                Optional. The raw bytes the fragment DOM was parsed from. If provided, blocks are read as
+                memoryviews of these bytes rather than being read from the DOM.
+
+        ### Return:
+            **track_payloads**: dict
+                Track number to the joined frames of the track (bytes).
+        '''
+        fragment_index = self.get_fragment_index(fragment_dom)
+        block_demuxer = KvsBlockDemuxer()
+
+        for block in self._get_block_payloads(fragment_index, fragment_bytes):
+            block_demuxer.add_block(block)
+
+        return block_demuxer.get_track_payloads()
+
+    def _get_block_payloads(self, fragment_index, fragment_bytes=None):
+        '''
+        Returns the payload of each SimpleBlock, as memoryviews of fragment_bytes if provided.
+        '''
+        if fragment_bytes is None:
+            return [simple_block.value for simple_block in fragment_index.simple_blocks]
+
+        fragment_view = memoryview(fragment_bytes)
+        return [fragment_view[offset : offset + size] for offset, size in fragment_index.block_offsets]
+
+    def get_aws_connect_audio(self, fragment_dom, fragment_bytes=None):
         '''
         Returns the actual audio bytes received for each track
 
-        One bytearray for each track present:
+        One bytearray for each track present (track_1 and track_2 are always returned):
 
         {
             "track_1": bytearray(),
@@ -190,42 +525,332 @@ class KvsFragmentProcessor():
 
         ### Parameters:
 
-            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument>
-                The DOM like structure describing the fragment parsed by EBMLite. 
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
+
+            **fragment_bytes**: bytes-like
+                Optional. The raw bytes the fragment DOM was parsed from, see get_track_payloads().
 
         ### Return:
             **track_audio_data**: dict
                 The audio data received
         '''
 
-        segment_element = None
-        for element in fragment_dom:
-            if (element.id == 0x18538067):          # MKV Segment Element ID
-                segment_element = element
-                break
-        
-        if (not segment_element):
-            raise KeyError('Segment Element required but not found in fragment_doc' )
-        
-        simple_block_elements = []
-        for element in segment_element:
-            if element.id == 0x1F43B675:
-                for tags in element:
-                    if tags.id == 0xA3:				# Simple Blocks Element ID
-                        simple_block_elements.append(tags)
+        fragment_index = self.get_fragment_index(fragment_dom)
+        block_demuxer = KvsBlockDemuxer()
+
+        for block in self._get_block_payloads(fragment_index, fragment_bytes):
+            block_demuxer.add_block(block)
 
         track_audio_data = {
             "track_1": bytearray(),
             "track_2": bytearray()
         }
 
-        for simple_block in simple_block_elements:
-            track_number_byte = simple_block.value[0]   # first byte contains track number in VINT encoding
-            new_block = simple_block.value[4:]          # first four bytes are headers so ignore
+        for track_number, track_payload in block_demuxer.get_track_payloads(bytearray).items():
+            track_audio_data['track_{}'.format(track_number)] = track_payload
+
+        return track_audio_data
+
+    def get_aws_connect_audio_ndarray(self, fragment_dom, fragment_bytes=None):
+        '''
+        Returns the audio received for each track as NumPy arrays of 16 bit PCM samples, ready for vectorized
+        processing (ASR, analytics etc.) without converting the bytes first. Requires NumPy.
+
+        The samples array is created with np.frombuffer over the joined track payload so no further copy is made.
+        It is read-only, copy it before modifying in place.
+
+        {
+            "track_1": {
+                "samples": np.ndarray (int16, little-endian as per A_PCM/INT/LIT),
+                "block_timestamps": np.ndarray (int64),
+                "block_sample_offsets": np.ndarray (int64)
+            },
+            "track_2": { ... }
+        }
+
+        block_timestamps holds the absolute timestamp in nanoseconds of each block of the track (Cluster Timecode
+        plus the block's relative timecode, scaled by TimecodeScale) and block_sample_offsets the index of each
+        block's first sample in samples.
+
+        ### Parameters:
 
-            if track_number_byte == 0x81:               # 0x81 VINT encoding of decimal 1
-                track_audio_data['track_1'].extend(new_block)
-            elif track_number_byte == 0x82:             # 0x82 VINT encoding of decimal 2
-                track_audio_data['track_2'].extend(new_block)
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
+
+            **fragment_bytes**: bytes-like
+                Optional. The raw bytes the fragment DOM was parsed from, see get_track_payloads().
+
+        ### Return:
+            **track_audio_data**: dict
+                The audio samples and block timestamps of each track present
+        '''
+        if np is None:
+            raise ImportError('NumPy is required for get_aws_connect_audio_ndarray()')
+
+        fragment_index = self.get_fragment_index(fragment_dom)
+        block_demuxer = KvsBlockDemuxer()
+
+        block_timestamps = {}
+        block_sample_offsets = {}
+        track_lengths = {}
+
+        blocks = self._get_block_payloads(fragment_index, fragment_bytes)
+        for block, cluster_timecode in zip(blocks, fragment_index.block_cluster_timecodes):
+            track_number, relative_timecode, _, frames = block_demuxer.add_block(block)
+
+            track_length = track_lengths.get(track_number, 0)
+            block_timestamps.setdefault(track_number, []).append(((cluster_timecode or 0) + relative_timecode) * fragment_index.timecode_scale)
+            block_sample_offsets.setdefault(track_number, []).append(track_length // 2)
+            track_lengths[track_number] = track_length + sum(len(frame) for frame in frames)
+
+        track_audio_data = {}
+        for track_number, track_payload in block_demuxer.get_track_payloads().items():
+            track_audio_data['track_{}'.format(track_number)] = {
+                "samples": np.frombuffer(track_payload, dtype='<i2', count=len(track_payload) // 2),
+                "block_timestamps": np.array(block_timestamps[track_number], dtype=np.int64),
+                "block_sample_offsets": np.array(block_sample_offsets[track_number], dtype=np.int64)
+            }
 
         return track_audio_data
+
+    def get_block_timestamps_ndarray(self, fragment_dom, fragment_bytes=None):
+        '''
+        Returns the absolute timestamp, track number, keyframe flag and byte offset / size of every SimpleBlock
+        in the fragment as NumPy arrays, for alignment of tracks, seeking and latency measurement. Requires NumPy.
+
+        Timestamps are the Cluster Timecode plus each block's relative timecode, scaled by the Segment TimecodeScale.
+        If the fragment has an AWS_KINESISVIDEO_PRODUCER_TIMESTAMP tag, producer_timestamps are the same timestamps
+        aligned so the fragment's first Cluster starts at the producer timestamp (the wall-clock time of the frame).
+
+        With fragment_bytes, the block headers are decoded in vectorized form directly from the fragment bytes.
+
+        {
+            "timestamps": np.ndarray (int64, nanoseconds),
+            "producer_timestamps": np.ndarray (int64, nanoseconds since the epoch) or None,
+            "track_numbers": np.ndarray (int64),
+            "keyframes": np.ndarray (bool),
+            "offsets": np.ndarray (int64, payload offset of the block in the fragment bytes),
+            "sizes": np.ndarray (int64, payload size of the block)
+        }
+
+        ### Parameters:
+
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
+
+            **fragment_bytes**: bytes-like
+                Optional. The raw bytes the fragment DOM was parsed from.
+
+        ### Return:
+            **block_arrays**: dict
+                The per block arrays, in fragment order.
+        '''
+        if np is None:
+            raise ImportError('NumPy is required for get_block_timestamps_ndarray()')
+
+        fragment_index = self.get_fragment_index(fragment_dom)
+        block_count = len(fragment_index.block_offsets)
+
+        offsets = np.fromiter((offset for offset, _ in fragment_index.block_offsets), dtype=np.int64, count=block_count)
+        sizes = np.fromiter((size for _, size in fragment_index.block_offsets), dtype=np.int64, count=block_count)
+        cluster_timecodes = np.fromiter((timecode or 0 for timecode in fragment_index.block_cluster_timecodes),
+                                        dtype=np.int64, count=block_count)
+
+        fragment_array = None
+        if (fragment_bytes is not None):
+            fragment_array = np.frombuffer(fragment_bytes, dtype=np.uint8)
+
+        if (fragment_array is not None and block_count and (fragment_array[offsets] & 0x80).all()):
+            # All track numbers are single byte VINTs (tracks 1 to 126), decode every header at once.
+            track_numbers = (fragment_array[offsets] & 0x7F).astype(np.int64)
+            relative_timecodes = ((fragment_array[offsets + 1].astype(np.uint16) << 8) |
+                                  fragment_array[offsets + 2]).astype(np.int16)
+            flags = fragment_array[offsets + 3]
+        else:
+            track_numbers = np.empty(block_count, dtype=np.int64)
+            relative_timecodes = np.empty(block_count, dtype=np.int16)
+            flags = np.empty(block_count, dtype=np.uint8)
+            for block_no, block in enumerate(self._get_block_payloads(fragment_index, fragment_bytes)):
+                track_numbers[block_no], relative_timecodes[block_no], flags[block_no], _ = read_block_header(block)
+
+        timestamps = (cluster_timecodes + relative_timecodes) * fragment_index.timecode_scale
+
+        producer_timestamps = None
+        producer_timestamp = self.get_fragment_tags(fragment_index).get('AWS_KINESISVIDEO_PRODUCER_TIMESTAMP')
+        if (producer_timestamp and block_count):
+            fragment_start = cluster_timecodes[0] * fragment_index.timecode_scale
+            producer_timestamps = timestamps - fragment_start + int(Decimal(producer_timestamp) * 1000000000)
+
+        return {
+            "timestamps": timestamps,
+            "producer_timestamps": producer_timestamps,
+            "track_numbers": track_numbers,
+            "keyframes": (flags & KEYFRAME_FLAG) != 0,
+            "offsets": offsets,
+            "sizes": sizes
+        }
+
+    def get_frames_as_ndarray(self, fragment_dom, one_in_frames_ratio=1, keyframes_only=False,
+                              frame_decoder=None, track_number=None, fragment_bytes=None):
+        '''
+        Decodes the video frames of the fragment and returns one in every one_in_frames_ratio frames as NDArrays.
+
+        With keyframes_only, only the SimpleBlocks flagged as keyframes (IDR frames for H.264 / H.265) are passed
+        to the decoder and all others are skipped before decoding, which is far cheaper when sampling, for example,
+        1 frame per second from a stream with a 1 second keyframe interval.
+
+        ### Parameters:
+
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
+
+            **one_in_frames_ratio**: int
+                Return one in every this many decoded frames, starting with the first.
+
+            **keyframes_only**: bool
+                Only decode keyframes. one_in_frames_ratio then applies to the keyframes.
+
+            **frame_decoder**: KvsFrameDecoder
+                Optional decoder backend, defaults to the PyAvFrameDecoder.
+
+            **track_number**: int
+                Optional video track number, defaults to the first video track of the fragment.
+
+            **fragment_bytes**: bytes-like
+                Optional. The raw bytes the fragment DOM was parsed from, see get_track_payloads().
+
+        ### Return:
+            **ndarray_frames**: list
+                The selected frames as NDArrays (by default bgr24 as per OpenCV).
+        '''
+        frame_decoder = frame_decoder or PyAvFrameDecoder()
+
+        ndarray_frames = []
+        for frame in self._decode_frames(fragment_dom, one_in_frames_ratio, keyframes_only,
+                                         frame_decoder, track_number, fragment_bytes):
+            ndarray_frames.append(frame_decoder.to_ndarray(frame))
+
+        return ndarray_frames
+
+    def save_frames_as_jpeg(self, fragment_dom, one_in_frames_ratio, jpg_file_base_path, keyframes_only=False,
+                            frame_decoder=None, track_number=None, fragment_bytes=None):
+        '''
+        Decodes the video frames of the fragment and saves one in every one_in_frames_ratio frames as JPEGs
+        to local disk named {jpg_file_base_path}-{frame number}.jpg. See get_frames_as_ndarray().
+
+        ### Parameters:
+
+            **jpg_file_base_path**: str
+                Path and file name prefix of the JPEGs.
+
+        ### Return:
+            **jpeg_paths**: list
+                The paths of the saved JPEGs.
+        '''
+        frame_decoder = frame_decoder or PyAvFrameDecoder()
+
+        jpeg_paths = []
+        for frame in self._decode_frames(fragment_dom, one_in_frames_ratio, keyframes_only,
+                                         frame_decoder, track_number, fragment_bytes):
+            jpeg_path = '{}-{}.jpg'.format(jpg_file_base_path, len(jpeg_paths))
+            frame_decoder.save_jpeg(frame, jpeg_path)
+            jpeg_paths.append(jpeg_path)
+
+        return jpeg_paths
+
+    def get_frames_as_annex_b(self, fragment_dom, nal_unit_parser, keyframes_only=False,
+                              track_number=None, fragment_bytes=None):
+        '''
+        Returns the H.264 / H.265 video frames of the fragment converted from length-prefixed NAL units to Annex-B,
+        with the CodecPrivate parameter sets placed ahead of each keyframe. Ready to feed to a raw H.264 / H.265
+        decoder or append to a .h264 / .h265 archive.
+
+        ### Parameters:
+
+            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument> | FragmentIndex
+                The DOM like structure describing the fragment parsed by EBMLite, or its FragmentIndex. 
+
+            **nal_unit_parser**: KvsNalUnitParser
+                The stream's parser, which caches each track's parsed CodecPrivate across fragments.
+
+            **keyframes_only**: bool
+                Only return keyframes.
+
+            **track_number**: int
+                Optional video track number, defaults to the first video track of the fragment.
+
+            **fragment_bytes**: bytes-like
+                Optional. The raw bytes the fragment DOM was parsed from, see get_track_payloads().
+
+        ### Return:
+            **annex_b_frames**: list
+                The (is_keyframe, annex_b_frame) of each frame.
+        '''
+        fragment_index = self.get_fragment_index(fragment_dom)
+        track_number, codec_id, codec_private = self._get_video_track(fragment_index, track_number)
+        codec_config = nal_unit_parser.get_codec_config(track_number, codec_id, codec_private)
+
+        annex_b_frames = []
+        for block in self._get_block_payloads(fragment_index, fragment_bytes):
+            block_track_number, _, flags, frames = read_block_frames(block)
+            is_keyframe = bool(flags & KEYFRAME_FLAG)
+            if (block_track_number != track_number or (keyframes_only and not is_keyframe)):
+                continue
+
+            for frame in frames:
+                annex_b_frames.append((is_keyframe, nal_unit_parser.to_annex_b(codec_config, frame, is_keyframe)))
+
+        return annex_b_frames
+
+    def _decode_frames(self, fragment_dom, one_in_frames_ratio, keyframes_only,
+                       frame_decoder, track_number, fragment_bytes):
+        '''
+        Yields one in every one_in_frames_ratio decoded frames of the video track.
+        '''
+        if (one_in_frames_ratio < 1):
+            raise ValueError('one_in_frames_ratio must be 1 or more')
+
+        fragment_index = self.get_fragment_index(fragment_dom)
+        track_number, codec_id, codec_private = self._get_video_track(fragment_index, track_number)
+
+        packets = []
+        for block in self._get_block_payloads(fragment_index, fragment_bytes):
+            block_track_number, _, flags, frames = read_block_frames(block)
+            if (block_track_number != track_number):
+                continue
+            if (keyframes_only and not flags & KEYFRAME_FLAG):
+                # Skip non-IDR frames before decoding.
+                continue
+            packets.extend(frames)
+
+        for frame_no, frame in enumerate(frame_decoder.decode(codec_id, codec_private, packets)):
+            if (frame_no % one_in_frames_ratio == 0):
+                yield frame
+
+    def _get_video_track(self, fragment_index, track_number=None):
+        '''
+        Returns the (track_number, codec_id, codec_private) of the given track, or if None the first video track.
+        '''
+        for trackentry in fragment_index.track_entries:
+            entry_track_number = None
+            track_type = None
+            track_codec_id = None
+            track_codec_private = None
+            for track_info in trackentry:
+                if (track_info.id == 0xD7):             # Track Number Element ID
+                    entry_track_number = track_info.value
+                elif (track_info.id == 0x83):           # Track Type Element ID
+                    track_type = track_info.value       # 1 for Video
+                elif (track_info.id == 0x86):           # Track Codec Element ID
+                    track_codec_id = track_info.value
+                elif (track_info.id == 0x63A2):         # Track CodecPrivate Element ID
+                    # Copied out so caching it doesn't hold on to the fragment bytes.
+                    track_codec_private = bytes(track_info.value)
+
+            if (entry_track_number == track_number or (track_number is None and track_type == 1)):
+                return entry_track_number, track_codec_id, track_codec_private
+
+        if (track_number is None):
+            raise KeyError('No video track found in fragment')
+        raise KeyError('Track {} not found in fragment'.format(track_number))
@@ -0,0 +1,697 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This module provides an incremental MKV fragment boundary scanner and a reusable chunk buffer for the raw
+bytes (chunks) read from a KVS GetMedia or GetMediaForFragmentList StreamingBody.
+
+Rather than re-parsing the entire buffered data with EBMLite every time a new chunk arrives, the scanner
+remembers how far into the buffer it has already read and only decodes the element headers (ID and size)
+of newly appended bytes. Element payloads are skipped by size, so the work done per chunk is proportional
+to the chunk and the total work is linear in the size of the stream.
+
+A fragment ends at:
+1) The end of its Segment, if the Segment is of known size, as soon as all of its bytes have arrived,
+2) Otherwise (as for the unknown size Segments produced by KVS GetMedia), the EBML header of the next
+fragment or the end of the stream (see flush()). KVS may write several top level Tags elements after a
+fragment's Cluster (e.g. MILLIS_BEHIND_NOW, ContactId or error tags), so none of them can be taken as the
+last element of the fragment.
+
+So as not to wait a whole fragment duration for the next EBML header, the scanner also reports when a fragment
+is ending: a Tags element following its Cluster has completely arrived and no bytes have arrived after it (see
+fragment_ending). The KvsFragmentIdleFlusher delivers such a fragment once no more bytes arrive for a short
+idle interval.
+
+No bytes are dropped between fragments: any that follow a known size Segment (or a flushed fragment) before
+the next EBML header are delivered at the start of the next fragment (or by flush()).
+
+The KvsChunkBuffer holds the received bytes with a consumed-offset cursor so delivered fragments are handed
+over as memoryviews rather than sliced copies, and remaining bytes are only moved when the wasted space at
+the front of the buffer exceeds a threshold.
+
+The KvsFragmentReader combines the two: chunks are fed in as they are read from any source (threaded, asyncio
+or in-line) and complete fragments are returned as KvsFragment objects, so every consumer shares the same
+boundary logic.
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import timeit
+import logging
+import threading
+from amazon_kinesis_video_consumer_library.ebmlite.decoding import decodeElementHeader, getHeaderBytesNeeded
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# Default seconds without new bytes after the trailing Tags of a fragment before it is flushed.
+DEFAULT_FRAGMENT_IDLE_FLUSH_INTERVAL = 0.2
+
+# Default initial capacity and compaction threshold of the KvsChunkBuffer.
+DEFAULT_CHUNK_BUFFER_CAPACITY = 256 * 1024
+DEFAULT_CHUNK_BUFFER_COMPACT_THRESHOLD = 1024 * 1024
+
+# EBML (Master) element ID = 0x1A45DFA3, indicates the start of a new MKV fragment.
+EBML_HEADER_ELEMENT_ID = 0x1A45DFA3
+SEGMENT_ELEMENT_ID = 0x18538067
+CLUSTER_ELEMENT_ID = 0x1F43B675
+TAGS_ELEMENT_ID = 0x1254C367
+
+
+def read_element_header(buffer, offset, buffer_length):
+    '''
+    Decodes an EBML element header (ID and size) directly from the buffer at the given offset, checking first that
+    the whole header has been received. Decoding is done by ebmlite.decoding.decodeElementHeader.
+
+    ### Returns:
+
+        (element_id, element_size, payload_offset) or None if the header has not been completely received yet.
+        element_size is None for elements of unknown ('infinite') size.
+
+    '''
+    header = decodeElementHeader(buffer, offset, buffer_length)
+    if header is None:
+        return None
+
+    element_id, id_length, size, size_length = header
+    return element_id, size, offset + id_length + size_length
+
+
+class KvsFragmentScanner():
+
+    def __init__(self, detect_fragment_end=True):
+        '''
+        Initialize the incremental fragment boundary scanner.
+
+        Offsets are relative to the start of the buffer passed to scan(). If the caller removes bytes from the
+        front of its buffer it must call discard() with the number of bytes removed so the scanner stays in sync.
+
+        ### Parameters:
+
+            **detect_fragment_end**: bool
+                If True (default) fragments with a Segment of known size are reported as soon as the Segment has
+                arrived. If False, only the EBML header of the next fragment (or flush()) ends a fragment.
+        '''
+        self.detect_fragment_end = detect_fragment_end
+
+        # Offset of the next element header to be read.
+        self._scan_offset = 0
+
+        # Offset of the EBML header of the fragment currently being received (None until the first is found).
+        self._fragment_start = None
+
+        # Offset the current fragment is known to end at once its structure has been read, else None.
+        self._fragment_end = None
+
+        # End offset of the last fragment reported at its known Segment end, where the next fragment starts.
+        self._next_fragment_start = None
+
+        # Bytes needed past the end of the buffer (as of the last scan) before scanning can progress.
+        self._bytes_needed = 0
+
+        # Length of the buffer passed to the last scan.
+        self._buffer_length = 0
+
+        # Whether the current fragment's Cluster has started and the end offset of the last Tags element
+        # read after it (None if any other element followed).
+        self._cluster_started = False
+        self._trailing_tags_end = None
+
+    @property
+    def fragment_start(self):
+        '''
+        Offset of the EBML header of the fragment currently being received or None if not yet found.
+        '''
+        return self._fragment_start
+
+    @property
+    def bytes_needed(self):
+        '''
+        Number of bytes that must be appended to the buffer passed to the last scan() before another element
+        header can be read or the current fragment completes: the rest of an element whose payload is being
+        skipped, or of a truncated element header. If the length of a header is not yet known, this is the
+        minimum (an element header is at least 2 bytes).
+        '''
+        return self._bytes_needed
+
+    @property
+    def fragment_ending(self):
+        '''
+        True if a Tags element following the current fragment's Cluster has completely arrived and the buffer
+        passed to the last scan ends with it, so the fragment is likely to be complete. As more Tags may still
+        follow, the fragment is not reported by scan(): the caller can flush() it once no more bytes arrive.
+        '''
+        return (self._fragment_start is not None and self._trailing_tags_end is not None
+                and self._scan_offset == self._trailing_tags_end == self._buffer_length)
+
+    def scan(self, buffer):
+        '''
+        Scans the bytes appended to the buffer since the last call and returns the byte ranges of any
+        fragments found to be complete.
+
+        Master elements of unknown size (as KVS uses for Segment and Cluster) are descended into, all other
+        elements are skipped by their size without reading the payload.
+
+        ### Parameters:
+
+            **buffer**: bytes-like
+                The raw bytes read from the stream so far (less any discarded).
+
+        ### Returns:
+
+            fragment_ranges: list
+
+            List of (start, end) offset tuples in the buffer, one per completed fragment, in stream order.
+
+        '''
+        fragment_ranges = []
+        buffer_length = len(buffer)
+        self._buffer_length = buffer_length
+
+        while True:
+            # Report the current fragment as soon as all of its bytes have arrived.
+            if (self._fragment_end is not None and self._fragment_end <= buffer_length):
+                fragment_ranges.append((self._fragment_start, self._fragment_end))
+                self._next_fragment_start = self._fragment_end
+                self._start_fragment(None)
+
+            header = read_element_header(buffer, self._scan_offset, buffer_length)
+            if header is None:
+                if (self._scan_offset > buffer_length):
+                    # Skipping a payload that has not completely arrived.
+                    self._bytes_needed = self._scan_offset - buffer_length
+                else:
+                    self._bytes_needed = getHeaderBytesNeeded(buffer, self._scan_offset, buffer_length)
+                break
+
+            element_id, element_size, payload_offset = header
+
+            if (element_id == EBML_HEADER_ELEMENT_ID):
+                # The start of a new fragment is the end of the one before it (if not already reported).
+                if (self._fragment_start is not None):
+                    fragment_ranges.append((self._fragment_start, self._scan_offset))
+                    self._start_fragment(self._scan_offset)
+                elif (self._next_fragment_start is not None):
+                    # Keep any bytes after the last reported Segment with this fragment.
+                    self._start_fragment(self._next_fragment_start)
+                else:
+                    self._start_fragment(self._scan_offset)
+                self._next_fragment_start = None
+
+            elif (self.detect_fragment_end and self._fragment_start is not None
+                  and element_id == SEGMENT_ELEMENT_ID and element_size is not None):
+                # Known size Segment, the fragment ends with it.
+                self._fragment_end = payload_offset + element_size
+
+            elif (element_id == CLUSTER_ELEMENT_ID):
+                self._cluster_started = True
+                self._trailing_tags_end = None
+
+            elif (self._cluster_started):
+                # Tags can not be children of the Cluster, so these follow it.
+                if (element_id == TAGS_ELEMENT_ID and element_size is not None):
+                    self._trailing_tags_end = payload_offset + element_size
+                else:
+                    self._trailing_tags_end = None
+
+            if (element_size is None):
+                # Unknown size, step in to the element's children.
+                self._scan_offset = payload_offset
+            else:
+                # Skip the payload. This may run past the end of the buffer in which case scanning
+                # resumes once the rest of the element has arrived.
+                self._scan_offset = payload_offset + element_size
+
+        return fragment_ranges
+
+    def flush(self, buffer_length):
+        '''
+        Ends the fragment currently being received, for use once the stream has no more bytes so the
+        trailing fragment is not lost, or once an ending fragment (see fragment_ending) has been idle. Any bytes
+        received after this are kept for the next fragment.
+
+        ### Parameters:
+
+            **buffer_length**: int
+                The number of bytes in the buffer.
+
+        ### Returns:
+
+            fragment_range: tuple
+
+            The (start, end) offsets of the trailing fragment or None if there is no fragment data pending.
+
+        '''
+        fragment_start = self._fragment_start
+        if (fragment_start is None):
+            # Bytes received after the last reported Segment, if any.
+            fragment_start = self._next_fragment_start
+        self._start_fragment(None)
+        self._next_fragment_start = buffer_length
+        self._scan_offset = max(self._scan_offset, buffer_length)
+        self._bytes_needed = 0
+
+        if (fragment_start is None or fragment_start >= buffer_length):
+            return None
+
+        return (fragment_start, buffer_length)
+
+    def _start_fragment(self, fragment_start):
+        '''
+        Resets the per-fragment state for a fragment starting at the given offset (or None if between fragments).
+        '''
+        self._fragment_start = fragment_start
+        self._fragment_end = None
+        self._cluster_started = False
+        self._trailing_tags_end = None
+
+    def discard(self, count):
+        '''
+        Re-bases the scanner after the caller removed count bytes from the front of its buffer.
+
+        ### Parameters:
+
+            **count**: int
+                The number of bytes removed from the front of the buffer.
+
+        '''
+        self._scan_offset -= count
+        self._buffer_length -= count
+        if (self._fragment_start is not None):
+            self._fragment_start -= count
+        if (self._fragment_end is not None):
+            self._fragment_end -= count
+        if (self._next_fragment_start is not None):
+            self._next_fragment_start -= count
+        if (self._trailing_tags_end is not None):
+            self._trailing_tags_end -= count
+
+
+class KvsChunkBuffer():
+
+    def __init__(self, 
+                initial_capacity=DEFAULT_CHUNK_BUFFER_CAPACITY, 
+                compact_threshold=DEFAULT_CHUNK_BUFFER_COMPACT_THRESHOLD):
+        '''
+        Initialize a growable byte buffer with a consumed-offset cursor.
+
+        Chunks are copied once into the buffer by extend(). Fragments are read out as memoryviews by view() and
+        released with consume() which only moves the cursor. Bytes already handed out as a view are never
+        overwritten: if a view is still referenced when the buffer needs to compact or grow, the remaining bytes
+        are moved to new storage and the old storage is left to the outstanding views.
+
+        ### Parameters:
+
+            **initial_capacity**: int
+                Initial size of the backing storage in bytes.
+
+            **compact_threshold**: int
+                Number of consumed bytes at the front of the buffer above which they are reclaimed (rather than
+                the buffer growing) when it runs out of space.
+        '''
+        self.compact_threshold = compact_threshold
+
+        self._buffer = bytearray(initial_capacity)
+
+        # Offset of the first unconsumed byte and end of the received data in the backing storage.
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def capacity(self):
+        '''
+        Size of the backing storage in bytes.
+        '''
+        return len(self._buffer)
+
+    def extend(self, chunk):
+        '''
+        Appends a chunk of bytes to the buffer.
+
+        ### Parameters:
+
+            **chunk**: bytes-like
+                The bytes to append.
+
+        '''
+        chunk_length = len(chunk)
+        if (self._end + chunk_length > len(self._buffer)):
+            self._make_room(chunk_length)
+
+        self._buffer[self._end : self._end + chunk_length] = chunk
+        self._end += chunk_length
+
+    def view(self, start=0, end=None):
+        '''
+        Returns a zero-copy memoryview of the unconsumed bytes between the given offsets.
+
+        ### Parameters:
+
+            **start**: int
+                Offset relative to the first unconsumed byte.
+
+            **end**: int
+                End offset relative to the first unconsumed byte, defaults to the end of the received data.
+
+        ### Returns:
+
+            buffer_view: memoryview
+
+        '''
+        end = len(self) if end is None else end
+        return memoryview(self._buffer)[self._start + start : self._start + end]
+
+    def consume(self, count):
+        '''
+        Marks count bytes from the front of the buffer as consumed.
+
+        ### Parameters:
+
+            **count**: int
+                The number of bytes consumed.
+
+        '''
+        if (count > len(self)):
+            raise ValueError('Cannot consume %d bytes from a buffer of %d' % (count, len(self)))
+        self._start += count
+
+    def _is_exported(self):
+        '''
+        Returns True if any memoryview of the backing storage is still referenced.
+        '''
+        try:
+            # A bytearray cannot be resized while it has exports.
+            self._buffer.append(0)
+            self._buffer.pop()
+            return False
+        except BufferError:
+            return True
+
+    def _make_room(self, chunk_length):
+        '''
+        Compacts or grows the backing storage so chunk_length more bytes fit after the received data.
+        '''
+        data_length = self._end - self._start
+        required_capacity = data_length + chunk_length
+        capacity = len(self._buffer)
+
+        if (self._start < self.compact_threshold or required_capacity > capacity):
+            capacity = max(capacity * 2, required_capacity)
+        elif (not self._is_exported()):
+            # Reclaim the consumed bytes in place.
+            buffer_view = memoryview(self._buffer)
+            buffer_view[0 : data_length] = buffer_view[self._start : self._end]
+            buffer_view.release()
+            self._start = 0
+            self._end = data_length
+            return
+
+        storage = bytearray(capacity)
+        with memoryview(self._buffer) as buffer_view:
+            storage[0 : data_length] = buffer_view[self._start : self._end]
+        self._buffer = storage
+        self._start = 0
+        self._end = data_length
+
+
+class KvsFragment():
+
+    __slots__ = ("stream_name", "fragment_bytes", "fragment_receive_duration", "_schema", "_fragment_dom")
+
+    def __init__(self, stream_name, fragment_bytes, fragment_receive_duration, schema):
+        '''
+        A complete MKV fragment read from a Kinesis Video Stream.
+
+        ### Parameters:
+
+            **stream_name**: str
+                The name (or ARN) of the stream the fragment was read from.
+
+            **fragment_bytes**: memoryview
+                The raw bytes of the fragment, a read-only view of the reader's buffer. The view stays valid
+                while referenced but pins the buffer's storage (see KvsChunkBuffer), copy it with bytes() to keep
+                the fragment for long.
+
+            **fragment_receive_duration**: float
+                Seconds taken to receive the fragment, for telemetry.
+
+            **schema**: ebmlite.core.Schema
+                The EBMLite MKV schema used to parse fragment_dom.
+        '''
+        self.stream_name = stream_name
+        self.fragment_bytes = fragment_bytes
+        self.fragment_receive_duration = fragment_receive_duration
+        self._schema = schema
+        self._fragment_dom = None
+
+    def __repr__(self):
+        return "<%s stream %r, %d bytes>" % (self.__class__.__name__, self.stream_name, len(self.fragment_bytes))
+
+    @property
+    def fragment_dom(self):
+        '''
+        The DOM like structure of the fragment parsed by EBMLite. Parsed on first access.
+        '''
+        if self._fragment_dom is None:
+            self._fragment_dom = self._schema.loads(self.fragment_bytes)
+        return self._fragment_dom
+
+
+class KvsFragmentReader():
+
+    def __init__(self, stream_name, schema, detect_fragment_end=True, chunk_buffer=None):
+        '''
+        Assembles complete MKV fragments from chunks of raw bytes fed in as they are read from a stream.
+
+        ### Parameters:
+
+            **stream_name**: str
+                The name (or ARN) of the stream, set on each KvsFragment.
+
+            **schema**: ebmlite.core.Schema
+                The EBMLite MKV schema used to parse fragment DOMs.
+
+            **detect_fragment_end**: bool
+                See KvsFragmentScanner.
+
+            **chunk_buffer**: KvsChunkBuffer
+                Optional pre-configured buffer, a default KvsChunkBuffer is created if not provided.
+        '''
+        self.stream_name = stream_name
+        self.schema = schema
+        self._chunk_buffer = chunk_buffer if chunk_buffer is not None else KvsChunkBuffer()
+        self._fragment_scanner = KvsFragmentScanner(detect_fragment_end)
+        self._fragment_read_start_time = timeit.default_timer()
+
+        # Bytes still to be fed before the buffer is worth scanning again.
+        self._bytes_needed = 0
+
+    @property
+    def buffered_bytes(self):
+        '''
+        Number of bytes received but not yet returned as part of a fragment.
+        '''
+        return len(self._chunk_buffer)
+
+    @property
+    def bytes_needed(self):
+        '''
+        Number of bytes that must still be fed to complete the element (or element header) the stream was
+        truncated in, see KvsFragmentScanner.bytes_needed. Sources that read a requested number of bytes can
+        read at least this many to receive a large element such as a video block in one read.
+        '''
+        return self._bytes_needed
+
+    @property
+    def fragment_ending(self):
+        '''
+        True if the fragment being received is likely to be complete, see KvsFragmentScanner.fragment_ending.
+        '''
+        # A chunk too short to be scanned may have arrived after the Tags the scanner ended at.
+        return (self._fragment_scanner.fragment_ending and self._bytes_needed == self._fragment_scanner.bytes_needed)
+
+    def feed(self, chunk):
+        '''
+        Appends a chunk of raw bytes and returns any fragments it completed.
+
+        ### Parameters:
+
+            **chunk**: bytes-like
+                The bytes read from the stream.
+
+        ### Returns:
+
+            fragments: list
+
+            List of KvsFragment, in stream order.
+
+        '''
+        self._chunk_buffer.extend(chunk)
+
+        if (len(chunk) < self._bytes_needed):
+            # Still inside the truncated element, scanning can not progress yet.
+            self._bytes_needed -= len(chunk)
+            return []
+
+        with self._chunk_buffer.view() as buffer_view:
+            fragment_ranges = self._fragment_scanner.scan(buffer_view)
+        self._bytes_needed = self._fragment_scanner.bytes_needed
+
+        fragments = []
+        for fragment_start_offset, fragment_end_offset in fragment_ranges:
+            fragments.append(self._create_fragment(fragment_start_offset, fragment_end_offset))
+
+        if (fragments):
+            # Advance the chunk buffer cursor past the returned fragments.
+            self._chunk_buffer.consume(fragment_end_offset)
+            self._fragment_scanner.discard(fragment_end_offset)
+
+        return fragments
+
+    def flush(self):
+        '''
+        Returns the fragment still being received, for use once the stream has no more bytes or once an
+        ending fragment (see fragment_ending) has been idle.
+
+        ### Returns:
+
+            fragment: KvsFragment
+
+            The trailing fragment or None if there is no fragment data pending.
+
+        '''
+        fragment_range = self._fragment_scanner.flush(len(self._chunk_buffer))
+        self._bytes_needed = 0
+        if (fragment_range is None):
+            return None
+
+        fragment = self._create_fragment(*fragment_range)
+        self._chunk_buffer.consume(fragment_range[1])
+        self._fragment_scanner.discard(fragment_range[1])
+        return fragment
+
+    def _create_fragment(self, fragment_start_offset, fragment_end_offset):
+        '''
+        Creates a KvsFragment over a zero-copy, read-only view of the given range of the chunk buffer.
+        '''
+        # Calculate duration taken receiving this fragment - just for telemetry of the steaming data.
+        fragment_receive_duration = timeit.default_timer() - self._fragment_read_start_time
+        self._fragment_read_start_time = timeit.default_timer()
+
+        return KvsFragment(self.stream_name,
+                           self._chunk_buffer.view(fragment_start_offset, fragment_end_offset).toreadonly(),
+                           fragment_receive_duration,
+                           self.schema)
+
+
+class KvsFragmentIdleFlusher():
+
+    def __init__(self, fragment_reader, on_fragment, on_exception,
+                 idle_flush_interval=DEFAULT_FRAGMENT_IDLE_FLUSH_INTERVAL):
+        '''
+        Feeds chunks to a KvsFragmentReader, passing the fragments to on_fragment, and flushes an ending fragment
+        (see KvsFragmentReader.fragment_ending) from a timer thread once no chunk has been fed for
+        idle_flush_interval seconds. Fragments of unknown size Segments are then delivered shortly after their
+        trailing Tags arrive rather than with the EBML header of the next fragment.
+
+        Feeding and flushing are serialized by a lock, held while on_fragment and on_exception run, so on_fragment
+        is called with one fragment at a time in stream order. Any Tags arriving after an idle flush are kept for
+        the start of the next fragment.
+
+        ### Parameters:
+
+            **fragment_reader**: KvsFragmentReader
+                The reader to feed.
+
+            **on_fragment**: function
+                Called with each KvsFragment.
+
+            **on_exception**: function
+                Called with the exception raised by on_fragment when called from the timer thread. Exceptions
+                raised by on_fragment from feed() or flush() are raised to their caller.
+
+            **idle_flush_interval**: float
+                Seconds without a chunk before an ending fragment is flushed. None to only end fragments at the
+                EBML header of the next fragment (or flush()).
+        '''
+        self.fragment_reader = fragment_reader
+        self.on_fragment = on_fragment
+        self.on_exception = on_exception
+        self.idle_flush_interval = idle_flush_interval
+
+        # Re-entrant so on_exception, called with the lock held, can cancel().
+        self._lock = threading.RLock()
+        self._idle_timer = None
+
+        # Incremented on each feed so a timer that fired while a chunk was being fed does nothing.
+        self._feed_count = 0
+
+    def feed(self, chunk):
+        '''
+        Feeds a chunk of raw bytes to the reader, passing any completed fragments to on_fragment.
+
+        ### Parameters:
+
+            **chunk**: bytes-like
+                The bytes read from the stream.
+
+        '''
+        with self._lock:
+            self._cancel_idle_timer()
+            self._feed_count += 1
+            for fragment in self.fragment_reader.feed(chunk):
+                self.on_fragment(fragment)
+
+            if (self.idle_flush_interval is not None and self.fragment_reader.fragment_ending):
+                self._idle_timer = threading.Timer(self.idle_flush_interval, self._on_idle, (self._feed_count,))
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+
+    def flush(self):
+        '''
+        Passes the fragment still being received (if any) to on_fragment, for use once the stream has no more bytes.
+        '''
+        with self._lock:
+            self._cancel_idle_timer()
+            fragment = self.fragment_reader.flush()
+            if (fragment is not None):
+                self.on_fragment(fragment)
+
+    def cancel(self):
+        '''
+        Cancels any pending idle flush, for use when the stream is stopped.
+        '''
+        with self._lock:
+            self._cancel_idle_timer()
+            self._feed_count += 1
+
+    def _cancel_idle_timer(self):
+        '''
+        Cancels the idle timer if started, called with the lock held.
+        '''
+        if (self._idle_timer is not None):
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _on_idle(self, feed_count):
+        '''
+        Timer callback, flushes the ending fragment if no chunk has been fed since the timer was started.
+        '''
+        with self._lock:
+            if (feed_count != self._feed_count or not self.fragment_reader.fragment_ending):
+                return
+            self._idle_timer = None
+            fragment = self.fragment_reader.flush()
+            try:
+                self.on_fragment(fragment)
+            except Exception as err:
+                self.on_exception(err)
@@ -0,0 +1,432 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This module provides writers that archive the fragments of a stream to local disk.
+
+KvsRollingMkvWriter appends fragments to local MKV files. Fragment byte views are held (not copied) until a
+buffer size is reached and then written with a single os.writev() call, rather than one small write (and file
+open) per fragment. Files are rotated by size and / or duration and fsyncs can be batched to an interval, so a
+host can archive dozens of streams without being bound by per fragment I/O.
+
+Each KVS fragment is a stand-alone MKV (EBML header + Segment) so the files are the fragments concatenated
+in stream order, as saved from a GetMedia response.
+
+KvsWavWriter is a sink for PCM audio, such as the AWS Connect tracks from get_aws_connect_audio(). Audio is queued
+by write() and coalesced into large writes on a background writer thread, so the reader (or callback) thread is never
+blocked on the filesystem. The WAV header sizes are only patched on close() or periodically, rather than a header
+seek per write as with the wave module.
+
+Workflow:
+1) Initialize a KvsRollingMkvWriter / KvsWavWriter per stream (or track) with the path of its files,
+2) Call write() with the fragment_bytes / track audio from the on_fragment_arrived callback,
+3) Call close() from on_read_stream_complete / on_read_stream_exception to write any buffered data.
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import os
+import time
+import struct
+import logging
+from collections import deque
+from threading import Thread, Condition
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# Defaults for the bytes buffered before writing and the file rotation size.
+DEFAULT_WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024 * 1024
+
+# Defaults for the KvsWavWriter: bytes coalesced per write, seconds before queued audio is written regardless and
+# the cap on queued audio after which write() waits for the writer thread.
+DEFAULT_WAV_WRITE_BUFFER_SIZE = 256 * 1024
+DEFAULT_WAV_FLUSH_INTERVAL = 1.0
+DEFAULT_WAV_MAX_QUEUED_BYTES = 64 * 1024 * 1024
+
+# Size of the canonical PCM WAV header.
+WAV_HEADER_SIZE = 44
+
+# Maximum number of buffers per os.writev() call.
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def write_views(file_descriptor, views):
+    '''
+    Writes the bytes-like views to the file with as few os.writev() calls as possible, handling partial writes.
+
+    ### Parameters:
+
+        **file_descriptor**: int
+            The file descriptor from os.open().
+
+        **views**: list
+            The bytes-like objects to write, in order.
+
+    ### Returns:
+
+        written_bytes: int
+
+    '''
+    views = [memoryview(view).cast('B') for view in views if len(view)]
+    written_bytes = 0
+    while views:
+        if hasattr(os, 'writev'):
+            written = os.writev(file_descriptor, views[:IOV_MAX])
+        else:
+            # No writev (Windows), one write per view.
+            written = os.write(file_descriptor, views[0])
+        written_bytes += written
+
+        # Drop the views written in full and trim a partially written one.
+        written_views = 0
+        while written_views < len(views) and written >= len(views[written_views]):
+            written -= len(views[written_views])
+            written_views += 1
+        views = views[written_views:]
+        if (views and written):
+            views[0] = views[0][written:]
+
+    return written_bytes
+
+
+class KvsRollingMkvWriter():
+
+    def __init__(self,
+                file_base_path,
+                max_file_bytes=DEFAULT_MAX_FILE_BYTES,
+                max_file_duration=None,
+                write_buffer_size=DEFAULT_WRITE_BUFFER_SIZE,
+                fsync_interval=None):
+        '''
+            Initialize the rolling MKV file writer.
+
+            ### Parameters:
+
+                **file_base_path**: str
+                    Path and file name prefix of the MKV files, written as {file_base_path}-{file number}.mkv.
+
+                **max_file_bytes**: int
+                    Rotate to a new file before it would exceed this size (None for no limit). A single fragment
+                    larger than this is written to a file of its own.
+
+                **max_file_duration**: float
+                    Rotate to a new file once it has been open this many seconds (None for no limit).
+
+                **write_buffer_size**: int
+                    Number of fragment bytes held before they are written to the file.
+
+                **fsync_interval**: float
+                    If set, fsync the file no more than once per this many seconds (0 on every write), and always
+                    on rotation and close. If None, fsync is left to the OS.
+        '''
+        log.info('Initilizing KvsRollingMkvWriter...')
+        self.file_base_path = file_base_path
+        self.max_file_bytes = max_file_bytes
+        self.max_file_duration = max_file_duration
+        self.write_buffer_size = write_buffer_size
+        self.fsync_interval = fsync_interval
+
+        # The fragment views waiting to be written.
+        self._pending_views = []
+        self._pending_bytes = 0
+
+        self._file_descriptor = None
+        self._file_number = 0
+        self._file_bytes = 0
+        self._file_open_time = None
+        self._last_fsync_time = None
+        self.file_paths = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def file_path(self):
+        '''
+        Path of the file currently being written, or None if no file is open.
+        '''
+        return self.file_paths[-1] if self._file_descriptor is not None else None
+
+    def write(self, fragment_bytes):
+        '''
+        Appends a fragment to the current file, rotating to a new file first if it is due.
+
+        ### Parameters:
+
+            **fragment_bytes**: bytes-like
+                The raw bytes of a complete MKV fragment. The object is held until written, the fragment memoryview
+                from the consumer can be passed directly.
+
+        '''
+        fragment_length = len(fragment_bytes)
+
+        if (self._file_descriptor is None or self._is_rotation_due(fragment_length)):
+            self._rotate()
+
+        self._pending_views.append(fragment_bytes)
+        self._pending_bytes += fragment_length
+        self._file_bytes += fragment_length
+
+        if (self._pending_bytes >= self.write_buffer_size):
+            self.flush()
+
+    def _is_rotation_due(self, fragment_length):
+        '''
+        Returns True if the fragment should start a new file.
+        '''
+        if (self.max_file_bytes is not None and self._file_bytes > 0 and
+                self._file_bytes + fragment_length > self.max_file_bytes):
+            return True
+
+        if (self.max_file_duration is not None and
+                time.monotonic() - self._file_open_time >= self.max_file_duration):
+            return True
+
+        return False
+
+    def flush(self):
+        '''
+        Writes the buffered fragments to the current file and fsyncs if the fsync_interval has passed.
+        '''
+        if (self._file_descriptor is None):
+            return
+
+        write_views(self._file_descriptor, self._pending_views)
+        self._pending_views = []
+        self._pending_bytes = 0
+
+        if (self.fsync_interval is not None and
+                time.monotonic() - self._last_fsync_time >= self.fsync_interval):
+            self._fsync()
+
+    def _fsync(self):
+        '''
+        Flushes the file to disk.
+        '''
+        os.fsync(self._file_descriptor)
+        self._last_fsync_time = time.monotonic()
+
+    def _rotate(self):
+        '''
+        Closes the current file (if any) and opens the next.
+        '''
+        self._close_file()
+
+        self._file_number += 1
+        file_path = '{}-{:05d}.mkv'.format(self.file_base_path, self._file_number)
+        self._file_descriptor = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+        self.file_paths.append(file_path)
+        self._file_bytes = 0
+        self._file_open_time = self._last_fsync_time = time.monotonic()
+        log.info('Writing fragments to {}'.format(file_path))
+
+    def _close_file(self):
+        '''
+        Writes the buffered fragments to the current file (if any) and closes it.
+        '''
+        if (self._file_descriptor is None):
+            return
+
+        try:
+            write_views(self._file_descriptor, self._pending_views)
+            if (self.fsync_interval is not None):
+                self._fsync()
+        finally:
+            self._pending_views = []
+            self._pending_bytes = 0
+            os.close(self._file_descriptor)
+            self._file_descriptor = None
+
+    def close(self):
+        '''
+        Writes any buffered fragments and closes the current file.
+        '''
+        self._close_file()
+
+
+class KvsWavWriter():
+
+    def __init__(self,
+                file_path,
+                nchannels=1,
+                framerate=8000,
+                sampwidth=2,
+                write_buffer_size=DEFAULT_WAV_WRITE_BUFFER_SIZE,
+                flush_interval=DEFAULT_WAV_FLUSH_INTERVAL,
+                header_update_interval=None,
+                max_queued_bytes=DEFAULT_WAV_MAX_QUEUED_BYTES):
+        '''
+            Initialize the WAV file sink and start its writer thread. The defaults match AWS Connect audio
+            (8 kHz, 16 bit, mono).
+
+            ### Parameters:
+
+                **file_path**: str
+                    Path of the WAV file to write.
+
+                **nchannels**, **framerate**, **sampwidth**: int
+                    Number of channels, sample rate and bytes per sample of the PCM audio.
+
+                **write_buffer_size**: int
+                    Queued bytes coalesced in to a single write.
+
+                **flush_interval**: float
+                    Seconds after which queued audio is written even if below write_buffer_size.
+
+                **header_update_interval**: float
+                    If set, the header sizes are patched this often (so the file is playable while being written),
+                    otherwise only on close().
+
+                **max_queued_bytes**: int
+                    Cap on audio queued for the writer thread, write() waits above it. Only reached if the disk
+                    cannot keep up.
+        '''
+        log.info('Initilizing KvsWavWriter...')
+        self.file_path = file_path
+        self.nchannels = nchannels
+        self.framerate = framerate
+        self.sampwidth = sampwidth
+        self.write_buffer_size = write_buffer_size
+        self.flush_interval = flush_interval
+        self.header_update_interval = header_update_interval
+        self.max_queued_bytes = max_queued_bytes
+
+        self._condition = Condition()
+        self._queued_views = deque()
+        self._queued_bytes = 0
+        self._closing = False
+        self._error = None
+        self.data_bytes = 0
+
+        self._file_descriptor = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+        self._write_header()
+        os.lseek(self._file_descriptor, WAV_HEADER_SIZE, os.SEEK_SET)
+
+        self._writer_thread = Thread(target=self._run_writer, name='KvsWavWriter', daemon=True)
+        self._writer_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, audio_bytes):
+        '''
+        Queues PCM audio to be written. The object is held until written rather than copied, so must not be
+        modified afterwards: bytes, the bytearrays returned by get_aws_connect_audio() (which are new per call)
+        or the consumer's fragment memoryviews can be passed directly.
+
+        ### Parameters:
+
+            **audio_bytes**: bytes-like
+                The PCM audio frames.
+
+        '''
+        audio_length = len(audio_bytes)
+        if (not audio_length):
+            return
+
+        with self._condition:
+            while (self._queued_bytes >= self.max_queued_bytes and not self._closing and self._error is None):
+                self._condition.wait()
+
+            if (self._error is not None):
+                raise IOError('Error writing {}: {}'.format(self.file_path, self._error))
+            if (self._closing):
+                raise ValueError('KvsWavWriter {} is closed'.format(self.file_path))
+
+            self._queued_views.append(audio_bytes)
+            self._queued_bytes += audio_length
+            if (self._queued_bytes >= self.write_buffer_size):
+                self._condition.notify_all()
+
+    def close(self):
+        '''
+        Writes the queued audio, patches the WAV header sizes and closes the file.
+        '''
+        with self._condition:
+            if (self._closing):
+                return
+            self._closing = True
+            self._condition.notify_all()
+
+        self._writer_thread.join()
+        if (self._error is not None):
+            raise IOError('Error writing {}: {}'.format(self.file_path, self._error))
+
+    def _write_header(self):
+        '''
+        Writes the WAV header at the start of the file with the current data size.
+        '''
+        block_align = self.nchannels * self.sampwidth
+        header = struct.pack('<4sI4s4sIHHIIHH4sI',
+                             b'RIFF', 36 + self.data_bytes, b'WAVE',
+                             b'fmt ', 16, 1, self.nchannels, self.framerate, self.framerate * block_align,
+                             block_align, self.sampwidth * 8,
+                             b'data', self.data_bytes)
+
+        if hasattr(os, 'pwrite'):
+            os.pwrite(self._file_descriptor, header, 0)
+        else:
+            offset = os.lseek(self._file_descriptor, 0, os.SEEK_CUR)
+            os.lseek(self._file_descriptor, 0, os.SEEK_SET)
+            os.write(self._file_descriptor, header)
+            os.lseek(self._file_descriptor, max(offset, WAV_HEADER_SIZE), os.SEEK_SET)
+
+    def _run_writer(self):
+        '''
+        Writer thread, coalesces the queued audio in to large writes and patches the header as configured.
+        '''
+        last_header_update_time = time.monotonic()
+        try:
+            while True:
+                with self._condition:
+                    wait_until = time.monotonic() + self.flush_interval
+                    while (self._queued_bytes < self.write_buffer_size and not self._closing):
+                        remaining = wait_until - time.monotonic()
+                        if (remaining <= 0):
+                            break
+                        self._condition.wait(remaining)
+
+                    views = list(self._queued_views)
+                    self._queued_views.clear()
+                    self._queued_bytes = 0
+                    closing = self._closing
+                    self._condition.notify_all()
+
+                if (views):
+                    self.data_bytes += write_views(self._file_descriptor, views)
+
+                if (self.header_update_interval is not None and views and
+                        time.monotonic() - last_header_update_time >= self.header_update_interval):
+                    self._write_header()
+                    last_header_update_time = time.monotonic()
+
+                if (closing):
+                    break
+
+            self._write_header()
+
+        except Exception as err:
+            log.exception('Error writing {}'.format(self.file_path))
+            with self._condition:
+                self._error = err
+                self._condition.notify_all()
+
+        finally:
+            os.close(self._file_descriptor)
@@ -0,0 +1,126 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This module provides the video frame decoder backends used by KvsFragmentProcessor.get_frames_as_ndarray() and
+save_frames_as_jpeg().
+
+A decoder backend subclasses the abstract base class KvsFrameDecoder and implements its methods:
+1) decode(codec_id, codec_private, packets): Yields the decoded frames of the given encoded frames (packets),
+2) to_ndarray(frame): Returns a decoded frame as a NumPy NDArray,
+3) save_jpeg(frame, file_path): Saves a decoded frame as a JPEG.
+
+PyAvFrameDecoder (the default) decodes with PyAV (FFmpeg), which is an optional dependency:
+
+    python3 -m pip install av Pillow
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import logging
+from abc import ABC, abstractmethod
+
+try:
+    import av
+except ImportError:
+    # PyAV is optional, only required by the PyAvFrameDecoder.
+    av = None
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# MKV CodecID to FFmpeg decoder name.
+MKV_CODEC_NAMES = {
+    'V_MPEG4/ISO/AVC': 'h264',
+    'V_MPEGH/ISO/HEVC': 'hevc',
+    'V_MJPEG': 'mjpeg',
+    'V_VP8': 'vp8',
+    'V_VP9': 'vp9',
+    'V_AV1': 'av1'
+}
+
+
+class KvsFrameDecoder(ABC):
+    '''
+    Abstract base class of the video frame decoder backends, subclass and implement these methods to provide an
+    alternative backend.
+    '''
+
+    @abstractmethod
+    def decode(self, codec_id, codec_private, packets):
+        '''
+        Decodes a sequence of encoded frames of a single track.
+
+        ### Parameters:
+
+            **codec_id**: str
+                The track's MKV CodecID, for example V_MPEG4/ISO/AVC.
+
+            **codec_private**: bytes
+                The track's CodecPrivate (for H.264 / H.265 the AVCC / HVCC decoder configuration) or None.
+
+            **packets**: iterable
+                The encoded frames (bytes-like) in decode order.
+
+        ### Yields:
+
+            The decoded frames, in the backend's own frame type.
+
+        '''
+
+    @abstractmethod
+    def to_ndarray(self, frame):
+        '''
+        Returns a decoded frame as a NumPy NDArray.
+        '''
+
+    @abstractmethod
+    def save_jpeg(self, frame, file_path):
+        '''
+        Saves a decoded frame as a JPEG to the given file path.
+        '''
+
+
+class PyAvFrameDecoder(KvsFrameDecoder):
+
+    def __init__(self, ndarray_format='bgr24'):
+        '''
+        Video frame decoder backend using PyAV.
+
+        ### Parameters:
+
+            **ndarray_format**: str
+                The pixel format of the NDArrays returned by to_ndarray(). Default bgr24 (as used by OpenCV).
+        '''
+        if av is None:
+            raise ImportError('PyAV is required for the PyAvFrameDecoder: python3 -m pip install av')
+
+        self.ndarray_format = ndarray_format
+
+    def decode(self, codec_id, codec_private, packets):
+        if codec_id not in MKV_CODEC_NAMES:
+            raise ValueError('Unsupported video CodecID {}'.format(codec_id))
+
+        codec_context = av.CodecContext.create(MKV_CODEC_NAMES[codec_id], 'r')
+        if codec_private:
+            codec_context.extradata = bytes(codec_private)
+
+        for packet in packets:
+            for frame in codec_context.decode(av.Packet(packet)):
+                yield frame
+
+        # Flush any frames held back by the decoder.
+        for frame in codec_context.decode(None):
+            yield frame
+
+    def to_ndarray(self, frame):
+        return frame.to_ndarray(format=self.ndarray_format)
+
+    def save_jpeg(self, frame, file_path):
+        frame.to_image().save(file_path, format='JPEG')
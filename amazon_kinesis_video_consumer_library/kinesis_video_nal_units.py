@@ -0,0 +1,301 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This class parses the H.264 / H.265 video of KVS fragments into NAL units.
+
+KVS producers write each video frame to a SimpleBlock as length-prefixed (AVCC / HVCC) NAL units and the parameter
+sets (VPS / SPS / PPS) to the track's CodecPrivate element as an AVC / HEVC decoder configuration record. Raw
+(Annex-B) H.264 / H.265 decoders and .h264 / .h265 archives instead expect each NAL unit behind a 00 00 00 01
+start code, with the parameter sets in-band ahead of each keyframe.
+
+The KvsNalUnitParser:
+1) Parses the CodecPrivate of a track once and caches it across fragments (see get_codec_config()),
+2) Converts frames to Annex-B, sizing and filling a single output buffer per frame (see to_annex_b()),
+3) Yields the NAL units of a frame with their type (see iter_nal_units()).
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import logging
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+H264_CODEC_ID = 'V_MPEG4/ISO/AVC'
+H265_CODEC_ID = 'V_MPEGH/ISO/HEVC'
+
+ANNEX_B_START_CODE = b'\x00\x00\x00\x01'
+
+# H.264 NAL unit types.
+H264_NAL_IDR_SLICE = 5
+H264_NAL_SEI = 6
+H264_NAL_SPS = 7
+H264_NAL_PPS = 8
+
+# H.265 NAL unit types.
+H265_NAL_IDR_W_RADL = 19
+H265_NAL_IDR_N_LP = 20
+H265_NAL_VPS = 32
+H265_NAL_SPS = 33
+H265_NAL_PPS = 34
+
+
+class KvsCodecConfig():
+
+    __slots__ = ("codec_id", "nal_length_size", "parameter_sets", "annex_b_parameter_sets")
+
+    def __init__(self, codec_id, nal_length_size, parameter_sets):
+        '''
+        The decoder configuration of a H.264 / H.265 track parsed from its CodecPrivate.
+
+        ### Parameters:
+
+            **codec_id**: str
+                The track's MKV CodecID.
+
+            **nal_length_size**: int
+                Size in bytes of the NAL unit length prefixes in each frame, or None if frames are already Annex-B.
+
+            **parameter_sets**: list
+                The (nal_type, nal_unit) of each VPS / SPS / PPS in the CodecPrivate, in order.
+        '''
+        self.codec_id = codec_id
+        self.nal_length_size = nal_length_size
+        self.parameter_sets = parameter_sets
+
+        # The parameter sets as Annex-B, to be placed ahead of keyframes.
+        self.annex_b_parameter_sets = b''.join(ANNEX_B_START_CODE + nal_unit for _, nal_unit in parameter_sets)
+
+    def get_nal_type(self, nal_unit):
+        '''
+        Returns the NAL unit type from the first byte of the NAL unit header.
+        '''
+        if (self.codec_id == H265_CODEC_ID):
+            return (nal_unit[0] >> 1) & 0x3F
+        return nal_unit[0] & 0x1F
+
+
+def _read_avc_decoder_configuration(codec_private):
+    '''
+    Parses an AVCDecoderConfigurationRecord, returns (nal_length_size, parameter_sets).
+    '''
+    nal_length_size = (codec_private[4] & 0x03) + 1
+    parameter_sets = []
+
+    offset = 5
+    for nal_count_mask in (0x1F, 0xFF):
+        # SPS count (low 5 bits) then PPS count.
+        nal_count = codec_private[offset] & nal_count_mask
+        offset += 1
+        for _ in range(nal_count):
+            nal_length = int.from_bytes(codec_private[offset : offset + 2], 'big')
+            nal_unit = bytes(codec_private[offset + 2 : offset + 2 + nal_length])
+            parameter_sets.append((nal_unit[0] & 0x1F, nal_unit))
+            offset += 2 + nal_length
+
+    return nal_length_size, parameter_sets
+
+
+def _read_hevc_decoder_configuration(codec_private):
+    '''
+    Parses an HEVCDecoderConfigurationRecord, returns (nal_length_size, parameter_sets).
+    '''
+    nal_length_size = (codec_private[21] & 0x03) + 1
+    parameter_sets = []
+
+    array_count = codec_private[22]
+    offset = 23
+    for _ in range(array_count):
+        nal_type = codec_private[offset] & 0x3F
+        nal_count = int.from_bytes(codec_private[offset + 1 : offset + 3], 'big')
+        offset += 3
+        for _ in range(nal_count):
+            nal_length = int.from_bytes(codec_private[offset : offset + 2], 'big')
+            parameter_sets.append((nal_type, bytes(codec_private[offset + 2 : offset + 2 + nal_length])))
+            offset += 2 + nal_length
+
+    return nal_length_size, parameter_sets
+
+
+def read_codec_config(codec_id, codec_private):
+    '''
+    Parses the CodecPrivate of a H.264 / H.265 track.
+
+    ### Parameters:
+
+        **codec_id**: str
+            The track's MKV CodecID, V_MPEG4/ISO/AVC or V_MPEGH/ISO/HEVC.
+
+        **codec_private**: bytes-like
+            The track's CodecPrivate. If empty (or not a decoder configuration record) the frames are taken to
+            already be Annex-B.
+
+    ### Returns:
+
+        codec_config: KvsCodecConfig
+
+    '''
+    if (codec_id not in (H264_CODEC_ID, H265_CODEC_ID)):
+        raise ValueError('Unsupported video CodecID {}, only H.264 and H.265 have NAL units'.format(codec_id))
+
+    if (not codec_private or codec_private[0] != 1):
+        # No configuration record (version 1), in-band parameter sets and start codes.
+        return KvsCodecConfig(codec_id, None, [])
+
+    try:
+        if (codec_id == H264_CODEC_ID):
+            nal_length_size, parameter_sets = _read_avc_decoder_configuration(codec_private)
+        else:
+            nal_length_size, parameter_sets = _read_hevc_decoder_configuration(codec_private)
+    except IndexError:
+        raise ValueError('Truncated {} CodecPrivate'.format(codec_id))
+
+    return KvsCodecConfig(codec_id, nal_length_size, parameter_sets)
+
+
+class KvsNalUnitParser():
+
+    def __init__(self):
+        '''
+        Converts H.264 / H.265 frames to Annex-B and splits them into NAL units. Keep one instance per stream so
+        each track's CodecPrivate is only parsed when it changes.
+        '''
+        # Track number to (codec_id, codec_private, KvsCodecConfig).
+        self._codec_configs = {}
+
+    def get_codec_config(self, track_number, codec_id, codec_private):
+        '''
+        Returns the parsed CodecPrivate of the track, cached until the track's CodecID or CodecPrivate changes.
+
+        ### Parameters:
+
+            **track_number**: int
+                The track number.
+
+            **codec_id**: str
+                The track's MKV CodecID.
+
+            **codec_private**: bytes
+                The track's CodecPrivate.
+
+        ### Returns:
+
+            codec_config: KvsCodecConfig
+
+        '''
+        cached = self._codec_configs.get(track_number)
+        if (cached and cached[0] == codec_id and cached[1] == codec_private):
+            return cached[2]
+
+        codec_config = read_codec_config(codec_id, codec_private)
+        self._codec_configs[track_number] = (codec_id, codec_private, codec_config)
+        return codec_config
+
+    def iter_nal_units(self, codec_config, frame):
+        '''
+        Yields the NAL units of a length-prefixed (or Annex-B if the track has no configuration record) frame.
+
+        ### Parameters:
+
+            **codec_config**: KvsCodecConfig
+                The track's configuration from get_codec_config().
+
+            **frame**: bytes-like
+                The frame from the SimpleBlock.
+
+        ### Yields:
+
+            (nal_type, nal_unit)
+
+            nal_unit is a memoryview of the frame, without length prefix / start code.
+
+        '''
+        frame = memoryview(frame)
+        for nal_start, nal_end in self._get_nal_unit_ranges(codec_config, frame):
+            if (nal_end > nal_start):
+                nal_unit = frame[nal_start : nal_end]
+                yield codec_config.get_nal_type(nal_unit), nal_unit
+
+    def to_annex_b(self, codec_config, frame, include_parameter_sets=False):
+        '''
+        Converts a length-prefixed frame to Annex-B byte stream format. The output size is computed up front
+        and the frame's NAL units copied once into a single buffer.
+
+        ### Parameters:
+
+            **codec_config**: KvsCodecConfig
+                The track's configuration from get_codec_config().
+
+            **frame**: bytes-like
+                The frame from the SimpleBlock.
+
+            **include_parameter_sets**: bool
+                Place the CodecPrivate parameter sets ahead of the frame, as needed before each keyframe for a
+                decoder (or archive) to start from it.
+
+        ### Returns:
+
+            annex_b_frame: bytearray
+
+        '''
+        frame = memoryview(frame)
+        parameter_sets = codec_config.annex_b_parameter_sets if include_parameter_sets else b''
+
+        if (codec_config.nal_length_size is None):
+            return bytearray(parameter_sets) + frame
+
+        nal_unit_ranges = self._get_nal_unit_ranges(codec_config, frame)
+
+        annex_b_size = len(parameter_sets)
+        for nal_start, nal_end in nal_unit_ranges:
+            annex_b_size += 4 + nal_end - nal_start
+
+        annex_b_frame = bytearray(annex_b_size)
+        annex_b_frame[0 : len(parameter_sets)] = parameter_sets
+
+        offset = len(parameter_sets)
+        for nal_start, nal_end in nal_unit_ranges:
+            annex_b_frame[offset : offset + 4] = ANNEX_B_START_CODE
+            annex_b_frame[offset + 4 : offset + 4 + nal_end - nal_start] = frame[nal_start : nal_end]
+            offset += 4 + nal_end - nal_start
+
+        return annex_b_frame
+
+    def _get_nal_unit_ranges(self, codec_config, frame):
+        '''
+        Returns the (start, end) offsets of the NAL units in the frame.
+        '''
+        nal_unit_ranges = []
+        frame_length = len(frame)
+
+        if (codec_config.nal_length_size is None):
+            # Annex-B, split on 00 00 01 start codes (the 4 byte form leaves a trailing zero to strip).
+            frame_bytes = bytes(frame)
+            start = frame_bytes.find(b'\x00\x00\x01')
+            while start >= 0:
+                nal_start = start + 3
+                start = frame_bytes.find(b'\x00\x00\x01', nal_start)
+                nal_end = frame_length if start < 0 else start
+                while (nal_end > nal_start and frame_bytes[nal_end - 1] == 0):
+                    nal_end -= 1
+                nal_unit_ranges.append((nal_start, nal_end))
+            return nal_unit_ranges
+
+        nal_length_size = codec_config.nal_length_size
+        offset = 0
+        while offset + nal_length_size <= frame_length:
+            nal_length = int.from_bytes(frame[offset : offset + nal_length_size], 'big')
+            nal_start = offset + nal_length_size
+            offset = nal_start + nal_length
+            if (offset > frame_length):
+                raise ValueError('NAL unit length {} exceeds the frame'.format(nal_length))
+            nal_unit_ranges.append((nal_start, offset))
+
+        return nal_unit_ranges
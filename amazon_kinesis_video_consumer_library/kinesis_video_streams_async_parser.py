@@ -0,0 +1,161 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Amazon Kinesis Video Stream (KVS) Consumer Library for Python.
+
+This class provides an asyncio native alternative to the threaded KvsConsumerLibrary. Rather than blocking an
+OS thread per stream on StreamingBody iteration, fragments are read with await from any async byte source,
+for example the Payload of an aiobotocore GetMedia response or an aiohttp StreamReader, so a single event loop
+can consume many streams concurrently.
+
+Fragment boundaries are found with the same incremental KvsFragmentReader used by the KvsConsumerLibrary. As
+there, a fragment is also returned when no more bytes arrive shortly after its trailing Tags.
+
+Workflow:
+1) Make a call to KVS Media GetMedia and / or KVS Archive Media GetMediaForFragmentList with an async client,
+2) Initialize the AsyncKvsConsumer with the response (or its async Payload),
+3) Iterate the fragments with: async for fragment in consumer.
+
+Example:
+
+    async for fragment in AsyncKvsConsumer(stream_name, get_media_response):
+        tags = kvs_fragment_processor.get_fragment_tags(fragment.fragment_dom)
+
+ '''
+
+__version__ = "0.0.1"
+__status__ = "Development"
+__copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
+__author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
+
+import asyncio
+import logging
+from collections import deque
+from amazon_kinesis_video_consumer_library.ebmlite import loadSchema
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_scanner import (KvsFragmentReader,
+                                                                                  DEFAULT_FRAGMENT_IDLE_FLUSH_INTERVAL)
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsTrackCache
+
+# Init the logger.
+log = logging.getLogger(__name__)
+
+# Default number of bytes requested per read() of the async byte source.
+DEFAULT_READ_SIZE = 64 * 1024
+
+
+class AsyncKvsConsumer():
+
+    def __init__(self,
+                stream_name,
+                get_media_response_object,
+                read_size=DEFAULT_READ_SIZE,
+                fragment_idle_flush_interval=DEFAULT_FRAGMENT_IDLE_FLUSH_INTERVAL):
+        '''
+            Initialize the asyncio KVS media consumer.
+
+            ### Parameters:
+
+                **stream_name**: str
+                    The name (or ARN) of the stream, set on each fragment.
+
+                **get_media_response_object**: dict | async byte source
+                    The GetMedia / GetMediaForFragmentList response containing the async 'Payload', or the async byte
+                    source itself. The source must provide either a coroutine read(n) (aiobotocore / aiohttp style)
+                    or be an async iterable of byte chunks.
+
+                **read_size**: int
+                    Maximum number of bytes requested per read(n).
+
+                **fragment_idle_flush_interval**: float
+                    Seconds without new bytes after the trailing Tags of a fragment have arrived before the fragment
+                    is returned, rather than waiting for the EBML header of the next fragment. None to only return
+                    fragments at the next EBML header. See KvsFragmentIdleFlusher.
+        '''
+        log.info('Initilizing AsyncKvsConsumer...')
+        self.stream_name = stream_name
+        self.read_size = read_size
+        self.fragment_idle_flush_interval = fragment_idle_flush_interval
+
+        if isinstance(get_media_response_object, dict):
+            self._payload = get_media_response_object['Payload']
+        else:
+            self._payload = get_media_response_object
+
+        self.schema = loadSchema('matroska.xml')
+        self._fragment_reader = KvsFragmentReader(self.stream_name, self.schema)
+
+        # Track information of the stream, cached across fragments.
+        self.track_cache = KvsTrackCache()
+
+        self._pending_fragments = deque()
+        self._chunk_iterator = None
+
+        # Read left pending by an idle flush, awaited before reading again.
+        self._read_task = None
+        self._end_of_stream = False
+        self._stop_get_media = False
+
+    def stop(self):
+        '''
+        Stops the iteration after the fragments already received have been returned.
+        '''
+        self._stop_get_media = True
+
+    async def _read_chunk(self):
+        '''
+        Reads the next chunk from the async byte source, returns an empty bytes object at the end of the stream.
+        '''
+        if hasattr(self._payload, 'read'):
+            return await self._payload.read(self.read_size)
+
+        if self._chunk_iterator is None:
+            self._chunk_iterator = self._payload.__aiter__()
+        try:
+            return await self._chunk_iterator.__anext__()
+        except StopAsyncIteration:
+            return b''
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        '''
+        Returns the next complete fragment as a KvsFragment.
+        '''
+        while not self._pending_fragments:
+
+            if self._end_of_stream or self._stop_get_media:
+                if self._read_task is not None:
+                    self._read_task.cancel()
+                    self._read_task = None
+                raise StopAsyncIteration
+
+            if (self._read_task is None and not (self.fragment_idle_flush_interval is not None
+                                                 and self._fragment_reader.fragment_ending)):
+                chunk = await self._read_chunk()
+            else:
+                if self._read_task is None:
+                    self._read_task = asyncio.ensure_future(self._read_chunk())
+
+                if (self.fragment_idle_flush_interval is not None and self._fragment_reader.fragment_ending):
+                    done, _pending = await asyncio.wait((self._read_task,), timeout=self.fragment_idle_flush_interval)
+                    if not done:
+                        # No more bytes after the fragment's trailing Tags, return it and leave the read pending.
+                        self._pending_fragments.append(self._fragment_reader.flush())
+                        continue
+
+                read_task, self._read_task = self._read_task, None
+                chunk = await read_task
+
+            if not chunk:
+                # No more bytes, return the trailing fragment if any.
+                self._end_of_stream = True
+                trailing_fragment = self._fragment_reader.flush()
+                if (trailing_fragment):
+                    self._pending_fragments.append(trailing_fragment)
+                continue
+
+            self._pending_fragments.extend(self._fragment_reader.feed(chunk))
+
+        return self._pending_fragments.popleft()
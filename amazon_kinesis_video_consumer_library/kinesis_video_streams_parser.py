@@ -29,6 +29,15 @@ fragments as they are received and to handle the parser reaching the end of the
 or GetMediaForFragmentList call,
 5) Fragments will then be parsed and delivered to the call-backs for processing as per the example code provided.
 
+Alternatively, iter_fragments() is a pull based generator that yields the fragments of a GetMedia response, a file-like
+object or any iterable of byte chunks in the calling thread. Useful for batch jobs and Lambda handlers processing
+archived media, and composes with generator pipelines (filter, sample, batch) in constant memory:
+
+    for fragment in iter_fragments(get_media_response):
+        tags = kvs_fragment_processor.get_fragment_tags(fragment.fragment_dom)
+
+For archived media, a KvsFragmentProcessPool can be provided to parse fragments across all cores in worker processes.
+
 Credits:
 # EMBLite by MideTechnology is an external EBML parser found at https://github.com/MideTechnology/ebmlite
 # For convenance a slightly modified version of EMBLite is shipped with the KvsConsumerLibrary but adding credit where its due. 
@@ -41,14 +50,70 @@ __status__ = "Development"
 __copyright__ = "Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved."
 __author__ = "Dean Colcott <https://www.linkedin.com/in/deancolcott/>"
 
-import timeit
 import logging
-from threading import Thread
+from collections import deque
+from threading import Thread, Condition
 from amazon_kinesis_video_consumer_library.ebmlite import loadSchema
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_scanner import (KvsFragmentReader,
+                                                                                  KvsFragmentIdleFlusher,
+                                                                                  DEFAULT_FRAGMENT_IDLE_FLUSH_INTERVAL)
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsTrackCache
 
 # Init the logger.
 log = logging.getLogger(__name__)
 
+# Default number of bytes read per read(n) when iter_fragments() is given a file-like object.
+DEFAULT_READ_SIZE = 64 * 1024
+
+
+def iter_fragments(payload, stream_name=None, read_size=DEFAULT_READ_SIZE, detect_fragment_end=True):
+    '''
+    Generator yielding each complete MKV fragment read from a KVS GetMedia / GetMediaForFragmentList response,
+    a file-like object or an iterable of byte chunks. The trailing fragment is yielded when the source ends.
+
+    ### Parameters:
+
+        **payload**: dict | file-like | iterable
+            A response containing the StreamingBody 'Payload', an object with read(n) (such as an open MKV file or
+            a StreamingBody), or an iterable of bytes-like chunks.
+
+        **stream_name**: str
+            Optional name (or ARN) of the stream, set on each fragment.
+
+        **read_size**: int
+            Number of bytes per read(n) for file-like sources. More are read when the reader needs more to
+            complete a truncated element (see KvsFragmentReader.bytes_needed).
+
+        **detect_fragment_end**: bool
+            See KvsFragmentScanner.
+
+    ### Yields:
+
+        fragment: KvsFragment
+
+        The fragment's bytes (read-only memoryview, valid while referenced but pinning the reader's buffer, see
+        KvsFragment), lazily parsed DOM (fragment_dom) and receive duration.
+
+    '''
+    if isinstance(payload, dict):
+        payload = payload['Payload']
+
+    fragment_reader = KvsFragmentReader(stream_name, loadSchema('matroska.xml'), detect_fragment_end)
+
+    if hasattr(payload, 'read'):
+        chunks = iter(lambda: payload.read(max(read_size, fragment_reader.bytes_needed)), b'')
+    else:
+        chunks = payload
+
+    for chunk in chunks:
+        if not chunk:
+            break
+        yield from fragment_reader.feed(chunk)
+
+    trailing_fragment = fragment_reader.flush()
+    if (trailing_fragment):
+        yield trailing_fragment
+
 
 class KvsConsumerLibrary(Thread):
 
@@ -57,9 +122,33 @@ class KvsConsumerLibrary(Thread):
                 get_media_response_object, 
                 on_fragment_arrived, 
                 on_read_stream_complete, 
-                on_read_stream_exception):
+                on_read_stream_exception,
+                fragment_dispatcher=None,
+                fragment_process_pool=None,
+                fragment_idle_flush_interval=DEFAULT_FRAGMENT_IDLE_FLUSH_INTERVAL):
         '''
             Initialize the KVS media consumer library
+
+            ### Parameters:
+
+                **fragment_dispatcher**: KvsFragmentDispatcher
+                    Optional. If provided, the callbacks run on the dispatcher's worker threads rather than
+                    in-line on this reader thread, so slow callbacks do not stall reading the stream. As for
+                    in-line callbacks, an exception raised by on_fragment_arrived stops reading the stream and is
+                    passed to on_read_stream_exception, the stream's later fragments and on_read_stream_complete
+                    are then not delivered.
+
+                **fragment_process_pool**: KvsFragmentProcessPool
+                    Optional. If provided, each fragment is parsed and its extractions run in the pool's worker
+                    processes. The fragment_dom argument of on_fragment_arrived is then replaced by the dict of
+                    extraction results, delivered in stream order as soon as they are complete. Without a
+                    fragment_dispatcher, on_fragment_arrived is then called from the process pool's result thread
+                    (shared by all streams using the pool), so should return quickly.
+
+                **fragment_idle_flush_interval**: float
+                    Seconds without new bytes after the trailing Tags of a fragment have arrived before the fragment
+                    is forwarded, rather than waiting for the EBML header of the next fragment. None to only forward
+                    fragments at the next EBML header. See KvsFragmentIdleFlusher.
         '''
         # Call the Thread class's init function
         Thread.__init__(self)
@@ -74,30 +163,31 @@ class KvsConsumerLibrary(Thread):
         self.on_fragment_arrived_callback = on_fragment_arrived
         self.on_read_stream_complete_callback = on_read_stream_complete
         self.on_read_stream_exception = on_read_stream_exception
+        self.fragment_dispatcher = fragment_dispatcher
+        self.fragment_process_pool = fragment_process_pool
+        self.fragment_idle_flush_interval = fragment_idle_flush_interval
 
-        log.info('Loading EBMLlite MKV Schema....')
-        self.schema = loadSchema('matroska.xml')
-    
-    def _get_ebml_header_elements(self, fragement_dom):
-        '''
-        Returns the EBML Header elements in the Fragment DOM. EBML Header elements indicate the start 
-        of a new fragment and so we use them to set the byte boundaries of individual fragments as they
-        arrive in the raw data stream (chunks).
+        # Set if forwarding an idle flushed fragment failed, the exception already passed to the exception callback.
+        self._idle_flush_failed = False
 
-        ### Parameters:
+        # Set if a callback run on the fragment_dispatcher failed, the exception already passed to the exception
+        # callback.
+        self._dispatched_callback_failed = False
 
-            **fragment_dom**: ebmlite.core.Document <ebmlite.core.MatroskaDocument>
-                The DOM like structure describing the fragment parsed by EBMLite. 
+        # Track information of the stream, cached across fragments. Callbacks can call
+        # track_cache.get_aws_connect_track_info(fragment_dom) rather than re-parsing the Tracks of every fragment.
+        self.track_cache = KvsTrackCache()
 
-        '''
-        ebml_header_elements = []
-        # Iterate through the fragment elements and capture any EBML Fragment headers (indicating the start of a new fragment)
-        for element in fragement_dom:
-                if (element.id == 0x1A45DFA3):   # EBML (Master) element ID = 0x1A45DFA3 (440786851 dec)
-                    ebml_header_elements.append(element)
-        
-        return ebml_header_elements
+        # Fragments submitted to the process pool, with their futures, waiting to be delivered in order. The
+        # condition guards them and whether a thread is currently delivering.
+        self._pending_processed_fragments = deque()
+        self._processed_condition = Condition()
+        self._forwarding_processed_fragments = False
+        self._processed_fragments_failed = False
 
+        log.info('Loading EBMLlite MKV Schema....')
+        self.schema = loadSchema('matroska.xml')
+    
     def _get_simple_block_elements(self, fragement_dom):
         '''
         Returns the DOM SimpleBlock elements found in the fragment. 
@@ -125,6 +215,140 @@ class KvsConsumerLibrary(Thread):
 
         return simple_block_elements
 
+    def _forward_fragment(self, fragment):
+        '''
+        Forwards a complete fragment to the on_fragment_arrived callback.
+
+        ### Parameters:
+
+            **fragment**: KvsFragment
+                The complete MKV fragment.
+
+        '''
+        if self.fragment_process_pool:
+            # Parse in the pool's worker processes, delivered as soon as complete.
+            with self._processed_condition:
+                while (len(self._pending_processed_fragments) >= self.fragment_process_pool.max_pending_fragments
+                       and not self._processed_fragments_failed):
+                    self._processed_condition.wait()
+                if self._processed_fragments_failed:
+                    return
+
+                future = self.fragment_process_pool.submit(fragment.fragment_bytes)
+                self._pending_processed_fragments.append((fragment, future))
+
+            future.add_done_callback(self._forward_processed_fragments)
+
+        elif self.fragment_dispatcher:
+            # Parse and deliver on the dispatcher's workers.
+            self.fragment_dispatcher.submit(self.stream_name, 
+                                            self._call_dispatched_callback, 
+                                            self._forward_fragment_to_callback, 
+                                            fragment, 
+                                            on_exception=self._on_dispatched_callback_exception)
+        else:
+            self._forward_fragment_to_callback(fragment)
+
+    def _forward_processed_fragments(self, future=None):
+        '''
+        Done callback of the process pool futures: forwards the fragments the pool has completed, in stream order.
+
+        Only one thread forwards at a time, the others return at once. A fragment completing while another thread
+        is forwarding is picked up by that thread, as its future is done before its callbacks are called.
+        '''
+        with self._processed_condition:
+            if self._forwarding_processed_fragments:
+                return
+            self._forwarding_processed_fragments = True
+
+        try:
+            while True:
+                with self._processed_condition:
+                    if not (self._pending_processed_fragments and self._pending_processed_fragments[0][1].done()):
+                        self._forwarding_processed_fragments = False
+                        self._processed_condition.notify_all()
+                        return
+
+                    fragment, future = self._pending_processed_fragments.popleft()
+                    self._processed_condition.notify_all()
+
+                self._forward_processed_fragment(fragment, future.result())
+
+        except Exception as err:
+            # Stop reading the stream and pass the exception to the exception callback.
+            with self._processed_condition:
+                self._stop_get_media = True
+                self._processed_fragments_failed = True
+                for _fragment, pending_future in self._pending_processed_fragments:
+                    pending_future.cancel()
+                self._pending_processed_fragments.clear()
+                self._forwarding_processed_fragments = False
+                self._processed_condition.notify_all()
+            self._forward_stream_event(self.on_read_stream_exception, self.stream_name, err)
+
+    def _wait_processed_fragments(self):
+        '''
+        Waits until every fragment submitted to the process pool has been forwarded (or dropped on an exception).
+        '''
+        with self._processed_condition:
+            while self._pending_processed_fragments or self._forwarding_processed_fragments:
+                self._processed_condition.wait()
+
+    def _forward_processed_fragment(self, fragment, fragment_results):
+        '''
+        Calls (or dispatches) the on_fragment_arrived callback with a fragment's process pool extraction results.
+        '''
+        if self.fragment_dispatcher:
+            self.fragment_dispatcher.submit(self.stream_name, 
+                                            self._call_dispatched_callback, 
+                                            self.on_fragment_arrived_callback, 
+                                            self.stream_name, 
+                                            fragment.fragment_bytes, 
+                                            fragment_results, 
+                                            fragment.fragment_receive_duration, 
+                                            on_exception=self._on_dispatched_callback_exception)
+        else:
+            self.on_fragment_arrived_callback(self.stream_name, 
+                                              fragment.fragment_bytes, 
+                                              fragment_results, 
+                                              fragment.fragment_receive_duration)
+
+    def _forward_fragment_to_callback(self, fragment):
+        '''
+        Calls the on_fragment_arrived callback with the fragment's bytes, DOM and receive duration.
+        '''
+        self.on_fragment_arrived_callback(self.stream_name, 
+                                          fragment.fragment_bytes, 
+                                          fragment.fragment_dom, 
+                                          fragment.fragment_receive_duration)
+
+    def _call_dispatched_callback(self, callback, *args):
+        '''
+        Runs a callback on the fragment_dispatcher's worker, unless an earlier callback of the stream failed.
+        '''
+        if not self._dispatched_callback_failed:
+            callback(*args)
+
+    def _on_dispatched_callback_exception(self, err):
+        '''
+        Stops reading the stream and passes an exception raised by on_fragment_arrived on the fragment_dispatcher's
+        worker to the exception callback, as run() does for in-line callbacks.
+        '''
+        if self._dispatched_callback_failed:
+            return
+        self._dispatched_callback_failed = True
+        self._stop_get_media = True
+        self.on_read_stream_exception(self.stream_name, err)
+
+    def _on_idle_flush_exception(self, err):
+        '''
+        Stops reading the stream and passes an exception raised forwarding an idle flushed fragment (on the
+        KvsFragmentIdleFlusher timer thread) to the exception callback.
+        '''
+        self._stop_get_media = True
+        self._idle_flush_failed = True
+        self._forward_stream_event(self.on_read_stream_exception, self.stream_name, err)
+
     def stop_thread(self):
         self._stop_get_media = True
 
@@ -134,9 +358,15 @@ class KvsConsumerLibrary(Thread):
         '''
         Reads in chunks (unframed number of raw bytes) from a KVS GetMedia or GetMediaForFragmentList Streaming Body response 
         and parses into bounded MKV fragments. Raw data is buffered until a complete fragment is received which is then forwarded to the 
-        on_fragmemt_arrived callback. Fragment is delivered as a raw byte array and also a parsed EBMLite Document that is a DOM like 
+        on_fragmemt_arrived callback. Fragment is delivered as a raw byte memoryview and also a parsed EBMLite Document that is a DOM like 
         structure of the elements (including Tags) within the given Fragment. 
 
+        The fragment memoryview is a zero-copy, read-only view of the internal chunk buffer. It stays valid while 
+        referenced, but pins the buffer's storage: while any view is held the buffer moves to new storage rather than 
+        reclaiming its space in place. To keep the fragment for long (or use bytes methods such as find()), copy it with 
+        bytes(fragment_bytes). The KvsFragmentDispatcher, KvsFragmentProcessPool and fragment writers of this library 
+        can be passed the view directly as they hold or copy it only until it is processed.
+
         Kinesis Video will continually update the streaming buffer with media as soon as its available. For StartSelectorType = NOW,
         bytes from the media stream will be available as fast as they arrive into Kinesis Video by the producer. In this case the 
         consumer bandwidth and fragment rate will be equal to that of the producer. However, if StartSelector is set to sometime 
@@ -146,82 +376,72 @@ class KvsConsumerLibrary(Thread):
 
         '''
 
+        #########################################
+        # Iterate through reading and parsing streaming body response of KVS GET Media API call to MKV fragments.
+        #########################################
+        fragment_reader = KvsFragmentReader(self.stream_name, self.schema)
+        fragment_flusher = KvsFragmentIdleFlusher(fragment_reader,
+                                                  self._forward_fragment,
+                                                  self._on_idle_flush_exception,
+                                                  self.fragment_idle_flush_interval)
+
         try:
             # Get the steam botocore.response.Streamingody object from the provided GetMedia response
             kvs_streaming_buffer=self.get_media_response_object['Payload']
 
-            #########################################
-            # Iterate through reading and parsing streaming body response of KVS GET Media API call to MKV fragments.
-            #########################################
-            chunk_buffer = bytearray()
-            fragment_read_start_time = timeit.default_timer()
-
-            chunk_read_count = 0
-            
             # Uses the StreamingBody object iterator to read in (default 1024 byte) chunks from the streaming buffer.
             for chunk in kvs_streaming_buffer:
 
                 if self._stop_get_media:
                     break
 
-                # Append chunk bytes to ByteArray buffer while waiting for the entire MKV fragment to arrive.
-                chunk_buffer.extend(chunk)
-
                 #############################################
-                # Parse current byte buffer to MKV EBML DOM like object using EBMLite
+                # Buffer the chunk and scan only the newly appended bytes for fragment boundaries.
                 #############################################
-                fragement_intrum_dom = self.schema.loads(chunk_buffer)
-
-                #############################################
-                #  Process a complete fragment if its arrived and send to the on_fragment_arrived callback. 
-                #############################################
-                # EBML header elements indicate the start of a new fragment. Here we check if the start of a second fragment
-                # has arrived and use its start to identify the byte boundary of the first complete fragment to process.
-                ebml_header_elements = self._get_ebml_header_elements(fragement_intrum_dom)
-
-                # If multiple fragment headers then the first fragment has been received completely and ready to process.
-                if (len(ebml_header_elements) > 1):
-                    
-                    # Get the offset for the first and second fragments. First fragment offset should be zero or fragment boundary is out of sync!
-                    first_ebml_header_offset = ebml_header_elements[0].offset 
-                    second_ebml_header_offset = ebml_header_elements[1].offset 
+                # Each complete fragment is forwarded to the on_fragment_arrived callback once the next EBML header
+                # arrives, as soon as a Segment of known size has arrived, or when no more bytes arrive shortly
+                # after the fragment's trailing Tags.
+                fragment_flusher.feed(chunk)
 
-                    # Isolate the bytes from the first complete MKV fragments in the received chunk data
-                    fragment_bytes = chunk_buffer[first_ebml_header_offset : second_ebml_header_offset]
+            fragment_flusher.cancel()
+            if self._idle_flush_failed:
+                # Already passed to the exception callback.
+                return
 
-                    # Parse the complete fragment as EBML to a DOM like object
-                    fragment_dom = self.schema.loads(fragment_bytes)
-
-                    # Calculate duration taken receiving this fragment - just for telemetry of the steaming data. 
-                    fragment_receive_duration = timeit.default_timer() - fragment_read_start_time
-                    
-                    # Forward fragment to the on_fragment_arrived callback.
-                    self.on_fragment_arrived_callback(self.stream_name, 
-                                                      fragment_bytes, 
-                                                      fragment_dom, 
-                                                      fragment_receive_duration)
-
-                    # Remove the processed MKV segment from the raw byte chunk_buffer
-                    chunk_buffer = chunk_buffer[second_ebml_header_offset: ]
-
-                    # Reset the chunk read count. 
-                    chunk_read_count = 0
+            #############################################
+            # Forward the trailing fragment if the stream ended before its structure showed it complete.
+            #############################################
+            if not self._stop_get_media:
+                fragment_flusher.flush()
 
-                    # Reset the start time for the next segment iteration just to time fragment durations
-                    fragment_read_start_time = timeit.default_timer()
-                
-                #############################################
-                # Increment to chunk read count for this fragment
-                chunk_read_count +=1
+            if self.fragment_process_pool:
+                self._wait_processed_fragments()
+                if self._processed_fragments_failed:
+                    # Ended by an exception forwarding the results, already passed to the exception callback.
+                    return
 
             #############################################
             # Exit the thread if the stream has no more chunks.
             #############################################
             #call the on_stream_read_complete() callback and exit the thread.
-            self.on_read_stream_complete_callback(self.stream_name)
+            self._forward_stream_event(self.on_read_stream_complete_callback, self.stream_name)
 
         except Exception as err:
             # Pass any exceptions to exception callback.
-            self.on_read_stream_exception(self.stream_name, err)
+            fragment_flusher.cancel()
+            if self._idle_flush_failed:
+                return
+            self._forward_stream_event(self.on_read_stream_exception, self.stream_name, err)
+
+    def _forward_stream_event(self, callback, *args):
+        '''
+        Calls the stream complete / exception callback, after any fragments still queued on the dispatcher. Not
+        called if a callback run on the dispatcher has failed, as that exception has already been passed on.
+        '''
+        if self.fragment_dispatcher:
+            self.fragment_dispatcher.submit(self.stream_name, self._call_dispatched_callback, callback, *args, 
+                                            required=True)
+        else:
+            callback(*args)
         
 
@@ -1,26 +1,20 @@
 import json
 import configparser
-import wave
 
 import boto3
 from aiohttp import web
 
-from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsFragementProcessor
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsFragmentProcessor
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_writers import KvsWavWriter
 from amazon_kinesis_video_consumer_library.kinesis_video_streams_parser import KvsConsumerLibrary
 
 config = configparser.ConfigParser()
 config.read("config.ini")
 
 
-to_customer_file = wave.open('audio_to_customer.wav','w')
-to_customer_file.setnchannels(1)
-to_customer_file.setframerate(8000)
-to_customer_file.setsampwidth(2)
-
-from_customer_file = wave.open('audio_from_customer.wav','w')
-from_customer_file.setnchannels(1)
-from_customer_file.setframerate(8000)
-from_customer_file.setsampwidth(2)
+# Audio is written on the sinks' background threads so the stream reader is not blocked on the disk.
+to_customer_file = KvsWavWriter('audio_to_customer.wav', nchannels=1, framerate=8000, sampwidth=2)
+from_customer_file = KvsWavWriter('audio_from_customer.wav', nchannels=1, framerate=8000, sampwidth=2)
 
 aws_access_key_id=config['aws-connect']['aws_access_key_id']
 aws_secret_access_key=config['aws-connect']['aws_secret_access_key']
@@ -29,6 +23,9 @@ region_name=config['aws-connect']['region_name']
 
 kvs_fragment_processor = KvsFragmentProcessor()
 
+# The KvsConsumerLibrary of each stream being read, by stream ARN.
+kvs_consumers = {}
+
 kvs_client = boto3.client('kinesisvideo',
                             aws_access_key_id=aws_access_key_id, 
                             aws_secret_access_key=aws_secret_access_key, 
@@ -36,8 +33,8 @@ kvs_client = boto3.client('kinesisvideo',
 
 
 def on_fragment_arrived(stream_name, fragment_bytes, fragment_dom, fragment_receive_duration):
-    # Should only have to call this once per call
-    track_info = kvs_fragment_processor.get_aws_connect_track_info(fragment_dom)
+    # The track info is cached by the stream's consumer, the Tracks are only re-parsed if they change
+    track_info = kvs_consumers[stream_name].track_cache.get_aws_connect_track_info(fragment_dom)
         
     # Depending on how AWS Connect Live Media Streaming is configured the track numbers can be different
     # So make sure we assign the correct ones
@@ -48,23 +45,22 @@ def on_fragment_arrived(stream_name, fragment_bytes, fragment_dom, fragment_rece
         to_customer_track_number = track_info["AUDIO_TO_CUSTOMER"]['track_number']
     
     # Get the actual audio bytes
-    audio_track_data = kvs_fragment_processor.get_aws_connect_audio(fragment_dom)
+    audio_track_data = kvs_fragment_processor.get_aws_connect_audio(fragment_dom, fragment_bytes)
 
-    # Convert the bytearrays to bytes
-    track1_data = bytes(audio_track_data['track_1'])
-    track2_data = bytes(audio_track_data['track_2'])
+    track1_data = audio_track_data['track_1']
+    track2_data = audio_track_data['track_2']
 
     # And do something with the audio. In this example we are saving it to local file
     if to_customer_track_number == 1:
         if len(track1_data) > 0:
-            to_customer_file.writeframes(track1_data)
+            to_customer_file.write(track1_data)
         if len(track2_data) > 0:
-            from_customer_file.writeframes(track2_data)
+            from_customer_file.write(track2_data)
     else:
         if len(track2_data) > 0:
-            to_customer_file.writeframes(track2_data)
+            to_customer_file.write(track2_data)
         if len(track1_data) > 0:
-            from_customer_file.writeframes(track1_data)
+            from_customer_file.write(track1_data)
 
 def on_stream_read_complete(stream_name): 
     print('stream complete')
@@ -125,6 +121,7 @@ async def incoming_stream_add(request):
                                             on_stream_read_complete, 
                                             on_stream_read_exception
                                                 )
+        kvs_consumers[stream_arn] = kvs_consumer
         kvs_consumer.start()
 
     except json.decoder.JSONDecodeError as error:
@@ -0,0 +1,133 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Builds small synthetic KVS style MKV fragments for the tests.
+
+Each fragment is an EBML header followed by a Segment holding Info, Tracks, a Tags element with the KVS fragment
+tags, one Cluster of SimpleBlocks and, optionally, further Tags elements after the Cluster (as KVS writes for
+MILLIS_BEHIND_NOW, ContactId or error tags). As with KVS GetMedia, the Segment and Cluster are of unknown size
+unless known_size is set.
+
+ '''
+
+import struct
+
+from amazon_kinesis_video_consumer_library.ebmlite import loadSchema, encoding
+
+schema = loadSchema('matroska.xml')
+
+UNKNOWN_SIZE = b'\x01\xff\xff\xff\xff\xff\xff\xff'
+
+
+def master(element_id, payload, known_size=True):
+    '''
+    Returns a master element of the given ID around the payload bytes.
+    '''
+    size = encoding.encodeSize(len(payload)) if known_size else UNKNOWN_SIZE
+    return encoding.encodeId(element_id) + size + bytes(payload)
+
+
+def tags(pairs):
+    '''
+    Returns a Tags element with one Tag holding a SimpleTag per (name, value) pair.
+    '''
+    simple_tags = bytearray()
+    for name, value in pairs:
+        simple_tags += schema['SimpleTag'].encode(dict([('TagName', name), ('TagString', value)]))
+    return master(0x1254C367, master(0x7373, simple_tags))
+
+
+def block_data(track_number, relative_timecode, payload, flags=0x80):
+    '''
+    Returns the data of a SimpleBlock (or Block) without lacing.
+    '''
+    return bytes([0x80 | track_number]) + struct.pack('>h', relative_timecode) + bytes([flags]) + bytes(payload)
+
+
+def simple_block(track_number, relative_timecode, payload, flags=0x80):
+    '''
+    Returns a SimpleBlock element.
+    '''
+    return schema['SimpleBlock'].encode(block_data(track_number, relative_timecode, payload, flags))
+
+
+def track_entry(track_number, name, codec_id='A_PCM/INT/LIT', track_type=2, codec_private=None):
+    '''
+    Returns a TrackEntry element.
+    '''
+    values = [('TrackNumber', track_number), ('TrackUID', 100 + track_number), ('TrackType', track_type),
+              ('CodecID', codec_id), ('Name', name)]
+    if (codec_private is not None):
+        values.append(('CodecPrivate', codec_private))
+    return schema['TrackEntry'].encode(dict(values))
+
+
+def fragment(number, block_count=20, block_size=320, known_size=False, trailing_tags=1, cluster_known_size=None):
+    '''
+    Returns the bytes of a two track (AUDIO_TO_CUSTOMER / AUDIO_FROM_CUSTOMER) PCM fragment.
+
+    ### Parameters:
+
+        **number**: int
+            Used in the fragment number tag and the block payloads.
+
+        **known_size**: bool
+            Write the Segment and Cluster sizes, rather than unknown ('infinite') sizes.
+
+        **cluster_known_size**: bool
+            Write the Cluster size, if different to known_size.
+
+        **trailing_tags**: int
+            Number of Tags elements after the Cluster.
+    '''
+    ebml = schema['EBML'].encode(dict([('EBMLVersion', 1), ('EBMLReadVersion', 1), ('DocType', 'matroska'),
+                                       ('DocTypeVersion', 4), ('DocTypeReadVersion', 2)]))
+    info = schema['Info'].encode(dict([('TimecodeScale', 1000000), ('Title', 'Kinesis Video SDK')]))
+    tracks = master(0x1654AE6B, track_entry(1, 'AUDIO_TO_CUSTOMER') + track_entry(2, 'AUDIO_FROM_CUSTOMER'))
+    fragment_tags = tags([('AWS_KINESISVIDEO_FRAGMENT_NUMBER', '91343852333181500%03d' % number),
+                          ('AWS_KINESISVIDEO_SERVER_TIMESTAMP', '1599041996.%03d' % number),
+                          ('AWS_KINESISVIDEO_PRODUCER_TIMESTAMP', '1599041995.%03d' % number)])
+
+    cluster = bytearray(schema['Timecode'].encode(1599041995000 + number * 1000))
+    for i in range(block_count):
+        cluster += simple_block(1 + (i % 2), i * 20, bytes([(number + i) & 0xff]) * block_size)
+
+    if (cluster_known_size is None):
+        cluster_known_size = known_size
+    segment = info + tracks + fragment_tags + master(0x1F43B675, cluster, cluster_known_size)
+    for i in range(trailing_tags):
+        segment += tags([('AWS_KINESISVIDEO_MILLIS_BEHIND_NOW', str(1000 + i)),
+                         ('ContactId', 'contact-%d-%d' % (number, i))])
+
+    return bytes(ebml + master(0x18538067, segment, known_size))
+
+
+def stream(fragment_count=4, **kwargs):
+    '''
+    Returns a list of fragments, see fragment().
+    '''
+    return [fragment(number, **kwargs) for number in range(fragment_count)]
+
+
+def chunks(data, chunk_size):
+    '''
+    Splits data into chunks of chunk_size bytes.
+    '''
+    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+
+def video_fragment(frames, codec_id='V_VP8', codec_private=None, keyframe_interval=1):
+    '''
+    Returns the bytes of a single video track fragment with a SimpleBlock per frame, every keyframe_interval'th
+    flagged as a keyframe.
+    '''
+    ebml = schema['EBML'].encode(dict([('EBMLVersion', 1), ('DocType', 'matroska')]))
+    tracks = master(0x1654AE6B, track_entry(1, 'VIDEO', codec_id, 1, codec_private))
+
+    cluster = bytearray(schema['Timecode'].encode(0))
+    for i, frame in enumerate(frames):
+        flags = 0x80 if (i % keyframe_interval == 0) else 0x00
+        cluster += simple_block(1, i * 40, frame, flags)
+
+    return bytes(ebml + master(0x18538067, tracks + master(0x1F43B675, cluster, False), False))
@@ -0,0 +1,204 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+'''
+Checks the buffer-native, lazily parsed and cached ebmlite DOM against data/fragment_dom_baseline.json, a dump of
+the test fragments (whole, concatenated and truncated within element payloads) made with the stream based ebmlite
+the library originally shipped.
+'''
+
+import datetime
+import json
+import os
+import pickle
+from io import BytesIO
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.ebmlite import loadSchema
+from amazon_kinesis_video_consumer_library.ebmlite.core import MasterElement
+from amazon_kinesis_video_consumer_library.ebmlite.flat import FlatDocument, FlatElement
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), 'data')
+
+schema = loadSchema('matroska.xml')
+
+with open(os.path.join(DATA_PATH, 'fragment_dom_baseline.json')) as baseline_file:
+    BASELINE_DOM = json.load(baseline_file)
+
+
+def _read_data(name):
+    '''
+    Returns the bytes of a baseline entry, files joined by + and optionally truncated as [:cut].
+    '''
+    name, _, cut = name.partition('[:')
+    data = b''
+    for file_name in name.split('+'):
+        with open(os.path.join(DATA_PATH, file_name), 'rb') as data_file:
+            data += data_file.read()
+    return data[:int(cut[:-1])] if cut else data
+
+
+def dump_element(element):
+    '''
+    Returns the element as [name, offset, size, value or list of dumped children] for comparison.
+    '''
+    element_type = element.type if isinstance(element, FlatElement) else type(element)
+    if issubclass(element_type, MasterElement):
+        return [element.name, element.offset, element.size, [dump_element(child) for child in element]]
+
+    value = element.value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        value = bytes(value).hex()
+    elif isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    return [element.name, element.offset, element.size, value]
+
+
+def dump_document(document):
+    return [dump_element(root) for root in document]
+
+
+@pytest.mark.parametrize('name', sorted(BASELINE_DOM))
+@pytest.mark.parametrize('data_type', [bytes, bytearray, memoryview])
+def test_loads_matches_baseline(name, data_type):
+    document = schema.loads(data_type(_read_data(name)))
+
+    assert dump_document(document) == BASELINE_DOM[name]
+
+
+@pytest.mark.parametrize('name', sorted(BASELINE_DOM))
+def test_file_stream_matches_baseline(name, tmp_path):
+    file_path = tmp_path / 'fragment.mkv'
+    file_path.write_bytes(_read_data(name))
+
+    with open(file_path, 'rb') as fragment_file:
+        assert dump_document(schema.load(fragment_file, headers=True)) == BASELINE_DOM[name]
+
+    assert dump_document(schema.load(BytesIO(_read_data(name)), headers=True)) == BASELINE_DOM[name]
+
+
+@pytest.mark.parametrize('name', ['fragment_unknown_size.mkv', 'fragment_known_size.mkv',
+                                  'fragment_unknown_size.mkv+fragment_known_size.mkv'])
+def test_flat_document_matches_baseline(name):
+    assert dump_document(FlatDocument(schema, _read_data(name))) == BASELINE_DOM[name]
+
+
+@pytest.mark.parametrize('load', [schema.loads, lambda data: FlatDocument(schema, data)])
+def test_elements_have_no_instance_dict(load):
+    segment = load(_read_data('fragment_known_size.mkv'))[1]
+
+    assert not any(hasattr(element, '__dict__') for element in [segment] + list(segment))
+
+
+def test_loads_binary_values_are_views_of_the_data():
+    data = bytearray(_read_data('fragment_known_size.mkv'))
+    cluster = next(child for child in schema.loads(data)[1] if child.name == 'Cluster')
+    simple_block = next(child for child in cluster if child.name == 'SimpleBlock')
+
+    assert isinstance(simple_block.value, memoryview)
+    data[simple_block.payloadOffset] ^= 0xFF
+    assert simple_block.value[0] == data[simple_block.payloadOffset]
+
+
+@pytest.mark.parametrize('load', [schema.loads, lambda data: FlatDocument(schema, data)])
+def test_dump_copies_binary_values(load):
+    segment = load(memoryview(_read_data('fragment_known_size.mkv')))[1]
+
+    dumped = segment.dump()
+    simple_blocks = dumped['Cluster'][0]['SimpleBlock']
+    assert simple_blocks and all(type(simple_block) is bytes for simple_block in simple_blocks)
+    assert pickle.loads(pickle.dumps(dumped)) == dumped
+
+
+def test_elements_are_parsed_on_demand():
+    document = schema.loads(_read_data('fragment_known_size.mkv+fragment_unknown_size.mkv'))
+
+    assert document[0].name == 'EBML'
+    assert len(document._children) == 1
+
+    # A known size Segment is skipped by its size, its children are parsed as they are used.
+    segment = document[1]
+    assert segment[0].name == 'Info'
+    assert len(segment._children) == 1
+    assert len(document._children) == 2
+
+    assert [child.name for child in segment][-3:] == ['Cluster', 'Tags', 'Tags']
+    assert len(segment._children) == 6
+    assert len(document._children) == 2
+
+
+def test_parsed_elements_are_cached():
+    document = schema.loads(_read_data('fragment_unknown_size.mkv+fragment_known_size.mkv'))
+
+    roots = list(document)
+    assert [root.name for root in roots] == ['EBML', 'Segment', 'EBML', 'Segment']
+    assert all(root is cached for root, cached in zip(document, roots))
+    assert sorted(document._roots) == [root.offset for root in roots]
+
+    segment = roots[1]
+    children = list(segment)
+    assert all(child is cached for child, cached in zip(segment, children))
+    assert segment[len(children) - 1] is children[-1]
+
+    # The header read for document.info uses the cached EBML root.
+    assert document.info['DocType'] == 'matroska'
+    assert document[0] is roots[0]
+
+
+def test_gc_clears_the_cache():
+    document = schema.loads(_read_data('fragment_unknown_size.mkv'))
+    roots = list(document)
+
+    assert document.gc() > 0
+    assert document._roots == {}
+    assert document[1] is not roots[1]
+    assert dump_document(document) == BASELINE_DOM['fragment_unknown_size.mkv']
+
+
+def test_document_info_and_len():
+    document = schema.loads(_read_data('fragment_known_size.mkv'))
+
+    assert document.type == 'matroska'
+    assert document.version == 4
+    assert len(document) == 2
+    assert len(document[1]) == 6
+
+
+@pytest.mark.parametrize('name', ['fragment_unknown_size.mkv', 'fragment_known_size.mkv',
+                                  'fragment_unknown_size.mkv+fragment_known_size.mkv'])
+def test_complete_data_needs_no_bytes(name):
+    assert schema.loads(_read_data(name)).getBytesNeeded() == 0
+
+
+def test_truncated_payload_bytes_needed():
+    data = _read_data('fragment_known_size.mkv')
+
+    for cut in range(1, 100):
+        assert schema.loads(data[:-cut]).getBytesNeeded() == cut
+
+
+@pytest.mark.parametrize('cut, root_count', [(1, 0), (3, 0), (34, 1), (42, 1)])
+def test_data_ending_in_a_root_header(cut, root_count):
+    data = _read_data('fragment_unknown_size.mkv')
+    document = schema.loads(data[:cut])
+
+    # Only the roots with a complete header are returned, rather than reading past the end of the data.
+    assert dump_document(document) == BASELINE_DOM['fragment_unknown_size.mkv'][:root_count]
+    assert document.getBytesNeeded() > 0
+
+
+@pytest.mark.parametrize('cut, path, child_count', [(182, (1,), 2), (371, (1,), 3), (372, (1,), 3),
+                                                    (405, (1, 3), 2)])
+def test_data_ending_in_a_child_header(cut, path, child_count):
+    data = _read_data('fragment_unknown_size.mkv')
+    full_element = schema.loads(data)
+    element = schema.loads(data[:cut])
+    for index in path:
+        full_element = full_element[index]
+        element = element[index]
+
+    # An unknown size element ends with the last child whose header is complete.
+    assert [dump_element(child) for child in element] == [dump_element(child) for child in full_element][:child_count]
+    assert element.payloadOffset + element.size <= cut
+    assert element.getBytesNeeded() > 0
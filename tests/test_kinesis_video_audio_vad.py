@@ -0,0 +1,104 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from amazon_kinesis_video_consumer_library.kinesis_video_audio_vad import KvsVoiceActivityDetector
+
+
+def _tone(sample_count, amplitude=8000, frequency=300, sample_rate=8000):
+    return (amplitude * np.sin(np.arange(sample_count) * 2 * np.pi * frequency / sample_rate)).astype('<i2')
+
+
+@pytest.mark.parametrize('split', [1, 1001, 3199])
+def test_odd_byte_splits_match_the_unsplit_feed(split):
+    samples = _tone(8000)
+    samples[2000:5000] = 0
+    data = samples.tobytes()
+
+    frames, voiced = KvsVoiceActivityDetector().get_voiced_frames(data)
+
+    vad = KvsVoiceActivityDetector()
+    first_frames, first_voiced = vad.get_voiced_frames(data[:split])
+    second_frames, second_voiced = vad.get_voiced_frames(data[split:])
+
+    assert np.array_equal(np.concatenate((first_frames, second_frames)), frames)
+    assert np.array_equal(np.concatenate((first_voiced, second_voiced)), voiced)
+    assert np.abs(np.concatenate((first_frames, second_frames))).max() == np.abs(frames).max()
+
+
+def test_big_endian_int16_is_converted():
+    samples = _tone(1600)
+
+    assert np.array_equal(KvsVoiceActivityDetector().mark_silence(samples.astype('>i2')),
+                          KvsVoiceActivityDetector().mark_silence(samples))
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'int32', 'uint16', 'int8'])
+def test_other_dtypes_are_rejected(dtype):
+    with pytest.raises(TypeError):
+        KvsVoiceActivityDetector().get_voiced_frames(np.zeros(320, dtype=dtype))
+
+
+def test_array_after_an_odd_byte_is_rejected():
+    vad = KvsVoiceActivityDetector()
+    vad.get_voiced_frames(b'\x00' * 321)
+
+    with pytest.raises(ValueError):
+        vad.get_voiced_frames(np.zeros(320, dtype=np.int16))
+
+
+def _voiced_runs(vad, *sample_counts):
+    '''
+    Feeds a tone of the first sample count then silences of the rest, each in a separate call, returning the
+    voiced flags of each call.
+    '''
+    calls = [_tone(sample_counts[0])] + [np.zeros(sample_count, dtype=np.int16) for sample_count in sample_counts[1:]]
+    return [vad.get_voiced_frames(samples)[1].tolist() for samples in calls]
+
+
+def test_hangover_extends_voice_over_following_frames():
+    samples = np.concatenate((_tone(1600), np.zeros(3200, dtype=np.int16)))
+
+    frames, voiced = KvsVoiceActivityDetector(hangover_frames=10).get_voiced_frames(samples)
+
+    assert len(frames) == 30
+    assert voiced.tolist() == [True] * 20 + [False] * 10
+
+
+def test_hangover_carries_across_calls():
+    # 10 tone frames, then the 10 frame hangover over calls of 3, 4 and 10 silent frames.
+    voiced = _voiced_runs(KvsVoiceActivityDetector(hangover_frames=10), 1600, 480, 640, 1600)
+
+    assert voiced == [[True] * 10, [True] * 3, [True] * 4, [True] * 3 + [False] * 7]
+
+
+def test_hangover_carries_across_calls_split_within_a_frame():
+    samples = np.concatenate((_tone(1600), np.zeros(3200, dtype=np.int16)))
+    expected = KvsVoiceActivityDetector(hangover_frames=5).get_voiced_frames(samples)[1]
+
+    vad = KvsVoiceActivityDetector(hangover_frames=5)
+    voiced = [vad.get_voiced_frames(samples[start : start + 250])[1] for start in range(0, len(samples), 250)]
+
+    assert np.array_equal(np.concatenate(voiced), expected)
+
+
+def test_without_hangover_silence_is_unvoiced_at_once():
+    voiced = _voiced_runs(KvsVoiceActivityDetector(hangover_frames=0), 1600, 480)
+
+    assert voiced == [[True] * 10, [False] * 3]
+
+
+def test_drop_and_mark_silence():
+    # Quiet tone (below the energy threshold), speech level tone, quiet tone.
+    samples = np.concatenate((_tone(1600, amplitude=20), _tone(800), _tone(1600, amplitude=20)))
+
+    voiced_samples = KvsVoiceActivityDetector(hangover_frames=2).drop_silence(samples)
+    assert np.array_equal(voiced_samples, samples[1600 : 2400 + 2 * 160])
+
+    marked = KvsVoiceActivityDetector(hangover_frames=0).mark_silence(samples)
+    assert len(marked) == len(samples)
+    assert np.array_equal(marked[1600:2400], samples[1600:2400])
+    assert not marked[:1600].any() and not marked[2400:].any()
@@ -0,0 +1,107 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import struct
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.ebmlite import encoding
+from amazon_kinesis_video_consumer_library.kinesis_video_block_demuxer import (KvsBlockDemuxer, read_block_frames,
+                                                                               read_block_header, EBML_LACING,
+                                                                               FIXED_SIZE_LACING, XIPH_LACING)
+from tests import mkv
+
+FRAMES = [bytes([1]) * 300, bytes([2]) * 10, bytes([3]) * 255, bytes([4]) * 2, bytes([5]) * 77]
+
+
+def _laced_block(track_number, lacing, lace_bytes, frames):
+    return (bytes([0x80 | track_number]) + struct.pack('>h', -5) + bytes([0x80 | lacing, len(frames) - 1])
+            + bytes(lace_bytes) + b''.join(frames))
+
+
+def _xiph_sizes(frames):
+    lace_bytes = bytearray()
+    for frame in frames[:-1]:
+        lace_bytes += b'\xff' * (len(frame) // 255) + bytes([len(frame) % 255])
+    return lace_bytes
+
+
+def _ebml_sizes(frames, size_length=2):
+    lace_bytes = bytearray(encoding.encodeSize(len(frames[0])))
+    for previous_frame, frame in zip(frames, frames[1:-1]):
+        # Signed difference, biased by half the range of a size_length byte VINT.
+        biased_difference = len(frame) - len(previous_frame) + (1 << (7 * size_length - 1)) - 1
+        lace_bytes += ((1 << (7 * size_length)) | biased_difference).to_bytes(size_length, 'big')
+    return lace_bytes
+
+
+def test_unlaced_block():
+    block = mkv.block_data(3, 120, b'frame', flags=0x81)
+
+    assert read_block_header(block) == (3, 120, 0x81, 4)
+    track_number, relative_timecode, flags, frames = read_block_frames(block)
+    assert (track_number, relative_timecode, flags) == (3, 120, 0x81)
+    assert [bytes(frame) for frame in frames] == [b'frame']
+
+
+def test_multi_byte_track_number():
+    # Track 200 as a 2 byte VINT.
+    block = b'\x40\xc8' + struct.pack('>h', -1) + b'\x00' + b'frame'
+
+    assert read_block_header(block) == (200, -1, 0x00, 5)
+    assert [bytes(frame) for frame in read_block_frames(block)[3]] == [b'frame']
+
+
+def test_xiph_lacing():
+    block = _laced_block(1, XIPH_LACING, _xiph_sizes(FRAMES), FRAMES)
+
+    track_number, relative_timecode, _, frames = read_block_frames(block)
+    assert (track_number, relative_timecode) == (1, -5)
+    assert [bytes(frame) for frame in frames] == FRAMES
+
+
+@pytest.mark.parametrize('size_length', [1, 2])
+def test_ebml_lacing(size_length):
+    frames = FRAMES if size_length == 2 else [b'a' * 40, b'b' * 50, b'c' * 20, b'd' * 3]
+
+    block = _laced_block(2, EBML_LACING, _ebml_sizes(frames, size_length), frames)
+
+    assert [bytes(frame) for frame in read_block_frames(block)[3]] == frames
+
+
+def test_fixed_size_lacing():
+    frames = [bytes([number]) * 160 for number in range(4)]
+    block = _laced_block(1, FIXED_SIZE_LACING, b'', frames)
+
+    assert [bytes(frame) for frame in read_block_frames(block)[3]] == frames
+
+
+def test_frames_are_views_of_the_block():
+    block = bytearray(_laced_block(1, FIXED_SIZE_LACING, b'', [b'ab', b'cd']))
+
+    frames = read_block_frames(block)[3]
+    block[-1:] = b'x'
+    assert [bytes(frame) for frame in frames] == [b'ab', b'cx']
+
+
+def test_demuxer_joins_frames_per_track():
+    demuxer = KvsBlockDemuxer()
+    demuxer.add_block(mkv.block_data(1, 0, b'one-'))
+    demuxer.add_block(_laced_block(2, XIPH_LACING, _xiph_sizes(FRAMES), FRAMES))
+    demuxer.add_block(mkv.block_data(1, 20, b'two'))
+
+    assert demuxer.get_track_payloads() == {1: b'one-two', 2: b''.join(FRAMES)}
+    assert isinstance(demuxer.get_track_payloads(bytearray)[1], bytearray)
+
+
+@pytest.mark.parametrize('block', [b'\x81\x00', b'\x40'])
+def test_truncated_header_is_rejected(block):
+    with pytest.raises(IOError):
+        read_block_frames(block)
+
+
+def test_lacing_sizes_past_the_block_are_rejected():
+    block = _laced_block(1, XIPH_LACING, _xiph_sizes(FRAMES), FRAMES)[:-100]
+
+    with pytest.raises(IOError):
+        read_block_frames(block)
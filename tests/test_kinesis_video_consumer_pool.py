@@ -0,0 +1,123 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import io
+import threading
+import time
+
+from amazon_kinesis_video_consumer_library.kinesis_video_consumer_pool import KvsConsumerPool
+from tests import mkv
+
+
+class BlockingPayload():
+    '''
+    A live stream payload: read1() returns the available bytes, then blocks until more are added or it is closed.
+    '''
+
+    def __init__(self, data=b''):
+        self._data = bytearray(data)
+        self._condition = threading.Condition()
+        self._closed = False
+        self.read1_sizes = []
+
+    def add(self, data):
+        with self._condition:
+            self._data += data
+            self._condition.notify_all()
+
+    def read1(self, size):
+        with self._condition:
+            self.read1_sizes.append(size)
+            while not self._data and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                raise ValueError('read of closed payload')
+            chunk = bytes(self._data[:size])
+            del self._data[:size]
+            return chunk
+
+    def read(self, size):
+        raise AssertionError('blocking read() used')
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_partial_reads_deliver_fragments_without_a_full_read_size():
+    fragments = mkv.stream(2)
+    payload = BlockingPayload(fragments[0] + fragments[1][:100])
+    arrived = []
+    errors = []
+    pool = KvsConsumerPool(num_workers=1, read_size=1 << 20)
+    pool.start()
+    pool.add_stream('live', {'Payload': payload}, lambda name, fragment_bytes, dom, duration:
+                    arrived.append(bytes(fragment_bytes)), lambda name: None, lambda name, err: errors.append(err))
+
+    # The first fragment is complete once the next EBML header arrives, well short of read_size.
+    _wait_for(lambda: arrived)
+    assert arrived == [fragments[0]]
+
+    pool.stop()
+    assert not errors
+    assert set(payload.read1_sizes) == {1 << 20}
+
+
+def test_fragment_is_delivered_when_idle_after_its_trailing_tags():
+    fragments = mkv.stream(2)
+    payload = BlockingPayload(fragments[0])
+    arrived = []
+    pool = KvsConsumerPool(num_workers=1, fragment_idle_flush_interval=0.01)
+    pool.start()
+    pool.add_stream('live', {'Payload': payload}, lambda name, fragment_bytes, dom, duration:
+                    arrived.append(bytes(fragment_bytes)), lambda name: None, lambda name, err: None)
+
+    # Delivered without waiting for the EBML header of the next fragment.
+    _wait_for(lambda: arrived)
+    payload.add(fragments[1])
+    _wait_for(lambda: len(arrived) == 2)
+    pool.stop()
+
+    assert arrived == fragments
+
+
+def test_stop_interrupts_a_blocked_read():
+    payload = BlockingPayload()
+    errors = []
+    pool = KvsConsumerPool(num_workers=2)
+    pool.start()
+    pool.add_stream('idle', {'Payload': payload}, lambda *args: None, lambda name: None,
+                    lambda name, err: errors.append(err))
+    _wait_for(lambda: payload.read1_sizes)
+
+    stop_thread = threading.Thread(target=pool.stop)
+    stop_thread.start()
+    stop_thread.join(5)
+
+    assert not stop_thread.is_alive()
+    assert not errors
+
+
+def test_remove_stream_interrupts_a_blocked_read():
+    payload = BlockingPayload()
+    completed = []
+    pool = KvsConsumerPool(num_workers=1)
+    pool.start()
+    pool.add_stream('idle', {'Payload': payload}, lambda *args: None, lambda name: None, lambda name, err: None)
+    _wait_for(lambda: payload.read1_sizes)
+
+    pool.remove_stream('idle')
+    pool.add_stream('archived', {'Payload': io.BytesIO(b''.join(mkv.stream(2)))}, lambda *args: None,
+                    completed.append, lambda name, err: None)
+
+    # The only worker was freed from the removed stream's read.
+    _wait_for(lambda: completed)
+    pool.stop()
@@ -0,0 +1,225 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import threading
+import time
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_dispatcher import (KvsFragmentDispatcher, BLOCK,
+                                                                                     COALESCE, DROP_NEWEST,
+                                                                                     DROP_OLDEST)
+
+
+class Deliveries():
+    '''
+    Records delivered fragments, the first delivery blocking the (single) worker until release() so the queue
+    can be filled.
+    '''
+
+    def __init__(self):
+        self.delivered = []
+        self.started = threading.Event()
+        self._released = threading.Event()
+
+    def callback(self, stream_name, fragment):
+        self.started.set()
+        assert self._released.wait(10)
+        self.delivered.append((stream_name, fragment))
+
+    def release(self):
+        self._released.set()
+
+
+def _fill(backpressure_policy, streams=('stream', 'stream')):
+    '''
+    Returns a single worker dispatcher with a queue of 2, its worker busy with fragment 0 of the first stream and
+    fragments 1 and 2 of the given streams queued.
+    '''
+    deliveries = Deliveries()
+    dispatcher = KvsFragmentDispatcher(max_queued_fragments=2, num_workers=1, backpressure_policy=backpressure_policy)
+    dispatcher.submit(streams[0], deliveries.callback, streams[0], 0)
+    assert deliveries.started.wait(10)
+    for fragment, stream_name in enumerate(streams, 1):
+        assert dispatcher.submit(stream_name, deliveries.callback, stream_name, fragment)
+    assert dispatcher.get_metrics()['queue_depth'] == 2
+    return dispatcher, deliveries
+
+
+def _submit_in_thread(dispatcher, *args, **kwargs):
+    results = []
+    submit_thread = threading.Thread(target=lambda: results.append(dispatcher.submit(*args, **kwargs)))
+    submit_thread.start()
+    submit_thread.join(0.2)
+    return submit_thread, results
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        KvsFragmentDispatcher(backpressure_policy='drop_everything')
+
+
+def test_block_waits_for_room():
+    dispatcher, deliveries = _fill(BLOCK)
+
+    submit_thread, results = _submit_in_thread(dispatcher, 'stream', deliveries.callback, 'stream', 3)
+    assert submit_thread.is_alive()
+
+    deliveries.release()
+    submit_thread.join(10)
+    dispatcher.stop()
+
+    assert results == [True]
+    assert deliveries.delivered == [('stream', 0), ('stream', 1), ('stream', 2), ('stream', 3)]
+    assert dispatcher.get_metrics()['dropped_fragments'] == 0
+
+
+def test_drop_oldest_discards_the_oldest_queued_fragment():
+    dispatcher, deliveries = _fill(DROP_OLDEST)
+
+    assert dispatcher.submit('stream', deliveries.callback, 'stream', 3)
+    deliveries.release()
+    dispatcher.stop()
+
+    assert deliveries.delivered == [('stream', 0), ('stream', 2), ('stream', 3)]
+    assert dispatcher.get_metrics()['dropped_fragments'] == 1
+
+
+def test_drop_oldest_prefers_streams_waiting_for_a_worker():
+    dispatcher, deliveries = _fill(DROP_OLDEST, ('a', 'b'))
+
+    assert dispatcher.submit('b', deliveries.callback, 'b', 3)
+    deliveries.release()
+    dispatcher.stop()
+
+    # Stream b was waiting for a worker while stream a was being delivered.
+    assert sorted(deliveries.delivered) == [('a', 0), ('a', 1), ('b', 3)]
+    assert dispatcher.get_metrics()['dropped_fragments'] == 1
+
+
+def test_drop_newest_discards_the_new_fragment():
+    dispatcher, deliveries = _fill(DROP_NEWEST)
+
+    assert not dispatcher.submit('stream', deliveries.callback, 'stream', 3)
+    deliveries.release()
+    dispatcher.stop()
+
+    assert deliveries.delivered == [('stream', 0), ('stream', 1), ('stream', 2)]
+    metrics = dispatcher.get_metrics()
+    assert metrics['dropped_fragments'] == 1
+    assert metrics['dispatched_fragments'] == 3
+    assert metrics['max_queue_depth'] == 2
+
+
+def test_coalesce_replaces_the_streams_queued_fragments():
+    dispatcher, deliveries = _fill(COALESCE, ('a', 'a'))
+
+    assert dispatcher.submit('a', deliveries.callback, 'a', 3)
+    assert dispatcher.get_metrics()['stream_queue_depths'] == {'a': 1}
+    deliveries.release()
+    dispatcher.stop()
+
+    assert deliveries.delivered == [('a', 0), ('a', 3)]
+    assert dispatcher.get_metrics()['dropped_fragments'] == 2
+
+
+def test_coalesce_blocks_a_stream_with_nothing_queued():
+    dispatcher, deliveries = _fill(COALESCE, ('a', 'b'))
+
+    submit_thread, results = _submit_in_thread(dispatcher, 'c', deliveries.callback, 'c', 3)
+    assert submit_thread.is_alive()
+
+    deliveries.release()
+    submit_thread.join(10)
+    dispatcher.stop()
+
+    assert results == [True]
+    assert sorted(deliveries.delivered) == [('a', 0), ('a', 1), ('b', 2), ('c', 3)]
+
+
+@pytest.mark.parametrize('backpressure_policy', [DROP_OLDEST, DROP_NEWEST, COALESCE])
+def test_required_deliveries_are_never_dropped(backpressure_policy):
+    deliveries = Deliveries()
+    dispatcher = KvsFragmentDispatcher(max_queued_fragments=1, num_workers=1, backpressure_policy=backpressure_policy)
+    dispatcher.submit('stream', deliveries.callback, 'stream', 0)
+    assert deliveries.started.wait(10)
+    assert dispatcher.submit('stream', deliveries.callback, 'stream', 'complete', required=True)
+
+    submit_thread, results = _submit_in_thread(dispatcher, 'stream', deliveries.callback, 'stream', 'exception',
+                                               required=True)
+    assert submit_thread.is_alive()
+
+    deliveries.release()
+    submit_thread.join(10)
+    dispatcher.stop()
+
+    assert results == [True]
+    assert deliveries.delivered == [('stream', 0), ('stream', 'complete'), ('stream', 'exception')]
+
+
+def test_streams_are_delivered_in_order_one_at_a_time():
+    dispatcher = KvsFragmentDispatcher(max_queued_fragments=8, num_workers=4)
+    delivered = {}
+    in_progress = set()
+    overlaps = []
+    lock = threading.Lock()
+
+    def callback(stream_name, fragment):
+        with lock:
+            if stream_name in in_progress:
+                overlaps.append(stream_name)
+            in_progress.add(stream_name)
+        time.sleep(0.001)
+        with lock:
+            in_progress.discard(stream_name)
+            delivered.setdefault(stream_name, []).append(fragment)
+
+    for fragment in range(30):
+        for stream_name in ('a', 'b', 'c'):
+            dispatcher.submit(stream_name, callback, stream_name, fragment)
+    dispatcher.stop()
+
+    assert not overlaps
+    assert delivered == {stream_name: list(range(30)) for stream_name in ('a', 'b', 'c')}
+
+
+def test_callback_errors_do_not_stop_delivery():
+    dispatcher = KvsFragmentDispatcher(num_workers=1)
+    delivered = []
+
+    def callback(fragment):
+        if fragment == 0:
+            raise RuntimeError('callback failed')
+        delivered.append(fragment)
+
+    dispatcher.submit('stream', callback, 0)
+    dispatcher.submit('stream', callback, 1)
+    dispatcher.stop()
+
+    assert delivered == [1]
+
+
+def test_callback_errors_are_passed_to_on_exception():
+    dispatcher = KvsFragmentDispatcher(num_workers=1)
+    errors = []
+    delivered = []
+
+    def callback(fragment):
+        if fragment == 0:
+            raise RuntimeError('callback failed')
+        delivered.append(fragment)
+
+    dispatcher.submit('stream', callback, 0, on_exception=errors.append)
+    dispatcher.submit('stream', callback, 1, on_exception=errors.append)
+    dispatcher.stop()
+
+    assert [str(err) for err in errors] == ['callback failed']
+    assert delivered == [1]
+
+
+def test_submit_after_stop_is_rejected():
+    dispatcher = KvsFragmentDispatcher(num_workers=1)
+    dispatcher.stop()
+
+    with pytest.raises(RuntimeError):
+        dispatcher.submit('stream', print)
@@ -0,0 +1,68 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import threading
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_process_pool import KvsFragmentProcessPool
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsFragmentProcessor
+from amazon_kinesis_video_consumer_library.kinesis_video_streams_parser import KvsConsumerLibrary, iter_fragments
+from tests import mkv
+
+
+@pytest.fixture(scope='module')
+def process_pool():
+    with KvsFragmentProcessPool(('get_fragment_tags', ('get_aws_connect_audio', {})), max_workers=2) as pool:
+        yield pool
+
+
+@pytest.mark.parametrize('extraction', ['save_fragment_as_local_mkv', 'get_fragment_tags_from_bytes',
+                                        'save_frames_as_jpeg', 'get_fragment_index', 'no_such_function',
+                                        ('get_fragment_tags', {'fragment_bytes': b''})])
+def test_unsupported_extractions_are_rejected(extraction):
+    with pytest.raises(ValueError):
+        KvsFragmentProcessPool((extraction,), max_workers=1)
+
+
+def test_duplicate_extractions_are_rejected():
+    with pytest.raises(ValueError):
+        KvsFragmentProcessPool(('get_fragment_tags', ('get_fragment_tags', {})), max_workers=1)
+
+
+def test_map_matches_in_process_extractions(process_pool):
+    data = b''.join(mkv.stream(3))
+    processor = KvsFragmentProcessor()
+
+    results = list(process_pool.map(iter_fragments([data])))
+
+    assert len(results) == 3
+    for fragment, fragment_results in zip(iter_fragments([data]), results):
+        assert fragment_results['get_fragment_tags'] == processor.get_fragment_tags(fragment.fragment_dom)
+        assert fragment_results['get_aws_connect_audio'] == processor.get_aws_connect_audio(fragment.fragment_dom)
+
+
+def test_results_are_delivered_without_waiting_for_the_next_fragment(process_pool):
+    fragments = mkv.stream(3)
+    first_delivered = threading.Event()
+    delivered_before_more_input = []
+    arrived = []
+    errors = []
+
+    def chunks():
+        # The first fragment is complete once the next EBML header arrives, then the stream goes quiet.
+        yield fragments[0] + fragments[1][:40]
+        delivered_before_more_input.append(first_delivered.wait(10))
+        yield fragments[1][40:] + fragments[2]
+
+    def on_fragment_arrived(stream_name, fragment_bytes, fragment_results, fragment_receive_duration):
+        arrived.append(fragment_results['get_fragment_tags']['AWS_KINESISVIDEO_FRAGMENT_NUMBER'])
+        first_delivered.set()
+
+    consumer = KvsConsumerLibrary('stream', {'Payload': chunks()}, on_fragment_arrived, lambda name: None,
+                                  lambda name, err: errors.append(err), fragment_process_pool=process_pool)
+    consumer.run()
+
+    assert not errors
+    assert delivered_before_more_input == [True]
+    assert arrived == ['91343852333181500%03d' % number for number in range(3)]
@@ -0,0 +1,167 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsFragmentProcessor, KvsTrackCache
+from amazon_kinesis_video_consumer_library.kinesis_video_nal_units import KvsNalUnitParser, H264_CODEC_ID
+from tests import mkv
+
+
+H264_SPS = b'\x67\x42\xc0\x1e\xda\x02\x80'
+H264_PPS = b'\x68\xce\x3c\x80'
+H264_IDR = b'\x65\x88\x84' + bytes(range(40))
+H264_NON_IDR = b'\x41\x9a\x02' + bytes(range(20))
+START_CODE = b'\x00\x00\x00\x01'
+
+
+def _length_prefixed(nal_unit, nal_length_size=2):
+    return len(nal_unit).to_bytes(nal_length_size, 'big') + nal_unit
+
+
+def _segment(fragment_dom):
+    return next(element for element in fragment_dom if (element.name == 'Segment'))
+
+
+def test_track_cache_returns_the_track_info():
+    fragment = mkv.fragment(0)
+    track_cache = KvsTrackCache()
+
+    track_info = track_cache.get_aws_connect_track_info(mkv.schema.loads(fragment))
+
+    assert track_info == KvsFragmentProcessor().get_aws_connect_track_info(mkv.schema.loads(fragment))
+    assert {name: track['track_number'] for name, track in track_info.items()} == \
+        {'AUDIO_TO_CUSTOMER': 1, 'AUDIO_FROM_CUSTOMER': 2}
+
+
+def test_track_cache_hit_does_not_parse_the_clusters():
+    track_cache = KvsTrackCache()
+    track_info = track_cache.get_aws_connect_track_info(mkv.schema.loads(mkv.fragment(0)))
+
+    for number in range(1, 4):
+        fragment_dom = mkv.schema.loads(mkv.fragment(number))
+        assert track_cache.get_aws_connect_track_info(fragment_dom) is track_info
+        assert 'Cluster' not in [element.name for element in _segment(fragment_dom)._children]
+
+    assert (track_cache.hits, track_cache.misses) == (3, 1)
+
+
+def test_track_cache_reparses_changed_tracks():
+    track_cache = KvsTrackCache()
+    track_cache.get_aws_connect_track_info(mkv.schema.loads(mkv.fragment(0)))
+
+    track_info = track_cache.get_aws_connect_track_info(mkv.schema.loads(mkv.video_fragment([b'frame'])))
+
+    assert list(track_info) == ['VIDEO']
+    assert (track_cache.hits, track_cache.misses) == (0, 2)
+
+
+def test_track_cache_keeps_the_tracks_of_a_fragment_without_any():
+    ebml = mkv.schema['EBML'].encode(dict([('EBMLVersion', 1), ('DocType', 'matroska')]))
+    cluster = mkv.master(0x1F43B675, mkv.schema['Timecode'].encode(0), False)
+    fragment_without_tracks = ebml + mkv.master(0x18538067, cluster, False)
+    track_cache = KvsTrackCache()
+    track_info = track_cache.get_aws_connect_track_info(mkv.schema.loads(mkv.fragment(0)))
+
+    assert track_cache.get_aws_connect_track_info(mkv.schema.loads(fragment_without_tracks)) is track_info
+
+
+def test_track_cache_accepts_a_fragment_index():
+    processor = KvsFragmentProcessor()
+    track_cache = KvsTrackCache(processor)
+    track_info = track_cache.get_aws_connect_track_info(mkv.schema.loads(mkv.fragment(0)))
+
+    fragment_index = processor.get_fragment_index(mkv.schema.loads(mkv.fragment(1)))
+
+    assert track_cache.get_aws_connect_track_info(fragment_index) is track_info
+    assert track_cache.hits == 1
+
+
+@pytest.mark.parametrize('with_fragment_bytes', [False, True])
+def test_aws_connect_audio_ndarray(with_fragment_bytes):
+    np = pytest.importorskip('numpy')
+    fragment = mkv.fragment(0, block_count=4, block_size=8)
+    fragment_bytes = memoryview(fragment) if with_fragment_bytes else None
+    cluster_timestamp = 1599041995000 * 1000000
+
+    track_audio = KvsFragmentProcessor().get_aws_connect_audio_ndarray(mkv.schema.loads(fragment), fragment_bytes)
+
+    # Blocks alternate between the tracks, each of 8 bytes of the block number.
+    assert sorted(track_audio) == ['track_1', 'track_2']
+    assert track_audio['track_1']['samples'].tolist() == [0x0000] * 4 + [0x0202] * 4
+    assert track_audio['track_2']['samples'].tolist() == [0x0101] * 4 + [0x0303] * 4
+    assert track_audio['track_1']['samples'].dtype == np.dtype('<i2')
+    assert track_audio['track_1']['block_timestamps'].tolist() == [cluster_timestamp, cluster_timestamp + 40000000]
+    assert track_audio['track_2']['block_timestamps'].tolist() == [cluster_timestamp + 20000000,
+                                                                   cluster_timestamp + 60000000]
+    assert track_audio['track_1']['block_sample_offsets'].tolist() == [0, 4]
+
+
+def test_aws_connect_audio_ndarray_matches_the_audio_bytes():
+    np = pytest.importorskip('numpy')
+    fragment_dom = mkv.schema.loads(mkv.fragment(3))
+    processor = KvsFragmentProcessor()
+
+    track_audio = processor.get_aws_connect_audio_ndarray(fragment_dom)
+    audio_bytes = processor.get_aws_connect_audio(fragment_dom)
+
+    for track_name in ('track_1', 'track_2'):
+        samples = track_audio[track_name]['samples']
+        assert samples.tobytes() == audio_bytes[track_name]
+        assert not samples.flags.writeable
+        assert np.array_equal(samples, np.frombuffer(bytes(audio_bytes[track_name]), dtype='<i2'))
+
+
+@pytest.mark.parametrize('with_fragment_bytes', [False, True])
+def test_frames_as_annex_b(with_fragment_bytes):
+    # AVCDecoderConfigurationRecord with 2 byte NAL unit lengths.
+    avcc = (bytes([1, 0x42, 0xc0, 0x1e, 0xfd, 0xe1]) + _length_prefixed(H264_SPS) + b'\x01'
+            + _length_prefixed(H264_PPS))
+    frames = [_length_prefixed(nal_unit) for nal_unit in (H264_IDR, H264_NON_IDR, H264_IDR, H264_NON_IDR)]
+    fragment = mkv.video_fragment(frames, H264_CODEC_ID, avcc, keyframe_interval=2)
+    fragment_bytes = memoryview(fragment) if with_fragment_bytes else None
+    processor = KvsFragmentProcessor()
+    nal_unit_parser = KvsNalUnitParser()
+    keyframe = START_CODE + H264_SPS + START_CODE + H264_PPS + START_CODE + H264_IDR
+
+    annex_b_frames = processor.get_frames_as_annex_b(mkv.schema.loads(fragment), nal_unit_parser,
+                                                     fragment_bytes=fragment_bytes)
+    assert annex_b_frames == [(True, keyframe), (False, START_CODE + H264_NON_IDR)] * 2
+
+    annex_b_keyframes = processor.get_frames_as_annex_b(mkv.schema.loads(fragment), nal_unit_parser,
+                                                        keyframes_only=True, fragment_bytes=fragment_bytes)
+    assert annex_b_keyframes == [(True, keyframe)] * 2
+
+
+@pytest.mark.parametrize('with_fragment_bytes', [False, True])
+def test_block_timestamps_ndarray(with_fragment_bytes):
+    pytest.importorskip('numpy')
+    fragment = mkv.fragment(7, block_count=5, block_size=4)
+    fragment_bytes = memoryview(fragment) if with_fragment_bytes else None
+    processor = KvsFragmentProcessor()
+    fragment_index = processor.get_fragment_index(mkv.schema.loads(fragment))
+
+    block_arrays = processor.get_block_timestamps_ndarray(fragment_index, fragment_bytes)
+
+    # Cluster timecode 1599041995000 + 7 * 1000 ms, blocks 20 ms apart, TimecodeScale of 1 ms.
+    cluster_timestamp = (1599041995000 + 7000) * 1000000
+    assert block_arrays['timestamps'].tolist() == [cluster_timestamp + i * 20000000 for i in range(5)]
+    # The producer timestamp tag is 1599041995.007 seconds.
+    assert block_arrays['producer_timestamps'].tolist() == [1599041995007000000 + i * 20000000 for i in range(5)]
+    assert block_arrays['track_numbers'].tolist() == [1, 2, 1, 2, 1]
+    assert block_arrays['keyframes'].tolist() == [True] * 5
+    assert block_arrays['offsets'].tolist() == [offset for offset, _ in fragment_index.block_offsets]
+    assert block_arrays['sizes'].tolist() == [size for _, size in fragment_index.block_offsets]
+
+
+@pytest.mark.parametrize('with_fragment_bytes', [False, True])
+def test_block_timestamps_ndarray_keyframes(with_fragment_bytes):
+    pytest.importorskip('numpy')
+    fragment = mkv.video_fragment([b'frame-%d' % i for i in range(5)], keyframe_interval=2)
+    fragment_bytes = memoryview(fragment) if with_fragment_bytes else None
+
+    block_arrays = KvsFragmentProcessor().get_block_timestamps_ndarray(mkv.schema.loads(fragment), fragment_bytes)
+
+    assert block_arrays['timestamps'].tolist() == [i * 40000000 for i in range(5)]
+    assert block_arrays['keyframes'].tolist() == [True, False, True, False, True]
+    assert block_arrays['producer_timestamps'] is None
@@ -0,0 +1,293 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import time
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.ebmlite import loadSchema
+from amazon_kinesis_video_consumer_library.kinesis_video_streams_parser import iter_fragments
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsFragmentProcessor
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_scanner import (KvsChunkBuffer,
+                                                                                  KvsFragmentIdleFlusher,
+                                                                                  KvsFragmentReader,
+                                                                                  KvsFragmentScanner)
+from tests import mkv
+
+
+def _read_fragments(data, chunk_size):
+    return [bytes(fragment.fragment_bytes) for fragment in iter_fragments(mkv.chunks(data, chunk_size))]
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 97, 1024, 1 << 20])
+def test_tags_after_cluster_stay_with_their_fragment(chunk_size):
+    fragments = mkv.stream(3, trailing_tags=2)
+
+    assert _read_fragments(b''.join(fragments), chunk_size) == fragments
+
+
+def test_all_trailing_tags_are_parsed():
+    data = b''.join(mkv.stream(2, trailing_tags=3))
+    processor = KvsFragmentProcessor()
+
+    fragment_tags = [processor.get_fragment_tags(fragment.fragment_dom) for fragment in iter_fragments([data])]
+
+    assert [tags['ContactId'] for tags in fragment_tags] == ['contact-0-2', 'contact-1-2']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 1024])
+def test_bytes_after_known_size_segment_are_not_dropped(chunk_size):
+    fragments = mkv.stream(2, known_size=True)
+    stray_tags = mkv.tags([('AWS_KINESISVIDEO_ERROR_CODE', '4000')])
+    data = fragments[0] + stray_tags + fragments[1] + stray_tags
+
+    assert _read_fragments(data, chunk_size) == [fragments[0], stray_tags + fragments[1], stray_tags]
+
+
+def test_fragment_bytes_are_a_read_only_view():
+    fragments = mkv.stream(2)
+
+    for fragment, expected in zip(iter_fragments(mkv.chunks(b''.join(fragments), 1000)), fragments):
+        assert isinstance(fragment.fragment_bytes, memoryview)
+        assert fragment.fragment_bytes.readonly
+        assert fragment.fragment_bytes == expected
+        with pytest.raises(TypeError):
+            fragment.fragment_bytes[0] = 0
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 4096, 1 << 20])
+@pytest.mark.parametrize('known_size, cluster_known_size', [(False, False), (True, True), (True, False),
+                                                            (False, True)])
+@pytest.mark.parametrize('trailing_tags', [0, 1, 3])
+def test_fragments_are_split_at_any_chunk_size(chunk_size, known_size, cluster_known_size, trailing_tags):
+    fragments = mkv.stream(3, block_count=6, known_size=known_size, cluster_known_size=cluster_known_size,
+                           trailing_tags=trailing_tags)
+
+    assert _read_fragments(b''.join(fragments), chunk_size) == fragments
+
+
+def test_known_size_fragment_is_returned_once_complete():
+    fragment = mkv.fragment(0, known_size=True)
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+
+    assert reader.feed(fragment[:-1]) == []
+    assert reader.bytes_needed == 1
+    assert [bytes(returned.fragment_bytes) for returned in reader.feed(fragment[-1:])] == [fragment]
+    assert reader.buffered_bytes == 0
+    assert reader.flush() is None
+
+
+@pytest.mark.parametrize('known_size', [False, True])
+def test_detect_fragment_end_off_waits_for_the_next_fragment(known_size):
+    fragments = mkv.stream(2, known_size=known_size)
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'), detect_fragment_end=False)
+
+    assert reader.feed(fragments[0]) == []
+    assert [bytes(fragment.fragment_bytes) for fragment in reader.feed(fragments[1])] == [fragments[0]]
+    assert bytes(reader.flush().fragment_bytes) == fragments[1]
+
+
+def test_flush_returns_the_trailing_fragment():
+    fragments = mkv.stream(2)
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+
+    assert [bytes(fragment.fragment_bytes) for fragment in reader.feed(b''.join(fragments))] == [fragments[0]]
+    assert bytes(reader.flush().fragment_bytes) == fragments[1]
+    assert reader.flush() is None
+
+    # The reader carries on after a flush, for example with the next response of GetMediaForFragmentList.
+    assert reader.feed(fragments[0]) == []
+    assert bytes(reader.flush().fragment_bytes) == fragments[0]
+
+
+def test_flush_returns_a_truncated_fragment():
+    fragment = mkv.fragment(0)
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+
+    assert reader.feed(fragment[:-100]) == []
+    assert reader.bytes_needed > 0
+    assert bytes(reader.flush().fragment_bytes) == fragment[:-100]
+    assert reader.bytes_needed == 0
+    assert reader.buffered_bytes == 0
+
+
+@pytest.mark.parametrize('chunk_size', [1, 1024])
+def test_fragment_is_ending_once_its_trailing_tags_have_arrived(chunk_size):
+    fragment = mkv.fragment(0)
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+
+    chunks = mkv.chunks(fragment, chunk_size)
+    for chunk in chunks[:-1]:
+        assert reader.feed(chunk) == []
+        assert not reader.fragment_ending
+
+    assert reader.feed(chunks[-1]) == []
+    assert reader.fragment_ending
+    assert bytes(reader.flush().fragment_bytes) == fragment
+    assert not reader.fragment_ending
+
+
+@pytest.mark.parametrize('trailing_tags, known_size', [(0, False), (1, True)])
+def test_fragment_without_trailing_tags_or_of_known_size_is_not_ending(trailing_tags, known_size):
+    fragment = mkv.fragment(0, trailing_tags=trailing_tags, known_size=known_size)
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+
+    reader.feed(fragment)
+
+    assert not reader.fragment_ending
+
+
+def test_tags_after_a_flush_are_kept_for_the_next_fragment():
+    fragment = mkv.fragment(0, trailing_tags=2)
+    first_tags_end = len(mkv.fragment(0, trailing_tags=1))
+    next_fragment = mkv.fragment(1)
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+
+    assert reader.feed(fragment[:first_tags_end]) == []
+    assert reader.fragment_ending
+    assert bytes(reader.flush().fragment_bytes) == fragment[:first_tags_end]
+
+    assert reader.feed(fragment[first_tags_end:]) == []
+    assert not reader.fragment_ending
+    assert reader.feed(next_fragment) == []
+    assert bytes(reader.flush().fragment_bytes) == fragment[first_tags_end:] + next_fragment
+
+
+def test_idle_flusher_delivers_an_ending_fragment():
+    fragments = mkv.stream(2)
+    delivered = []
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+    fragment_flusher = KvsFragmentIdleFlusher(reader, lambda fragment: delivered.append(bytes(fragment.fragment_bytes)),
+                                              pytest.fail, idle_flush_interval=0.01)
+
+    fragment_flusher.feed(fragments[0])
+    _wait_for(lambda: delivered)
+    fragment_flusher.feed(fragments[1][:100])
+    fragment_flusher.feed(fragments[1][100:])
+    _wait_for(lambda: len(delivered) == 2)
+    fragment_flusher.flush()
+
+    assert delivered == fragments
+
+
+def test_idle_flusher_waits_while_chunks_arrive():
+    fragments = mkv.stream(2)
+    delivered = []
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+    fragment_flusher = KvsFragmentIdleFlusher(reader, lambda fragment: delivered.append(bytes(fragment.fragment_bytes)),
+                                              pytest.fail, idle_flush_interval=0.2)
+
+    fragment_flusher.feed(fragments[0])
+    fragment_flusher.feed(fragments[1])
+    fragment_flusher.cancel()
+    time.sleep(0.3)
+
+    # Only delivered once, at the next EBML header.
+    assert delivered == fragments[:1]
+    assert reader.fragment_ending
+
+
+def test_idle_flusher_passes_callback_errors_to_on_exception():
+    errors = []
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'))
+
+    def on_fragment(fragment):
+        raise RuntimeError('callback failed')
+
+    fragment_flusher = KvsFragmentIdleFlusher(reader, on_fragment, errors.append, idle_flush_interval=0.01)
+    fragment_flusher.feed(mkv.fragment(0))
+    _wait_for(lambda: errors)
+
+    assert [str(err) for err in errors] == ['callback failed']
+
+
+def test_scanner_bytes_needed_covers_a_skipped_payload():
+    fragment = mkv.fragment(0, block_count=1, block_size=5000)
+    scanner = KvsFragmentScanner()
+
+    # Cut inside the block payload, the rest of it is needed before the next header can be read.
+    cut = len(fragment) - 3000
+    assert scanner.scan(fragment[:cut]) == []
+    assert scanner.bytes_needed > 2
+    assert scanner.scan(fragment[:cut + scanner.bytes_needed - 1]) == []
+    assert scanner.bytes_needed == 1
+
+
+def test_scanner_discard_rebases_offsets():
+    fragments = mkv.stream(3)
+    data = b''.join(fragments)
+    scanner = KvsFragmentScanner()
+
+    fragment_ranges = scanner.scan(data)
+    assert fragment_ranges == [(0, len(fragments[0])), (len(fragments[0]), len(fragments[0]) + len(fragments[1]))]
+
+    scanner.discard(fragment_ranges[-1][1])
+    assert scanner.flush(len(fragments[2])) == (0, len(fragments[2]))
+
+
+def test_chunk_buffer_compacts_in_place_without_views():
+    chunk_buffer = KvsChunkBuffer(initial_capacity=16, compact_threshold=8)
+    chunk_buffer.extend(b'0123456789')
+    chunk_buffer.consume(10)
+    chunk_buffer.extend(b'abcdefghij')
+
+    assert chunk_buffer.capacity == 16
+    assert len(chunk_buffer) == 10
+    assert bytes(chunk_buffer.view()) == b'abcdefghij'
+    assert bytes(chunk_buffer.view(2, 5)) == b'cde'
+
+
+def test_chunk_buffer_grows():
+    chunk_buffer = KvsChunkBuffer(initial_capacity=4)
+    for chunk in mkv.chunks(bytes(range(100)), 7):
+        chunk_buffer.extend(chunk)
+
+    assert chunk_buffer.capacity >= 100
+    assert bytes(chunk_buffer.view()) == bytes(range(100))
+
+
+def test_chunk_buffer_never_overwrites_a_view():
+    chunk_buffer = KvsChunkBuffer(initial_capacity=16, compact_threshold=8)
+    chunk_buffer.extend(b'0123456789')
+    held_view = chunk_buffer.view(0, 10)
+    chunk_buffer.consume(10)
+
+    chunk_buffer.extend(b'abcdefghij')
+
+    assert bytes(held_view) == b'0123456789'
+    assert bytes(chunk_buffer.view()) == b'abcdefghij'
+
+
+def test_chunk_buffer_consume_past_the_end_is_rejected():
+    chunk_buffer = KvsChunkBuffer()
+    chunk_buffer.extend(b'0123')
+
+    with pytest.raises(ValueError):
+        chunk_buffer.consume(5)
+
+
+def test_chunk_buffer_compacts_in_place_once_fragments_are_released():
+    fragments = mkv.stream(20)
+    chunk_buffer = KvsChunkBuffer(initial_capacity=4 * len(fragments[0]), compact_threshold=len(fragments[0]))
+    storage = chunk_buffer._buffer
+    reader = KvsFragmentReader('stream', loadSchema('matroska.xml'), chunk_buffer=chunk_buffer)
+    delivered = []
+
+    def on_fragment(fragment):
+        delivered.append(len(fragment.fragment_dom))
+
+    # As the KvsConsumerLibrary feeds the reader, no reference to a delivered fragment is left behind.
+    fragment_flusher = KvsFragmentIdleFlusher(reader, on_fragment, pytest.fail, idle_flush_interval=None)
+    for chunk in mkv.chunks(b''.join(fragments), 1000):
+        fragment_flusher.feed(chunk)
+    fragment_flusher.flush()
+
+    assert len(delivered) == 20
+    assert chunk_buffer._buffer is storage
@@ -0,0 +1,112 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import os
+import wave
+from array import array
+from pathlib import Path
+
+import pytest
+
+from amazon_kinesis_video_consumer_library import kinesis_video_fragment_writers
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_writers import (KvsRollingMkvWriter, KvsWavWriter,
+                                                                                  write_views)
+from tests import mkv
+
+VIEWS = [b'header', b'', bytearray(b'x' * 1000), memoryview(b'0123456789')[2:8], array('h', range(50)), b'end']
+
+
+def _write_partially(max_bytes, calls):
+    '''
+    Returns os.writev / os.write replacements that write at most max_bytes per call, recording the buffer counts.
+    '''
+    real_write = os.write
+
+    def writev(file_descriptor, buffers):
+        calls.append(len(buffers))
+        return real_write(file_descriptor, b''.join(bytes(buffer) for buffer in buffers)[:max_bytes])
+
+    def write(file_descriptor, buffer):
+        calls.append(1)
+        return real_write(file_descriptor, bytes(buffer)[:max_bytes])
+
+    return writev, write
+
+
+def _write_to_file(tmp_path, views):
+    file_path = tmp_path / 'views.bin'
+    file_descriptor = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    try:
+        written_bytes = write_views(file_descriptor, views)
+    finally:
+        os.close(file_descriptor)
+    return written_bytes, file_path.read_bytes()
+
+
+def test_write_views(tmp_path):
+    expected = b''.join(bytes(view) for view in VIEWS)
+
+    assert _write_to_file(tmp_path, VIEWS) == (len(expected), expected)
+
+
+@pytest.mark.parametrize('max_bytes', [1, 5, 6, 7, 999, 1006])
+def test_write_views_handles_partial_writev(tmp_path, monkeypatch, max_bytes):
+    calls = []
+    writev, _ = _write_partially(max_bytes, calls)
+    monkeypatch.setattr(os, 'writev', writev, raising=False)
+    expected = b''.join(bytes(view) for view in VIEWS)
+
+    assert _write_to_file(tmp_path, VIEWS) == (len(expected), expected)
+    assert len(calls) == -(-len(expected) // max_bytes)
+
+
+@pytest.mark.parametrize('max_bytes', [1, 7, 1006])
+def test_write_views_handles_partial_write_without_writev(tmp_path, monkeypatch, max_bytes):
+    calls = []
+    _, write = _write_partially(max_bytes, calls)
+    monkeypatch.delattr(os, 'writev', raising=False)
+    monkeypatch.setattr(os, 'write', write)
+    expected = b''.join(bytes(view) for view in VIEWS)
+
+    assert _write_to_file(tmp_path, VIEWS) == (len(expected), expected)
+
+
+def test_write_views_limits_buffers_per_call(tmp_path, monkeypatch):
+    calls = []
+    writev, _ = _write_partially(1 << 20, calls)
+    monkeypatch.setattr(os, 'writev', writev, raising=False)
+    monkeypatch.setattr(kinesis_video_fragment_writers, 'IOV_MAX', 4)
+    views = [bytes([number]) * 3 for number in range(10)]
+
+    assert _write_to_file(tmp_path, views) == (30, b''.join(views))
+    assert calls == [4, 4, 2]
+
+
+def test_rolling_mkv_writer_rotates_by_size(tmp_path):
+    fragments = mkv.stream(5)
+    base_path = str(tmp_path / 'stream')
+
+    with KvsRollingMkvWriter(base_path, max_file_bytes=2 * len(fragments[0]) + 10,
+                             write_buffer_size=len(fragments[0]) + 1) as writer:
+        for fragment in fragments:
+            writer.write(memoryview(fragment))
+
+    assert writer.file_paths == ['{}-{:05d}.mkv'.format(base_path, number) for number in (1, 2, 3)]
+    assert [Path(file_path).read_bytes() for file_path in writer.file_paths] == \
+        [fragments[0] + fragments[1], fragments[2] + fragments[3], fragments[4]]
+
+
+def test_wav_writer(tmp_path):
+    file_path = str(tmp_path / 'audio.wav')
+    audio = [bytes([number]) * 320 for number in range(20)]
+
+    with KvsWavWriter(file_path, write_buffer_size=1000) as wav_writer:
+        for audio_bytes in audio:
+            wav_writer.write(audio_bytes)
+
+    with wave.open(file_path, 'rb') as wav_file:
+        assert (wav_file.getnchannels(), wav_file.getframerate(), wav_file.getsampwidth()) == (1, 8000, 2)
+        assert wav_file.readframes(wav_file.getnframes()) == b''.join(audio)
+
+    with pytest.raises(ValueError):
+        wav_writer.write(b'\x00\x00')
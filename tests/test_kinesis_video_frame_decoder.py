@@ -0,0 +1,54 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.kinesis_video_frame_decoder import KvsFrameDecoder
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_processor import KvsFragmentProcessor
+from tests import mkv
+
+
+class PassThroughFrameDecoder(KvsFrameDecoder):
+    '''
+    Decodes each packet to itself.
+    '''
+
+    def decode(self, codec_id, codec_private, packets):
+        for packet in packets:
+            yield bytes(packet)
+
+    def to_ndarray(self, frame):
+        return frame
+
+    def save_jpeg(self, frame, file_path):
+        with open(file_path, 'wb') as jpeg_file:
+            jpeg_file.write(frame)
+
+
+class PartialFrameDecoder(KvsFrameDecoder):
+
+    def decode(self, codec_id, codec_private, packets):
+        return iter(packets)
+
+
+def test_frame_decoder_is_abstract():
+    with pytest.raises(TypeError):
+        KvsFrameDecoder()
+    with pytest.raises(TypeError):
+        PartialFrameDecoder()
+
+
+@pytest.mark.parametrize('keyframes_only, one_in_frames_ratio, expected', [
+    (False, 1, list(range(6))),
+    (False, 2, [0, 2, 4]),
+    (True, 1, [0, 3]),
+])
+def test_get_frames_as_ndarray_with_a_custom_decoder(keyframes_only, one_in_frames_ratio, expected):
+    frames = [bytes([i]) * 10 for i in range(6)]
+    fragment_bytes = mkv.video_fragment(frames, keyframe_interval=3)
+    fragment_dom = mkv.schema.loads(fragment_bytes)
+
+    ndarray_frames = KvsFragmentProcessor().get_frames_as_ndarray(fragment_dom, one_in_frames_ratio, keyframes_only,
+                                                                 frame_decoder=PassThroughFrameDecoder())
+
+    assert ndarray_frames == [frames[i] for i in expected]
@@ -0,0 +1,102 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.kinesis_video_nal_units import (KvsNalUnitParser, read_codec_config,
+                                                                           H264_CODEC_ID, H265_CODEC_ID)
+
+H264_SPS = b'\x67\x42\xc0\x1e\xda\x02\x80'
+H264_PPS = b'\x68\xce\x3c\x80'
+H264_IDR = b'\x65\x88\x84' + bytes(range(40))
+H264_SEI = b'\x06\x05\x01\x80'
+
+H265_VPS = b'\x40\x01\x0c\x01\xff'
+H265_SPS = b'\x42\x01\x01\x01\x60'
+H265_PPS = b'\x44\x01\xc1\x72'
+H265_IDR = b'\x26\x01\xaf' + bytes(range(30))
+
+
+def _length_prefixed(nal_units, nal_length_size=4):
+    return b''.join(len(nal_unit).to_bytes(nal_length_size, 'big') + nal_unit for nal_unit in nal_units)
+
+
+def _annex_b(nal_units):
+    return b''.join(b'\x00\x00\x00\x01' + nal_unit for nal_unit in nal_units)
+
+
+def _avcc(nal_length_size=4):
+    return (bytes([1, 0x42, 0xc0, 0x1e, 0xfc | (nal_length_size - 1), 0xe1]) + _length_prefixed([H264_SPS], 2)
+            + b'\x01' + _length_prefixed([H264_PPS], 2))
+
+
+def _hvcc(nal_length_size=4):
+    arrays = b''.join(bytes([0x80 | nal_type]) + b'\x00\x01' + _length_prefixed([nal_unit], 2)
+                      for nal_type, nal_unit in ((32, H265_VPS), (33, H265_SPS), (34, H265_PPS)))
+    return b'\x01' + bytes(20) + bytes([0xfc | (nal_length_size - 1), 3]) + arrays
+
+
+@pytest.mark.parametrize('nal_length_size', [1, 2, 4])
+def test_avcc_frame_to_annex_b(nal_length_size):
+    parser = KvsNalUnitParser()
+    codec_config = parser.get_codec_config(1, H264_CODEC_ID, _avcc(nal_length_size))
+    frame = _length_prefixed([H264_SEI, H264_IDR], nal_length_size)
+
+    assert codec_config.nal_length_size == nal_length_size
+    assert codec_config.parameter_sets == [(7, H264_SPS), (8, H264_PPS)]
+    assert parser.to_annex_b(codec_config, frame) == _annex_b([H264_SEI, H264_IDR])
+    assert parser.to_annex_b(codec_config, frame, True) == _annex_b([H264_SPS, H264_PPS, H264_SEI, H264_IDR])
+    assert [(nal_type, bytes(nal_unit)) for nal_type, nal_unit in parser.iter_nal_units(codec_config, frame)] == \
+        [(6, H264_SEI), (5, H264_IDR)]
+
+
+def test_hvcc_frame_to_annex_b():
+    parser = KvsNalUnitParser()
+    codec_config = parser.get_codec_config(1, H265_CODEC_ID, _hvcc())
+    frame = _length_prefixed([H265_IDR])
+
+    assert codec_config.parameter_sets == [(32, H265_VPS), (33, H265_SPS), (34, H265_PPS)]
+    assert parser.to_annex_b(codec_config, frame) == _annex_b([H265_IDR])
+    assert parser.to_annex_b(codec_config, frame, include_parameter_sets=True) == \
+        _annex_b([H265_VPS, H265_SPS, H265_PPS, H265_IDR])
+    assert [nal_type for nal_type, _ in parser.iter_nal_units(codec_config, frame)] == [19]
+
+
+def test_frames_without_configuration_record_are_annex_b():
+    parser = KvsNalUnitParser()
+    codec_config = parser.get_codec_config(1, H264_CODEC_ID, b'')
+    # 4 and 3 byte start codes.
+    frame = _annex_b([H264_SPS, H264_PPS]) + b'\x00\x00\x01' + H264_IDR
+
+    assert codec_config.nal_length_size is None
+    assert parser.to_annex_b(codec_config, frame) == frame
+    assert [(nal_type, bytes(nal_unit)) for nal_type, nal_unit in parser.iter_nal_units(codec_config, frame)] == \
+        [(7, H264_SPS), (8, H264_PPS), (5, H264_IDR)]
+
+
+def test_codec_config_is_cached_until_it_changes():
+    parser = KvsNalUnitParser()
+    codec_config = parser.get_codec_config(1, H264_CODEC_ID, _avcc())
+
+    assert parser.get_codec_config(1, H264_CODEC_ID, _avcc()) is codec_config
+    assert parser.get_codec_config(2, H264_CODEC_ID, _avcc()) is not codec_config
+    assert parser.get_codec_config(1, H264_CODEC_ID, _avcc(2)).nal_length_size == 2
+
+
+def test_unsupported_codec_is_rejected():
+    with pytest.raises(ValueError):
+        read_codec_config('V_VP8', b'')
+
+
+@pytest.mark.parametrize('codec_id, codec_private', [(H264_CODEC_ID, _avcc()[:12]), (H265_CODEC_ID, _hvcc()[:30])])
+def test_truncated_codec_private_is_rejected(codec_id, codec_private):
+    with pytest.raises(ValueError):
+        read_codec_config(codec_id, codec_private)
+
+
+def test_nal_unit_past_the_frame_is_rejected():
+    parser = KvsNalUnitParser()
+    codec_config = parser.get_codec_config(1, H264_CODEC_ID, _avcc())
+
+    with pytest.raises(ValueError):
+        parser.to_annex_b(codec_config, _length_prefixed([H264_IDR])[:-1])
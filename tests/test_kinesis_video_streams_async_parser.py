@@ -0,0 +1,102 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import asyncio
+
+import pytest
+
+from amazon_kinesis_video_consumer_library.kinesis_video_streams_async_parser import AsyncKvsConsumer
+from tests import mkv
+
+
+class AsyncPayload():
+    '''
+    An aiobotocore style payload: read(n) returns up to n bytes, then b'' at the end of the data.
+    '''
+
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+        self.read_sizes = []
+
+    async def read(self, size):
+        self.read_sizes.append(size)
+        await asyncio.sleep(0)
+        chunk = self._data[self._offset : self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+
+async def _async_chunks(chunks):
+    for chunk in chunks:
+        await asyncio.sleep(0)
+        yield chunk
+
+
+async def _read_fragments(consumer):
+    return [bytes(fragment.fragment_bytes) async for fragment in consumer]
+
+
+@pytest.mark.parametrize('read_size', [1, 1000, 1 << 20])
+def test_fragments_are_read_from_a_read_payload(read_size):
+    fragments = mkv.stream(3)
+    payload = AsyncPayload(b''.join(fragments))
+
+    consumer = AsyncKvsConsumer('stream', {'Payload': payload}, read_size=read_size)
+
+    assert asyncio.run(_read_fragments(consumer)) == fragments
+    assert set(payload.read_sizes) == {read_size}
+
+
+def test_fragments_are_read_from_an_async_iterable():
+    fragments = mkv.stream(3, trailing_tags=2)
+
+    consumer = AsyncKvsConsumer('stream', _async_chunks(mkv.chunks(b''.join(fragments), 777)))
+
+    assert asyncio.run(_read_fragments(consumer)) == fragments
+
+
+def test_fragments_carry_the_stream_name_and_parsed_dom():
+    async def read_first_fragment():
+        async for fragment in AsyncKvsConsumer('stream-arn', AsyncPayload(mkv.fragment(0))):
+            return fragment
+
+    fragment = asyncio.run(read_first_fragment())
+
+    assert fragment.stream_name == 'stream-arn'
+    assert [element.name for element in fragment.fragment_dom] == ['EBML', 'Segment']
+
+
+def test_stop_ends_the_iteration_after_the_fragments_received():
+    fragments = mkv.stream(3)
+    consumer = AsyncKvsConsumer('stream', AsyncPayload(b''.join(fragments)), read_size=1000)
+
+    async def read_until_stopped():
+        delivered = []
+        async for fragment in consumer:
+            delivered.append(bytes(fragment.fragment_bytes))
+            consumer.stop()
+        return delivered
+
+    assert asyncio.run(read_until_stopped()) == fragments[:1]
+
+
+def test_fragment_is_returned_when_idle_after_its_trailing_tags():
+    fragments = mkv.stream(2)
+
+    async def read_live_stream():
+        first_returned = asyncio.Event()
+
+        async def live_chunks():
+            yield fragments[0]
+            # No more bytes until the fragment has been returned.
+            await asyncio.wait_for(first_returned.wait(), 5)
+            yield fragments[1]
+
+        delivered = []
+        async for fragment in AsyncKvsConsumer('stream', live_chunks(), fragment_idle_flush_interval=0.01):
+            delivered.append(bytes(fragment.fragment_bytes))
+            first_returned.set()
+        return delivered
+
+    assert asyncio.run(read_live_stream()) == fragments
@@ -0,0 +1,104 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0.
+
+import threading
+
+from amazon_kinesis_video_consumer_library.kinesis_video_fragment_dispatcher import KvsFragmentDispatcher
+from amazon_kinesis_video_consumer_library.kinesis_video_streams_parser import KvsConsumerLibrary
+from tests import mkv
+
+
+class Callbacks():
+    '''
+    Records the KvsConsumerLibrary callbacks.
+    '''
+
+    def __init__(self):
+        self.arrived = []
+        self.completed = []
+        self.errors = []
+        self.fragment_arrived = threading.Event()
+
+    def on_fragment_arrived(self, stream_name, fragment_bytes, fragment_dom, fragment_receive_duration):
+        self.arrived.append(bytes(fragment_bytes))
+        self.fragment_arrived.set()
+
+    def on_read_stream_complete(self, stream_name):
+        self.completed.append(stream_name)
+
+    def on_read_stream_exception(self, stream_name, err):
+        self.errors.append(err)
+
+    def consumer(self, payload, **kwargs):
+        return KvsConsumerLibrary('stream', {'Payload': payload}, self.on_fragment_arrived,
+                                  self.on_read_stream_complete, self.on_read_stream_exception, **kwargs)
+
+
+def test_fragment_is_forwarded_when_idle_after_its_trailing_tags():
+    fragments = mkv.stream(2)
+    callbacks = Callbacks()
+    delivered_while_live = []
+
+    def live_payload():
+        yield fragments[0]
+        # No more bytes until the fragment has been delivered.
+        delivered_while_live.append(callbacks.fragment_arrived.wait(5))
+        yield fragments[1]
+
+    consumer = callbacks.consumer(live_payload(), fragment_idle_flush_interval=0.01)
+    consumer.start()
+    consumer.join(10)
+
+    assert delivered_while_live == [True]
+    assert callbacks.arrived == fragments
+    assert callbacks.completed == ['stream']
+    assert not callbacks.errors
+
+
+def test_idle_flush_errors_reach_the_exception_callback():
+    callbacks = Callbacks()
+    release_payload = threading.Event()
+
+    def on_fragment_arrived(*args):
+        raise RuntimeError('callback failed')
+
+    def live_payload():
+        yield mkv.fragment(0)
+        release_payload.wait(5)
+        yield mkv.fragment(1)
+
+    consumer = KvsConsumerLibrary('stream', {'Payload': live_payload()}, on_fragment_arrived,
+                                  callbacks.on_read_stream_complete, callbacks.on_read_stream_exception,
+                                  fragment_idle_flush_interval=0.01)
+    consumer.start()
+    while not callbacks.errors and consumer.is_alive():
+        consumer.join(0.01)
+    release_payload.set()
+    consumer.join(10)
+
+    assert [str(err) for err in callbacks.errors] == ['callback failed']
+    assert not callbacks.completed
+
+
+def test_dispatched_callback_errors_reach_the_exception_callback():
+    callbacks = Callbacks()
+    fragments = mkv.stream(4)
+    arrived = []
+
+    def on_fragment_arrived(stream_name, fragment_bytes, fragment_dom, fragment_receive_duration):
+        arrived.append(bytes(fragment_bytes))
+        if (len(arrived) == 2):
+            raise RuntimeError('callback failed')
+
+    dispatcher = KvsFragmentDispatcher(num_workers=2)
+    consumer = KvsConsumerLibrary('stream', {'Payload': mkv.chunks(b''.join(fragments), 1000)}, on_fragment_arrived,
+                                  callbacks.on_read_stream_complete, callbacks.on_read_stream_exception,
+                                  fragment_dispatcher=dispatcher)
+    consumer.start()
+    consumer.join(10)
+    dispatcher.stop()
+
+    # As for in-line callbacks, the stream ends with the exception.
+    assert arrived == fragments[:2]
+    assert [str(err) for err in callbacks.errors] == ['callback failed']
+    assert not callbacks.completed